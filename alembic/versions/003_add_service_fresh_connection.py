@@ -0,0 +1,30 @@
+"""add_service_fresh_connection
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Opt-out of the keep-alive pool for services that measure cold connects
+    op.add_column(
+        'services',
+        sa.Column('fresh_connection', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('services', 'fresh_connection')
@@ -0,0 +1,30 @@
+"""add_service_interval_seconds
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-01-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Per-service check interval; existing services keep the old 2-minute cadence
+    op.add_column(
+        'services',
+        sa.Column('interval_seconds', sa.Integer(), nullable=False, server_default='120'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('services', 'interval_seconds')
@@ -0,0 +1,30 @@
+"""add_service_bypass_dns_cache
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-01-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Opt-out of the checker's DNS cache for checks that should time resolution
+    op.add_column(
+        'services',
+        sa.Column('bypass_dns_cache', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('services', 'bypass_dns_cache')
@@ -0,0 +1,31 @@
+"""add_check_history_phase_timings
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-01-06 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PHASE_COLUMNS = ('dns_time', 'connect_time', 'tls_time', 'ttfb_time', 'body_time')
+
+
+def upgrade() -> None:
+    # Nullable, so existing rows need no backfill
+    for column in PHASE_COLUMNS:
+        op.add_column('check_history', sa.Column(column, sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    for column in PHASE_COLUMNS:
+        op.drop_column('check_history', column)
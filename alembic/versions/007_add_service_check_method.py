@@ -0,0 +1,32 @@
+"""add_service_check_method
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-01-07 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # GET (full body) keeps existing services behaving as before
+    op.add_column(
+        'services',
+        sa.Column('check_method', sa.String(), nullable=False, server_default='GET'),
+    )
+    op.add_column('services', sa.Column('max_body_bytes', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('services', 'max_body_bytes')
+    op.drop_column('services', 'check_method')
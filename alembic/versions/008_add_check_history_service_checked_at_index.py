@@ -0,0 +1,39 @@
+"""add_check_history_service_checked_at_index
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-01-08 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so a large check_history stays writable while the index
+    # builds; that can't run inside a transaction, hence the autocommit block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_check_history_service_id_checked_at',
+            'check_history',
+            ['service_id', 'checked_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_check_history_service_id_checked_at',
+            table_name='check_history',
+            postgresql_concurrently=True,
+        )
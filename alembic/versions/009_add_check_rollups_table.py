@@ -0,0 +1,46 @@
+"""add_check_rollups_table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-01-09 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HISTOGRAM_COLUMNS = (
+    'le_50ms', 'le_100ms', 'le_250ms', 'le_500ms',
+    'le_1s', 'le_2500ms', 'le_5s', 'le_10s', 'gt_10s',
+)
+
+
+def upgrade() -> None:
+    # Rollups start from the migration onwards; existing raw history is
+    # backfilled by migration 013
+    op.create_table(
+        'check_rollups',
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('check_count', sa.Integer(), nullable=False),
+        sa.Column('up_count', sa.Integer(), nullable=False),
+        sa.Column('latency_sum', sa.Float(), nullable=False),
+        sa.Column('latency_min', sa.Float(), nullable=True),
+        sa.Column('latency_max', sa.Float(), nullable=True),
+        *(sa.Column(name, sa.Integer(), nullable=False) for name in HISTOGRAM_COLUMNS),
+        sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('service_id', 'granularity', 'bucket_start'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('check_rollups')
@@ -0,0 +1,128 @@
+"""partition_check_history
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-01-10 00:00:00.000000
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Daily partitions created up front; app.tasks.ensure_history_partitions
+# keeps creating them from then on
+PREMAKE_DAYS = 7
+
+COLUMNS = """
+    id INTEGER NOT NULL DEFAULT nextval('check_history_id_seq'),
+    service_id INTEGER NOT NULL REFERENCES services (id) ON DELETE CASCADE,
+    status VARCHAR NOT NULL,
+    status_code INTEGER NOT NULL,
+    latency FLOAT NOT NULL,
+    dns_time FLOAT,
+    connect_time FLOAT,
+    tls_time FLOAT,
+    ttfb_time FLOAT,
+    body_time FLOAT,
+    checked_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+"""
+
+
+def upgrade() -> None:
+    # Native partitioning is Postgres-only; other databases keep the plain
+    # table and retention.py's batched deletes. The separate id index goes
+    # everywhere, since the primary key's index covers id.
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_check_history_id', table_name='check_history')
+        return
+
+    # The existing table becomes one big partition covering everything up to
+    # the end of today, so no rows are copied. It is dropped as a whole once
+    # its newest day falls out of retention.
+    legacy_until = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # Everything that has to read the whole table runs first, outside the
+    # migration's transaction and without blocking writes:
+    #   - a validated CHECK matching the legacy partition's bounds lets SET
+    #     NOT NULL (Postgres 12+) and ATTACH PARTITION below skip their scans;
+    #   - the new primary key's index is built CONCURRENTLY.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "ALTER TABLE check_history ADD CONSTRAINT check_history_legacy_range "
+            f"CHECK (checked_at IS NOT NULL AND checked_at < '{legacy_until:%Y-%m-%d}') NOT VALID"
+        )
+        # checked_at always had a client-side default, so this finds few rows
+        op.execute(
+            "UPDATE check_history SET checked_at = (now() AT TIME ZONE 'utc') "
+            "WHERE checked_at IS NULL"
+        )
+        op.execute("ALTER TABLE check_history VALIDATE CONSTRAINT check_history_legacy_range")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY check_history_legacy_pkey "
+            "ON check_history (id, checked_at)"
+        )
+
+    # From here on it is catalog changes only
+    op.execute("ALTER TABLE check_history RENAME TO check_history_legacy")
+    op.execute("ALTER INDEX ix_check_history_service_id_checked_at RENAME TO check_history_legacy_service_id_checked_at_idx")
+    op.execute("DROP INDEX ix_check_history_id")
+    op.execute("ALTER TABLE check_history_legacy ALTER COLUMN checked_at SET NOT NULL")
+    # The partition key has to be part of the primary key
+    op.execute("ALTER TABLE check_history_legacy DROP CONSTRAINT check_history_pkey")
+    op.execute(
+        "ALTER TABLE check_history_legacy ADD CONSTRAINT check_history_legacy_pkey "
+        "PRIMARY KEY USING INDEX check_history_legacy_pkey"
+    )
+
+    op.execute(f"CREATE TABLE check_history ({COLUMNS}, PRIMARY KEY (id, checked_at)) PARTITION BY RANGE (checked_at)")
+    # Keep the id sequence alive when the legacy partition is dropped
+    op.execute("ALTER SEQUENCE check_history_id_seq OWNED BY check_history.id")
+    op.execute("ALTER TABLE check_history_legacy ALTER COLUMN id DROP DEFAULT")
+    op.execute(
+        "CREATE INDEX ix_check_history_service_id_checked_at "
+        "ON check_history (service_id, checked_at, id)"
+    )
+
+    op.execute(
+        "ALTER TABLE check_history ATTACH PARTITION check_history_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{legacy_until:%Y-%m-%d}')"
+    )
+    # The partition bound enforces the same thing now
+    op.execute("ALTER TABLE check_history_legacy DROP CONSTRAINT check_history_legacy_range")
+    for offset in range(PREMAKE_DAYS):
+        day = legacy_until + timedelta(days=offset)
+        op.execute(
+            f"CREATE TABLE check_history_p{day:%Y%m%d} PARTITION OF check_history "
+            f"FOR VALUES FROM ('{day:%Y-%m-%d}') TO ('{day + timedelta(days=1):%Y-%m-%d}')"
+        )
+    # Catches rows for a day without a partition, so inserts never fail;
+    # partitions.py reports, moves and prunes anything that lands here
+    op.execute("CREATE TABLE check_history_default PARTITION OF check_history DEFAULT")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_check_history_id', 'check_history', ['id'], unique=False)
+        return
+
+    # Back to one plain table; this copies every row still retained
+    op.execute("ALTER TABLE check_history RENAME TO check_history_partitioned")
+    op.execute("ALTER INDEX ix_check_history_service_id_checked_at RENAME TO check_history_partitioned_service_id_checked_at_idx")
+    columns = COLUMNS.replace("checked_at TIMESTAMP WITHOUT TIME ZONE NOT NULL", "checked_at TIMESTAMP WITHOUT TIME ZONE")
+    op.execute(f"CREATE TABLE check_history ({columns}, PRIMARY KEY (id))")
+    op.execute("INSERT INTO check_history SELECT * FROM check_history_partitioned")
+    op.execute("ALTER SEQUENCE check_history_id_seq OWNED BY check_history.id")
+    op.execute("DROP TABLE check_history_partitioned")
+    op.execute("CREATE INDEX ix_check_history_id ON check_history (id)")
+    op.execute(
+        "CREATE INDEX ix_check_history_service_id_checked_at "
+        "ON check_history (service_id, checked_at, id)"
+    )
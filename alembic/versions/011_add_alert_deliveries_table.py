@@ -0,0 +1,46 @@
+"""add_alert_deliveries_table
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-01-11 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'alert_deliveries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('idempotency_key', sa.String(), nullable=False),
+        sa.Column('service_id', sa.Integer(), nullable=False),
+        sa.Column('alert_status', sa.String(), nullable=False),
+        sa.Column('failure_count', sa.Integer(), nullable=False),
+        sa.Column('state', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['service_id'], ['services.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('idempotency_key'),
+    )
+    op.create_index(op.f('ix_alert_deliveries_id'), 'alert_deliveries', ['id'], unique=False)
+    op.create_index(op.f('ix_alert_deliveries_service_id'), 'alert_deliveries', ['service_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_alert_deliveries_service_id'), table_name='alert_deliveries')
+    op.drop_index(op.f('ix_alert_deliveries_id'), table_name='alert_deliveries')
+    op.drop_table('alert_deliveries')
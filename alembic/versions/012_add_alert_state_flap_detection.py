@@ -0,0 +1,41 @@
+"""add_alert_state_flap_detection
+
+Revision ID: 012
+Revises: 011
+Create Date: 2024-01-12 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing states start with an empty outcome buffer, which fills up
+    # over the next checks
+    op.add_column(
+        'alert_states',
+        sa.Column('recent_outcomes', sa.String(), nullable=False, server_default=''),
+    )
+    op.add_column(
+        'alert_states',
+        sa.Column('flap_score', sa.Float(), nullable=False, server_default='0'),
+    )
+    op.add_column(
+        'alert_states',
+        sa.Column('flapping', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('alert_states', 'flapping')
+    op.drop_column('alert_states', 'flap_score')
+    op.drop_column('alert_states', 'recent_outcomes')
@@ -0,0 +1,119 @@
+"""backfill_check_rollups
+
+Revision ID: 013
+Revises: 012
+Create Date: 2024-01-13 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same buckets as app.models.LATENCY_BUCKETS, copied so this migration
+# doesn't change if they ever do
+LATENCY_BUCKETS = (
+    ('le_50ms', 0.05),
+    ('le_100ms', 0.1),
+    ('le_250ms', 0.25),
+    ('le_500ms', 0.5),
+    ('le_1s', 1.0),
+    ('le_2500ms', 2.5),
+    ('le_5s', 5.0),
+    ('le_10s', 10.0),
+)
+HISTOGRAM_COLUMNS = tuple(name for name, _ in LATENCY_BUCKETS) + ('gt_10s',)
+
+# Bucket start for each granularity; SQLite stores DateTime as
+# 'YYYY-MM-DD HH:MM:SS.ffffff' text
+TRUNCATE = {
+    'postgresql': {
+        'minute': "date_trunc('minute', {})",
+        'hour': "date_trunc('hour', {})",
+        'day': "date_trunc('day', {})",
+    },
+    'sqlite': {
+        'minute': "strftime('%Y-%m-%d %H:%M:00.000000', {})",
+        'hour': "strftime('%Y-%m-%d %H:00:00.000000', {})",
+        'day': "strftime('%Y-%m-%d 00:00:00.000000', {})",
+    },
+}
+
+
+def upgrade() -> None:
+    # Rollups have only been maintained since migration 009, so raw history
+    # older than that exists nowhere else; fold it in before retention
+    # deletes it. Each service's history is taken up to its first minute
+    # rollup, which is where incremental maintenance took over.
+    dialect = op.get_bind().dialect.name
+    truncate = TRUNCATE[dialect]
+    if dialect == 'postgresql':
+        least, greatest = 'least', 'greatest'
+    else:
+        least, greatest = 'min', 'max'
+
+    histogram_bucket = ' '.join(
+        f"WHEN h.latency <= {upper} THEN '{name}'" for name, upper in LATENCY_BUCKETS
+    )
+    # One pass over check_history into per-minute aggregates (latency over
+    # UP checks only, as in app.rollups); hours and days are summed from those
+    op.execute(
+        "CREATE TEMPORARY TABLE rollup_backfill AS "
+        "SELECT service_id, bucket_start, "
+        "count(*) AS check_count, "
+        "sum(CASE WHEN status = 'UP' THEN 1 ELSE 0 END) AS up_count, "
+        "coalesce(sum(CASE WHEN status = 'UP' THEN latency END), 0) AS latency_sum, "
+        "min(CASE WHEN status = 'UP' THEN latency END) AS latency_min, "
+        "max(CASE WHEN status = 'UP' THEN latency END) AS latency_max, "
+        + ", ".join(
+            f"sum(CASE WHEN histogram_bucket = '{name}' THEN 1 ELSE 0 END) AS {name}"
+            for name in HISTOGRAM_COLUMNS
+        )
+        + " FROM ("
+        f"SELECT h.service_id, h.status, h.latency, {truncate['minute'].format('h.checked_at')} AS bucket_start, "
+        f"CASE WHEN h.status <> 'UP' THEN NULL {histogram_bucket} ELSE 'gt_10s' END AS histogram_bucket "
+        "FROM check_history h "
+        "LEFT JOIN ("
+        "SELECT service_id, min(bucket_start) AS first_bucket FROM check_rollups "
+        "WHERE granularity = 'minute' GROUP BY service_id"
+        ") f ON f.service_id = h.service_id "
+        "WHERE h.checked_at IS NOT NULL AND (f.first_bucket IS NULL OR h.checked_at < f.first_bucket)"
+        ") raw GROUP BY service_id, bucket_start"
+    )
+
+    counters = ('check_count', 'up_count', 'latency_sum') + HISTOGRAM_COLUMNS
+    columns = ', '.join(counters)
+    update = ', '.join(f"{column} = check_rollups.{column} + excluded.{column}" for column in counters)
+    # Either side is NULL when its checks were all DOWN
+    update += (
+        f", latency_min = {least}(coalesce(check_rollups.latency_min, excluded.latency_min), "
+        "coalesce(excluded.latency_min, check_rollups.latency_min))"
+        f", latency_max = {greatest}(coalesce(check_rollups.latency_max, excluded.latency_max), "
+        "coalesce(excluded.latency_max, check_rollups.latency_max))"
+    )
+    for granularity in ('minute', 'hour', 'day'):
+        bucket = truncate[granularity].format('bucket_start')
+        # The earliest hour and day already have rollups from after the
+        # switch-over, hence the additive upsert. "WHERE true" keeps
+        # SQLite's parser from reading ON CONFLICT as a join constraint.
+        op.execute(
+            f"INSERT INTO check_rollups (service_id, granularity, bucket_start, {columns}, latency_min, latency_max) "
+            f"SELECT service_id, '{granularity}', {bucket}, "
+            + ", ".join(f"sum({column})" for column in counters)
+            + ", min(latency_min), max(latency_max) "
+            f"FROM rollup_backfill WHERE true GROUP BY service_id, {bucket} "
+            "ON CONFLICT (service_id, granularity, bucket_start) DO UPDATE SET " + update
+        )
+    op.execute("DROP TABLE rollup_backfill")
+
+
+def downgrade() -> None:
+    # Backfilled and incrementally maintained rollups can't be told apart;
+    # leaving them in place is harmless
+    pass
@@ -7,12 +7,15 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr, ConfigDict
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import Service, AlertState
 from app.config import settings
-from app.alerts import send_alert_email
+from app.alerts import invalidate_alert_recipients, send_alert_email
+from app.smtp_pool import smtp_pool
+from app.status_store import load_statuses
 
 
 logger = logging.getLogger(__name__)
@@ -102,7 +105,6 @@ def send_test_alert(payload: TestAlertRequest):
     
     try:
         # Temporarily override alert recipients for test
-        import smtplib
         from email.mime.text import MIMEText
         from email.mime.multipart import MIMEMultipart
         
@@ -130,11 +132,7 @@ def send_test_alert(payload: TestAlertRequest):
         html_part = MIMEText(body, 'html')
         msg.attach(html_part)
         
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            if settings.SMTP_USER and settings.SMTP_PASSWORD:
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
+        smtp_pool.send(msg)
         
         logger.info("Test alert sent to %s", payload.email)
         return {"message": f"Test alert sent to {payload.email}"}
@@ -150,11 +148,17 @@ def send_test_alert(payload: TestAlertRequest):
 @router.get("/status")
 def get_alert_status(db: Session = Depends(get_db)):
     """Get overall alert system status."""
-    total_services = db.query(Service).count()
-    alert_states = db.query(AlertState).all()
-    
-    down_services = sum(1 for state in alert_states if state.last_status == "DOWN")
-    services_with_failures = sum(1 for state in alert_states if state.failure_count > 0)
+    total_services = db.query(func.count(Service.id)).scalar()
+    # Latest status per service from Redis (or rebuilt from the DB)
+    statuses = load_statuses(db).values()
+
+    # Confirmed DOWN, as alerted; a single failed probe pending confirmation
+    # isn't counted. Entries written before alert_status existed fall back
+    # to the latest probe until the service's next check.
+    down_services = sum(
+        1 for entry in statuses if entry.get("alert_status", entry["status"]) == "DOWN"
+    )
+    services_with_failures = sum(1 for entry in statuses if entry["failure_count"] > 0)
     
     return {
         "enabled": settings.ENABLE_EMAIL_ALERTS,
@@ -190,6 +194,8 @@ def update_alert_recipients(payload: UpdateAlertRecipientsRequest, db: Session =
     
     db.commit()
     db.refresh(setting)
+    # Every process reloads recipients on its next alert
+    invalidate_alert_recipients()
     
     logger.info("Alert recipients updated: %s", emails_str)
     
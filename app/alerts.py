@@ -1,19 +1,40 @@
 """
 alerts.py — Email alerting for service downtime.
+
+Alerts are not sent on the check path. A transition that calls for an
+email is recorded as an AlertDelivery row, keyed by the check that caused
+it, and handed to the deliver_alert task on the ALERT_QUEUE Celery queue
+(see enqueue_alert). A slow or unreachable SMTP server then only delays
+the alert workers, and a failed send is retried with exponential backoff
+instead of being lost. Deliveries whose task never got queued (broker
+down, process killed after the commit) are picked up again by the
+redispatch_pending_alerts Beat task (see redispatch_pending).
+
+Recipients are resolved once per process and cached (RecipientsCache).
+Each process compares its copy against a version counter in Redis, which
+POST /api/v1/alerts/recipients bumps, so an incident's alert fan-out
+costs no DB queries and a change is still picked up on the next alert.
 """
 import logging
-import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
 
 from app.config import settings
+from app.redis_client import get_redis
+from app.smtp_pool import smtp_pool
 
 
 logger = logging.getLogger(__name__)
 
 
-def get_alert_recipients(db):
+RECIPIENTS_VERSION_KEY = "sla:alert_recipients:version"
+
+
+def load_alert_recipients(db):
     """
     Get alert recipients from database if configured, otherwise use .env settings.
     """
@@ -35,39 +56,96 @@ def get_alert_recipients(db):
     return []
 
 
-def send_alert_email(service_name: str, service_url: str, status: str, failure_count: int, db=None):
+class RecipientsCache:
     """
-    Send an email alert when a service goes down or recovers.
-    
-    Args:
-        service_name: Name of the service
-        service_url: URL being monitored
-        status: Current status (UP/DOWN)
-        failure_count: Number of consecutive failures
+    Process-local copy of the resolved recipients, tagged with the Redis
+    version counter it was loaded under.
+
+    Each lookup costs one Redis GET; the DB is only read when the version
+    has moved. If Redis is unreachable the copy is trusted for
+    RECIPIENTS_CACHE_TTL_SECONDS instead.
     """
-    if not settings.ENABLE_EMAIL_ALERTS:
-        logger.debug("Email alerts disabled, skipping")
-        return
-    
-    if not settings.SMTP_HOST or not settings.ALERT_TO_EMAILS:
-        logger.warning("Email alerts enabled but SMTP not configured")
-        return
-    
-    # Get recipients (dynamic from DB or fallback to .env)
-    if db:
-        to_emails = get_alert_recipients(db)
-    else:
-        to_emails = [email.strip() for email in settings.ALERT_TO_EMAILS.split(",")]
-    
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recipients = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _current_version(self):
+        try:
+            return int(get_redis().get(RECIPIENTS_VERSION_KEY) or 0)
+        except Exception as exc:
+            logger.warning("Recipients version unavailable from Redis: %s", exc)
+            return None
+
+    def get(self, db) -> list:
+        if not settings.RECIPIENTS_CACHE_ENABLED:
+            return load_alert_recipients(db)
+
+        # Read the version before the DB: an update landing in between
+        # bumps it again, so the next lookup reloads
+        version = self._current_version()
+        with self._lock:
+            if self._recipients is not None:
+                if version is not None and version == self._version:
+                    return list(self._recipients)
+                if version is None and (
+                    time.monotonic() - self._loaded_at < settings.RECIPIENTS_CACHE_TTL_SECONDS
+                ):
+                    return list(self._recipients)
+
+        recipients = load_alert_recipients(db)
+        with self._lock:
+            self._recipients = recipients
+            self._version = version
+            self._loaded_at = time.monotonic()
+        return list(recipients)
+
+    def invalidate(self):
+        """Drop this process's copy and tell every other process to reload."""
+        with self._lock:
+            self._recipients = None
+        if not settings.RECIPIENTS_CACHE_ENABLED:
+            return
+        try:
+            get_redis().incr(RECIPIENTS_VERSION_KEY)
+        except Exception as exc:
+            logger.warning(
+                "Failed to bump recipients version, other processes may send to "
+                "old recipients for up to %ss: %s",
+                settings.RECIPIENTS_CACHE_TTL_SECONDS,
+                exc,
+            )
+
+
+# Per-process cache behind get_alert_recipients
+recipients_cache = RecipientsCache()
+
+
+def get_alert_recipients(db):
+    """Alert recipients (from the DB, else .env), cached per process."""
+    return recipients_cache.get(db)
+
+
+def invalidate_alert_recipients():
+    """Call after changing the recipients setting."""
+    recipients_cache.invalidate()
+
+
+def build_alert_message(service_name: str, service_url: str, status: str, failure_count: int, to_emails) -> MIMEMultipart:
+    """The alert email for one service going DOWN or recovering."""
     subject = f"🚨 ALERT: {service_name} is {status}"
     if status == "UP":
         subject = f"✅ RECOVERED: {service_name} is back online"
+    elif status == "FLAPPING":
+        subject = f"⚠️ FLAPPING: {service_name} keeps going up and down"
     
     body = f"""
     <html>
     <body style="font-family: Arial, sans-serif; color: #333;">
-        <h2 style="color: {'#f43f5e' if status == 'DOWN' else '#10b981'};">
-            {'⚠️ Service Down' if status == 'DOWN' else '✅ Service Recovered'}
+        <h2 style="color: {'#10b981' if status == 'UP' else '#f43f5e'};">
+            {'⚠️ Service Down' if status == 'DOWN' else '✅ Service Recovered' if status == 'UP' else '⚠️ Service Flapping'}
         </h2>
         <p><strong>Service:</strong> {service_name}</p>
         <p><strong>URL:</strong> <a href="{service_url}">{service_url}</a></p>
@@ -82,28 +160,324 @@ def send_alert_email(service_name: str, service_url: str, status: str, failure_c
     </html>
     """
     
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = settings.ALERT_FROM_EMAIL
+    msg['To'] = ", ".join(to_emails)
+    
+    html_part = MIMEText(body, 'html')
+    msg.attach(html_part)
+    return msg
+
+
+def alerts_configured() -> bool:
+    """Whether alert emails can go out at all; logs why not."""
+    if not settings.ENABLE_EMAIL_ALERTS:
+        logger.debug("Email alerts disabled, skipping")
+        return False
+    
+    if not settings.SMTP_HOST or not settings.ALERT_TO_EMAILS:
+        logger.warning("Email alerts enabled but SMTP not configured")
+        return False
+    return True
+
+
+def alert_recipients(db=None):
+    """Recipients from the DB if a session is given, else from .env."""
+    if db:
+        return get_alert_recipients(db)
+    return [email.strip() for email in settings.ALERT_TO_EMAILS.split(",")]
+
+
+def send_alert_email(
+    service_name: str,
+    service_url: str,
+    status: str,
+    failure_count: int,
+    db=None,
+    raise_errors: bool = False,
+) -> bool:
+    """
+    Send an email alert when a service goes down or recovers, over the
+    pooled SMTP session (see smtp_pool.py).
+    
+    Args:
+        service_name: Name of the service
+        service_url: URL being monitored
+        status: Current status (UP/DOWN)
+        failure_count: Number of consecutive failures
+        raise_errors: re-raise SMTP errors (for retrying callers) instead
+            of only logging them
+
+    Returns:
+        True if the email was sent, False if alerting is disabled or not
+        configured (or sending failed and raise_errors is False).
+    """
+    if not alerts_configured():
+        return False
+    
+    # Get recipients (dynamic from DB or fallback to .env)
+    to_emails = alert_recipients(db)
+    
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = settings.ALERT_FROM_EMAIL
-        msg['To'] = ", ".join(to_emails)
-        
-        html_part = MIMEText(body, 'html')
-        msg.attach(html_part)
-        
-        with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-            server.starttls()
-            if settings.SMTP_USER and settings.SMTP_PASSWORD:
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-            server.send_message(msg)
+        smtp_pool.send(build_alert_message(service_name, service_url, status, failure_count, to_emails))
         
         logger.info(
             "Alert email sent: service=%s status=%s recipients=%s",
             service_name, status, len(to_emails)
         )
+        return True
     
     except Exception as exc:
         logger.error("Failed to send alert email: %s", exc, exc_info=True)
+        if raise_errors:
+            raise
+        return False
+
+
+def alert_key(service_id: int, status: str, failure_count: int, checked_at: datetime) -> str:
+    """Idempotency key of an alert: the service, the alert and the check that caused it."""
+    if checked_at is not None and checked_at.tzinfo is not None:
+        # checked_at comes back from the DB as naive UTC
+        checked_at = checked_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return f"{service_id}:{status}:{failure_count}:{checked_at.isoformat() if checked_at else ''}"
+
+
+def retry_delay(retries: int) -> float:
+    """Seconds before delivery attempt `retries + 1`: doubling, capped."""
+    return min(
+        settings.ALERT_RETRY_BACKOFF_SECONDS * 2 ** retries,
+        settings.ALERT_RETRY_BACKOFF_MAX_SECONDS,
+    )
+
+
+def enqueue_alerts(db, alerts) -> list:
+    """
+    Record alerts for delivery and queue their delivery.
+
+    Call after the alert state changes are committed. Queuing the same
+    transition again (e.g. a retried check run) is a no-op. If the tasks
+    can't be queued, the deliveries stay pending for redispatch_pending();
+    that is logged, not raised, so the caller's check run carries on.
+
+    Args:
+        alerts: (service, status, failure_count, checked_at) tuples
+
+    Returns:
+        Ids of the AlertDelivery rows created (already queued ones and
+        everything, if alerting is disabled, are left out).
+    """
+    from app.database import upsert_insert
+    from app.models import AlertDelivery
+
+    if not alerts:
+        return []
+    if not settings.ENABLE_EMAIL_ALERTS:
+        logger.debug("Email alerts disabled, not queuing %d alerts", len(alerts))
+        return []
+
+    delivery_ids = []
+    for service, status, failure_count, checked_at in alerts:
+        stmt = (
+            upsert_insert(db)(AlertDelivery)
+            .values(
+                idempotency_key=alert_key(service.id, status, failure_count, checked_at),
+                service_id=service.id,
+                alert_status=status,
+                failure_count=failure_count,
+                state="pending",
+                attempts=0,
+            )
+            .on_conflict_do_nothing(index_elements=[AlertDelivery.idempotency_key])
+            .returning(AlertDelivery.id)
+        )
+        delivery_id = db.execute(stmt).scalar()
+        if delivery_id is None:
+            logger.info("%s alert for %s already queued, skipping", status, service.name)
+        else:
+            delivery_ids.append(delivery_id)
+    db.commit()
+
+    try:
+        dispatch_deliveries(delivery_ids)
+    except Exception as exc:
+        logger.error(
+            "Failed to queue %d alert deliveries, leaving them for redispatch: %s",
+            len(delivery_ids),
+            exc,
+        )
+    return delivery_ids
+
+
+def dispatch_deliveries(delivery_ids):
+    """
+    Queue delivery tasks: deliver_alert for a single alert, one
+    deliver_alerts batch (sent over one SMTP session) for several.
+    """
+    from app.tasks import deliver_alert, deliver_alerts
+
+    if len(delivery_ids) == 1:
+        deliver_alert.apply_async((delivery_ids[0],), queue=settings.ALERT_QUEUE)
+    elif delivery_ids:
+        deliver_alerts.apply_async((list(delivery_ids),), queue=settings.ALERT_QUEUE)
+
+
+def redispatch_pending(db, now: datetime = None) -> list:
+    """
+    Queue delivery again for deliveries left pending for longer than
+    ALERT_REDISPATCH_AFTER_SECONDS, i.e. whose task was never queued or
+    was lost. That is longer than the longest retry backoff, so a delivery
+    waiting on a scheduled retry isn't queued twice; each redispatched row
+    is stamped so it waits the full period again.
+
+    Returns:
+        Ids of the deliveries queued.
+    """
+    from app.models import AlertDelivery
+
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.ALERT_REDISPATCH_AFTER_SECONDS)
+    delivery_ids = [
+        delivery_id
+        for (delivery_id,) in db.query(AlertDelivery.id)
+        .filter(AlertDelivery.state == "pending", AlertDelivery.updated_at < cutoff)
+        .order_by(AlertDelivery.id)
+    ]
+    if not delivery_ids:
+        return []
+
+    # Raises if the broker is still down; the rows are then left as they
+    # were for the next run
+    dispatch_deliveries(delivery_ids)
+    db.query(AlertDelivery).filter(AlertDelivery.id.in_(delivery_ids)).update(
+        {AlertDelivery.updated_at: now}, synchronize_session=False
+    )
+    db.commit()
+    return delivery_ids
+
+
+def enqueue_alert(db, service, status: str, failure_count: int, checked_at: datetime):
+    """
+    enqueue_alerts() for a single alert.
+
+    Returns:
+        The new AlertDelivery id, or None if it was already queued or
+        alerting is disabled.
+    """
+    delivery_ids = enqueue_alerts(db, [(service, status, failure_count, checked_at)])
+    return delivery_ids[0] if delivery_ids else None
+
+
+class AlertTransition(NamedTuple):
+    """Outcome of feeding one check result into the alert state machine."""
+    last_status: str
+    failure_count: int
+    alert: Optional[str]   # "DOWN"/"UP"/"FLAPPING" if an email should go out, else None
+    changed: bool          # status flipped or flapping started/ended; stamp last_alert_at
+    recent_outcomes: str = ""  # ring buffer of recent checks, "U"/"D", newest last
+    flap_score: float = 0.0
+    flapping: bool = False
+
+
+def outcome_window() -> int:
+    """How many recent outcomes the ring buffer keeps."""
+    window = max(settings.ALERT_CONFIRM_WINDOW, settings.ALERT_RECOVERY_SUCCESSES, 1)
+    if settings.FLAP_DETECTION_ENABLED:
+        window = max(window, settings.FLAP_WINDOW)
+    return window
+
+
+def flap_score(outcomes: str) -> float:
+    """
+    Weighted share of state changes between consecutive `outcomes`, 0..1.
+
+    Newer changes weigh more (0.8 for the oldest up to 1.2 for the newest),
+    so a service that stopped flapping calms down faster.
+    """
+    changes = len(outcomes) - 1
+    if changes < 1:
+        return 0.0
+    total = flips = 0.0
+    for i in range(1, len(outcomes)):
+        weight = 0.8 + 0.4 * (i - 1) / max(changes - 1, 1)
+        total += weight
+        if outcomes[i] != outcomes[i - 1]:
+            flips += weight
+    return round(flips / total, 4)
+
+
+def evaluate_alert(
+    last_status: str,
+    failure_count: int,
+    current_status: str,
+    recent_outcomes: str = "",
+    flapping: bool = False,
+) -> AlertTransition:
+    """
+    Pure alert state machine shared by the per-check and batched write paths.
+
+    - DOWN is confirmed once ALERT_CONFIRM_FAILURES of the last
+      ALERT_CONFIRM_WINDOW checks failed (N of M);
+    - recovery needs ALERT_RECOVERY_SUCCESSES consecutive UP checks
+      (hysteresis);
+    - with FLAP_DETECTION_ENABLED, a service whose flap_score reaches
+      FLAP_HIGH_THRESHOLD is flapping until it drops below
+      FLAP_LOW_THRESHOLD. One FLAPPING alert goes out when it starts, none
+      while it lasts, and one with the settled status when it ends.
+
+    With the defaults (1 of 1, 1 success, no flap detection) this is the
+    original machine: alert on the first DOWN and the first UP after it,
+    with a reminder every 5 consecutive failures.
+
+    Args:
+        last_status: AlertState.last_status before this check
+        failure_count: AlertState.failure_count before this check
+        current_status: status of the new check ("UP"/"DOWN")
+        recent_outcomes: AlertState.recent_outcomes before this check
+        flapping: AlertState.flapping before this check
+    """
+    down = current_status == "DOWN"
+    outcomes = (recent_outcomes + ("D" if down else "U"))[-outcome_window():]
+    # Consecutive failed checks, confirmed or not
+    failure_count = failure_count + 1 if down else 0
+
+    status = last_status
+    confirm = settings.ALERT_CONFIRM_WINDOW
+    recover = settings.ALERT_RECOVERY_SUCCESSES
+    if last_status == "UP" and down and outcomes[-confirm:].count("D") >= settings.ALERT_CONFIRM_FAILURES:
+        status = "DOWN"
+    elif last_status == "DOWN" and not down and outcomes[-recover:] == "U" * recover:
+        status = "UP"
+
+    score = 0.0
+    now_flapping = False
+    if settings.FLAP_DETECTION_ENABLED:
+        score = flap_score(outcomes)
+        threshold = settings.FLAP_LOW_THRESHOLD if flapping else settings.FLAP_HIGH_THRESHOLD
+        now_flapping = score >= threshold
+
+    alert = None
+    if now_flapping and not flapping:
+        alert = "FLAPPING"
+    elif flapping and not now_flapping:
+        # Settled: report where it landed
+        alert = status
+    elif not now_flapping:
+        if status != last_status:
+            alert = status
+        elif status == "DOWN" and down and failure_count % 5 == 0:
+            # Still DOWN: reminder every 5 failures
+            alert = "DOWN"
+
+    return AlertTransition(
+        status,
+        failure_count,
+        alert,
+        status != last_status or now_flapping != flapping,
+        outcomes,
+        score,
+        now_flapping,
+    )
 
 
 def check_and_send_alert(db, service, check_result):
@@ -114,6 +488,9 @@ def check_and_send_alert(db, service, check_result):
         db: Database session
         service: Service model instance
         check_result: CheckHistory result from health check
+
+    Returns:
+        The AlertTransition that was applied.
     """
     from app.models import AlertState
     
@@ -130,56 +507,30 @@ def check_and_send_alert(db, service, check_result):
         )
         db.add(alert_state)
     
-    current_status = check_result.status
-    previous_status = alert_state.last_status
-    
-    # Service went DOWN
-    if current_status == "DOWN" and previous_status == "UP":
-        alert_state.failure_count = 1
-        alert_state.last_status = "DOWN"
-        alert_state.last_alert_at = datetime.utcnow()
-        db.commit()
-        
-        send_alert_email(
-            service.name,
-            service.url,
-            "DOWN",
-            alert_state.failure_count,
-            db
-        )
-    
-    # Service still DOWN (increment counter)
-    elif current_status == "DOWN" and previous_status == "DOWN":
-        alert_state.failure_count += 1
-        db.commit()
-        
-        # Send reminder every 5 failures
-        if alert_state.failure_count % 5 == 0:
-            send_alert_email(
-                service.name,
-                service.url,
-                "DOWN",
-                alert_state.failure_count,
-                db
-            )
-    
-    # Service RECOVERED
-    elif current_status == "UP" and previous_status == "DOWN":
-        alert_state.last_status = "UP"
-        alert_state.failure_count = 0
+    transition = evaluate_alert(
+        alert_state.last_status,
+        alert_state.failure_count or 0,
+        check_result.status,
+        alert_state.recent_outcomes or "",
+        bool(alert_state.flapping),
+    )
+
+    alert_state.last_status = transition.last_status
+    alert_state.failure_count = transition.failure_count
+    alert_state.recent_outcomes = transition.recent_outcomes
+    alert_state.flap_score = transition.flap_score
+    alert_state.flapping = transition.flapping
+    if transition.changed:
         alert_state.last_alert_at = datetime.utcnow()
-        db.commit()
-        
-        send_alert_email(
-            service.name,
-            service.url,
-            "UP",
-            0,
-            db
+    db.commit()
+
+    if transition.alert:
+        enqueue_alert(
+            db,
+            service,
+            transition.alert,
+            transition.failure_count,
+            check_result.checked_at,
         )
-    
-    # Service still UP (no alert needed)
-    else:
-        alert_state.last_status = "UP"
-        alert_state.failure_count = 0
-        db.commit()
+
+    return transition
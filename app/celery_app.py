@@ -3,6 +3,12 @@ celery_app.py — Celery application and Beat schedule configuration.
 
 WHAT CHANGED:
   - broker/backend URLs now come from config.settings
+  - the fixed 2-minute check entry is replaced by per-service intervals
+  - periodic retention run (prune_history, every RETENTION_INTERVAL_SECONDS)
+  - periodic creation of daily check_history partitions (Postgres)
+  - alert emails go to their own queue (ALERT_QUEUE); run a worker with
+    `-Q celery,alerts`, or a separate one for alerts
+  - periodic redispatch of alert deliveries stuck in "pending"
 """
 
 from celery import Celery
@@ -17,11 +23,28 @@ celery_app = Celery(
     include=["app.tasks"],
 )
 
+# Health checks are dispatched per service, each on its own interval_seconds,
+# by the heap-based scheduler (see scheduler.py). run_all_health_checks is
+# still available as an on-demand "check everything now" task.
+celery_app.conf.beat_scheduler = "app.scheduler:DueCheckScheduler"
 celery_app.conf.beat_schedule = {
-    "run-health-checks-every-2-minutes": {
-        "task": "app.tasks.run_all_health_checks",
-        "schedule": 120.0,
-    }
+    "prune-history": {
+        "task": "app.tasks.prune_history",
+        "schedule": settings.RETENTION_INTERVAL_SECONDS,
+    },
+    "ensure-history-partitions": {
+        "task": "app.tasks.ensure_history_partitions",
+        "schedule": settings.PARTITION_MAINTENANCE_SECONDS,
+    },
+    "redispatch-pending-alerts": {
+        "task": "app.tasks.redispatch_pending_alerts",
+        "schedule": settings.ALERT_REDISPATCH_INTERVAL_SECONDS,
+    },
+}
+
+celery_app.conf.task_routes = {
+    "app.tasks.deliver_alert": {"queue": settings.ALERT_QUEUE},
+    "app.tasks.deliver_alerts": {"queue": settings.ALERT_QUEUE},
 }
 
 celery_app.conf.timezone = "UTC"
\ No newline at end of file
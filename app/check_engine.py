@@ -0,0 +1,227 @@
+"""
+check_engine.py — Concurrent asyncio engine for probing many services at once.
+
+A Beat run used to walk every service serially with a blocking requests.get,
+so one run took the *sum* of all probe latencies (a few hundred dead endpoints
+at 5s each blew straight through the 120s schedule). The engine probes services
+concurrently with httpx.AsyncClient, bounded by CHECK_CONCURRENCY in-flight
+requests, so a run takes roughly the *slowest* probe instead.
+
+The engine only probes. It returns unsaved CheckHistory records; persisting
+them and evaluating alerts is done by result_writer.ResultWriter (check runs)
+or health_checks.record_check (one-off checks).
+
+Each process runs its checks on one long-lived event loop so the keep-alive
+OriginPool (http_pool.py) survives from one run to the next.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from datetime import datetime, timezone
+
+import httpx
+
+from app.config import settings
+from app.dns_cache import DNSCache
+from app.http_pool import OriginPool
+from app.models import CheckHistory
+from app.timings import PhaseTimings, current_timings
+
+
+logger = logging.getLogger(__name__)
+
+# Per-process loop + pool. Recreated after a fork (Celery prefork children)
+# and shared by every thread of the process, one run at a time.
+_lock = threading.Lock()
+_loop = None
+_pool = None
+_pid = None
+
+
+def _ensure_runtime():
+    global _loop, _pool, _pid
+    if _pid != os.getpid():
+        _loop = asyncio.new_event_loop()
+        _pool = OriginPool(dns_cache=DNSCache() if settings.DNS_CACHE_ENABLED else None)
+        _pid = os.getpid()
+    return _loop, _pool
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, check_method: str, body_limit: int, **kwargs) -> int:
+    """
+    Send the probe request and read as much of the body as `check_method` asks for.
+
+      - GET:         read the whole body (the original behaviour)
+      - GET_CAPPED:  read at most `body_limit` bytes, then drop the connection
+      - GET_HEADERS: stop as soon as the status line and headers arrive
+      - HEAD:        HEAD request, there is no body
+
+    Leaving the stream with unread body closes that connection instead of
+    returning it to the keep-alive pool, which is the point: we don't
+    download the rest.
+
+    Returns:
+        The HTTP status code.
+    """
+    method = "HEAD" if check_method == "HEAD" else "GET"
+    async with client.stream(method, url, **kwargs) as response:
+        if check_method == "GET":
+            await response.aread()
+        elif check_method == "GET_CAPPED":
+            received = 0
+            async for chunk in response.aiter_raw():
+                received += len(chunk)
+                if received >= body_limit:
+                    break
+        return response.status_code
+
+
+async def probe_service(pool: OriginPool, service, timeout_seconds: float = None) -> CheckHistory:
+    """
+    Ping `service.url` once and return an unsaved CheckHistory record.
+
+    `timeout_seconds` defaults to CHECK_TIMEOUT_SECONDS.
+
+    Never raises for network problems: timeouts, DNS failures, refused
+    connections etc. are recorded as DOWN with status_code 0.
+    """
+    # Read ORM attributes up front, before the first await
+    service_id = service.id
+    url = service.url
+    fresh_connection = service.fresh_connection
+    bypass_dns_cache = service.bypass_dns_cache
+    check_method = service.check_method or "GET"
+    body_limit = service.max_body_bytes or settings.CHECK_MAX_BODY_BYTES
+    # Waiting for a pooled connection to the same origin is not the
+    # service's fault, so only connect/read/write count against the timeout;
+    # the wait has its own, longer bound
+    timeout_seconds = timeout_seconds or settings.CHECK_TIMEOUT_SECONDS
+    timeout = httpx.Timeout(timeout_seconds, pool=settings.HTTP_POOL_WAIT_SECONDS)
+
+    # Each probe runs in its own task, so the context var is per probe
+    timings = PhaseTimings()
+    current_timings.set(timings)
+    request_kwargs = {"timeout": timeout, "extensions": {"trace": timings.trace}}
+
+    start = time.perf_counter()
+    failure_reason = None
+    pool_timed_out = False
+
+    try:
+        if fresh_connection:
+            async with pool.fresh(bypass_dns_cache) as client:
+                status_code = await _fetch(client, url, check_method, body_limit, **request_kwargs)
+        else:
+            client = pool.acquire(url, bypass_dns_cache)
+            status_code = await _fetch(client, url, check_method, body_limit, **request_kwargs)
+        status = "UP"
+
+        logger.info(
+            "Health check OK | service_id=%s url=%s status_code=%s",
+            service_id,
+            url,
+            status_code,
+        )
+
+    except httpx.PoolTimeout:
+        # Never got a connection: every one to this origin stayed busy
+        status = "DOWN"
+        status_code = 0
+        failure_reason = f"No free connection to the origin within {settings.HTTP_POOL_WAIT_SECONDS:g}s"
+        pool_timed_out = True
+
+    except httpx.TimeoutException:
+        # Service took longer than the configured timeout to respond
+        status = "DOWN"
+        status_code = 0
+        failure_reason = f"Timeout after {timeout_seconds:g}s"
+
+    except httpx.TransportError as exc:
+        # DNS failure, refused connection, etc.
+        status = "DOWN"
+        status_code = 0
+        failure_reason = f"ConnectionError: {exc}"
+
+    except Exception as exc:
+        # Catch-all for anything unexpected — still logged with detail
+        status = "DOWN"
+        status_code = 0
+        failure_reason = f"Unexpected error: {exc}"
+
+    if failure_reason:
+        logger.warning(
+            "Health check FAILED | service_id=%s url=%s reason=%s",
+            service_id,
+            url,
+            failure_reason,
+        )
+
+    # Measured from when the probe got a connection, so queueing behind other
+    # probes to the same origin doesn't count (without trace events, e.g.
+    # a mock transport, there is no queue)
+    if timings.acquired_at is not None:
+        latency = time.perf_counter() - timings.acquired_at
+    elif pool_timed_out:
+        latency = 0.0
+    else:
+        latency = time.perf_counter() - start
+
+    return CheckHistory(
+        service_id=service_id,
+        status=status,
+        status_code=status_code,
+        latency=latency,
+        checked_at=datetime.now(timezone.utc),
+        **timings.as_columns(),
+    )
+
+
+async def check_many(pool: OriginPool, services, concurrency: int = None, timeouts: dict = None) -> list:
+    """
+    Probe `services` concurrently, at most `concurrency` requests in flight.
+
+    `timeouts` optionally maps service_id -> timeout in seconds.
+
+    Returns CheckHistory records in the same order as `services`.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.CHECK_CONCURRENCY)
+    timeouts = timeouts or {}
+    await pool.evict_idle()
+
+    async def bounded(service):
+        timeout_seconds = timeouts.get(service.id)
+        async with semaphore:
+            return await probe_service(pool, service, timeout_seconds)
+
+    return await asyncio.gather(*(bounded(service) for service in services))
+
+
+def run_checks(services, concurrency: int = None, timeouts: dict = None) -> list:
+    """
+    Synchronous entry point for Celery tasks and background jobs.
+
+    Args:
+        services: Service ORM instances (must have .id and .url)
+        concurrency: max in-flight requests (defaults to CHECK_CONCURRENCY)
+        timeouts: optional {service_id: seconds}; others use CHECK_TIMEOUT_SECONDS
+
+    Returns:
+        Unsaved CheckHistory records, one per service, in input order.
+    """
+    services = list(services)
+    if not services:
+        return []
+    with _lock:
+        loop, pool = _ensure_runtime()
+        return loop.run_until_complete(check_many(pool, services, concurrency, timeouts))
+
+
+def close_pool():
+    """Close this process's pooled HTTP clients (worker shutdown, tests)."""
+    with _lock:
+        if _pid == os.getpid() and len(_pool):
+            _loop.run_until_complete(_pool.aclose())
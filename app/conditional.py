@@ -0,0 +1,74 @@
+"""
+conditional.py — ETag / Last-Modified helpers for conditional GETs.
+
+Dashboard polls mostly get back exactly what they got last time: checks
+only land every couple of minutes. Endpoints compute a cheap version token
+first (e.g. the latest check id of a service), and answer If-None-Match /
+If-Modified-Since with 304 before running the real query or serializing
+anything.
+"""
+
+import hashlib
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag from version parts (and the request parameters they cover)."""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+
+def _utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)  # stored as naive UTC
+    return value.astimezone(timezone.utc)
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(_utc(value), usegmt=True)
+
+
+def _is_fresh(request: Request, etag: str, last_modified: datetime = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since; compare weakly
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole-second precision
+        return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+    return False
+
+
+def validators(etag: str, last_modified: datetime = None) -> dict:
+    """Response headers carrying the validators."""
+    headers = {
+        "ETag": etag,
+        # Let browsers keep the body but revalidate on every poll
+        "Cache-Control": "no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+    return headers
+
+
+def not_modified(request: Request, response: Response, etag: str, last_modified: datetime = None):
+    """
+    Set the validators on `response`; return a 304 Response if the client's
+    copy is current, else None (the caller then builds the full response).
+    """
+    headers = validators(etag, last_modified)
+    if _is_fresh(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
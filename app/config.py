@@ -12,10 +12,77 @@ class Settings(BaseSettings):
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 2.0
+
+    # Live check/alert events over Redis pub/sub + SSE (see events.py)
+    EVENTS_ENABLED: bool = True
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_QUEUE_SIZE: int = 1000  # events buffered per client before dropping
+
+    # Latest status per service in a Redis hash (see status_store.py)
+    STATUS_CACHE_ENABLED: bool = True
 
     # App
     APP_ENV: str = "development"
     LOG_LEVEL: str = "INFO"
+
+    # Health checks
+    CHECK_TIMEOUT_SECONDS: float = 5.0
+    CHECK_CONCURRENCY: int = 100          # max in-flight probes per run
+    CHECK_MAX_BODY_BYTES: int = 65536     # default cap for GET_CAPPED checks
+    DEFAULT_CHECK_INTERVAL_SECONDS: int = 120
+    MIN_CHECK_INTERVAL_SECONDS: int = 10
+
+    # Adaptive per-service timeouts (see timeouts.py); "fixed" uses
+    # CHECK_TIMEOUT_SECONDS for everything
+    CHECK_TIMEOUT_MODE: str = "fixed"     # "fixed" or "adaptive"
+    ADAPTIVE_TIMEOUT_PERCENTILE: float = 0.99
+    ADAPTIVE_TIMEOUT_FACTOR: float = 3.0  # timeout = percentile latency * factor
+    ADAPTIVE_TIMEOUT_MIN_SECONDS: float = 0.5
+    ADAPTIVE_TIMEOUT_MAX_SECONDS: float = 5.0
+    ADAPTIVE_TIMEOUT_SAMPLES: int = 50      # recent UP latencies kept per service
+    ADAPTIVE_TIMEOUT_MIN_SAMPLES: int = 10  # fewer than this -> fixed timeout
+    ADAPTIVE_TIMEOUT_REFRESH_SECONDS: float = 600.0  # reload samples from history
+
+    SCHEDULER_SYNC_SECONDS: float = 60.0  # how often Beat reloads service intervals
+    SCHEDULER_JITTER_SECONDS: float = 0.0 # random delay added on top of each service's phase
+    SCHEDULER_MIN_TICK_SECONDS: float = 1.0
+    SCHEDULER_METRICS_SECONDS: float = 60.0
+
+    # Check run sharding across workers (see sharding.py)
+    CHECK_SHARD_STRATEGY: str = "range"   # "range" or "hash"
+    CHECK_SHARD_SIZE: int = 200           # services per shard ("range")
+    CHECK_SHARD_COUNT: int = 16           # ring size ("hash")
+
+    # Check results are written in bulk, one transaction per batch
+    RESULT_BATCH_SIZE: int = 500
+
+    # Retention (see retention.py); 0 keeps data forever. Raw rows are kept
+    # by default: only prune them once migration 013 has backfilled the
+    # rollups from history older than the rollups themselves
+    RAW_RETENTION_DAYS: int = 0               # raw check_history rows, e.g. 14
+    MINUTE_ROLLUP_RETENTION_DAYS: int = 30
+    HOUR_ROLLUP_RETENTION_DAYS: int = 400
+    DAY_ROLLUP_RETENTION_DAYS: int = 0
+    RETENTION_BATCH_SIZE: int = 5000          # rows per DELETE transaction
+    RETENTION_INTERVAL_SECONDS: float = 3600.0
+    # Daily check_history partitions on Postgres (see partitions.py)
+    PARTITION_PREMAKE_DAYS: int = 7
+    PARTITION_MAINTENANCE_SECONDS: float = 3600.0
+
+    # History export (see export.py): rows fetched per cursor round trip
+    EXPORT_CHUNK_SIZE: int = 5000
+
+    # In-process DNS cache for the check engine (see dns_cache.py)
+    DNS_CACHE_ENABLED: bool = True
+    DNS_CACHE_TTL_SECONDS: float = 60.0
+    DNS_NEGATIVE_TTL_SECONDS: float = 10.0  # how long failed lookups are remembered
+
+    # Keep-alive HTTP pool (one client per scheme+host+port)
+    HTTP_POOL_SIZE: int = 10                   # connections per origin
+    HTTP_POOL_KEEPALIVE_SECONDS: float = 90.0  # idle connection lifetime
+    HTTP_POOL_IDLE_SECONDS: float = 600.0      # evict an origin's client after this long unused
+    HTTP_POOL_WAIT_SECONDS: float = 30.0       # max queueing for a free connection to an origin
     
     # Email Alerting
     SMTP_HOST: str = ""
@@ -25,6 +92,34 @@ class Settings(BaseSettings):
     ALERT_FROM_EMAIL: str = ""
     ALERT_TO_EMAILS: str = ""
     ENABLE_EMAIL_ALERTS: bool = False
+    SMTP_USE_TLS: bool = True                  # STARTTLS after connecting
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    # Pooled SMTP session (see smtp_pool.py)
+    SMTP_SESSION_IDLE_SECONDS: float = 60.0    # reconnect rather than reuse after this
+    SMTP_SESSION_MAX_MESSAGES: int = 100       # messages per session before reconnecting
+    # Alert confirmation (see alerts.evaluate_alert); defaults alert on the
+    # first DOWN and the first UP after it
+    ALERT_CONFIRM_FAILURES: int = 1    # DOWN after N failed checks ...
+    ALERT_CONFIRM_WINDOW: int = 1      # ... out of the last M
+    ALERT_RECOVERY_SUCCESSES: int = 1  # consecutive UP checks to recover
+    FLAP_DETECTION_ENABLED: bool = False
+    FLAP_WINDOW: int = 21              # outcomes the flap score looks at
+    FLAP_HIGH_THRESHOLD: float = 0.5   # start flapping at this score ...
+    FLAP_LOW_THRESHOLD: float = 0.25   # ... stop below this one
+    # Resolved recipients cached per process, invalidated through a Redis
+    # version counter; the TTL only applies while Redis is unreachable
+    RECIPIENTS_CACHE_ENABLED: bool = True
+    RECIPIENTS_CACHE_TTL_SECONDS: float = 60.0
+    # Alert emails are delivered by a Celery task on their own queue,
+    # retried with exponential backoff (see alerts.enqueue_alert)
+    ALERT_QUEUE: str = "alerts"
+    ALERT_MAX_RETRIES: int = 8
+    ALERT_RETRY_BACKOFF_SECONDS: float = 30.0
+    ALERT_RETRY_BACKOFF_MAX_SECONDS: float = 1800.0
+    # Pending deliveries older than this are queued again (their task was
+    # lost); keep it above ALERT_RETRY_BACKOFF_MAX_SECONDS
+    ALERT_REDISPATCH_AFTER_SECONDS: float = 3600.0
+    ALERT_REDISPATCH_INTERVAL_SECONDS: float = 300.0
 
     @property
     def DATABASE_URL(self) -> str:
@@ -0,0 +1,137 @@
+"""
+dashboard.py — Everything the dashboard shows, for a page of services at once.
+
+Every ServiceCard used to poll /services/{id}/history on its own, so 500
+services meant 500 requests and 500 queries per poll cycle per browser.
+load_page() builds the whole page with three queries, however many
+services are on it:
+
+  1. the page of services (keyset on id)
+  2. the last `history` checks of each, newest first
+  3. 24h uptime / average UP latency / check count from the hour rollups
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, true
+
+from app.models import CheckHistory, CheckRollup, Service
+from app.rollups import bucket_start
+
+
+SUMMARY_WINDOW = timedelta(hours=24)
+
+
+def recent_history(db, service_ids, limit: int) -> dict:
+    """{service_id: [recent checks, newest first]} in one query."""
+    if not service_ids or not limit:
+        return {service_id: [] for service_id in service_ids}
+
+    columns = (
+        CheckHistory.status,
+        CheckHistory.status_code,
+        CheckHistory.latency,
+        CheckHistory.checked_at,
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # One index range scan of (service_id, checked_at) per service
+        recent = (
+            select(*columns)
+            .where(CheckHistory.service_id == Service.id)
+            .order_by(CheckHistory.checked_at.desc(), CheckHistory.id.desc())
+            .limit(limit)
+            .lateral()
+        )
+        query = (
+            select(Service.id, *recent.c)
+            .select_from(Service)
+            .join(recent, true())
+            .where(Service.id.in_(service_ids))
+        )
+    else:
+        ranked = (
+            select(
+                CheckHistory.service_id,
+                *columns,
+                func.row_number().over(
+                    partition_by=CheckHistory.service_id,
+                    order_by=(CheckHistory.checked_at.desc(), CheckHistory.id.desc()),
+                ).label("rank"),
+            )
+            .where(CheckHistory.service_id.in_(service_ids))
+            .subquery()
+        )
+        query = (
+            select(ranked.c.service_id, ranked.c.status, ranked.c.status_code, ranked.c.latency, ranked.c.checked_at)
+            .where(ranked.c.rank <= limit)
+            .order_by(ranked.c.service_id, ranked.c.rank)
+        )
+
+    history = {service_id: [] for service_id in service_ids}
+    for service_id, status, status_code, latency, checked_at in db.execute(query):
+        history[service_id].append({
+            "status": status,
+            "status_code": status_code,
+            "latency": latency,
+            "checked_at": checked_at,
+        })
+    for checks in history.values():
+        checks.sort(key=lambda check: check["checked_at"], reverse=True)
+    return history
+
+
+def _summaries(db, service_ids, now: datetime) -> dict:
+    """{service_id: (check_count, up_count, latency_sum)} over SUMMARY_WINDOW."""
+    rows = (
+        db.query(
+            CheckRollup.service_id,
+            func.sum(CheckRollup.check_count),
+            func.sum(CheckRollup.up_count),
+            func.sum(CheckRollup.latency_sum),
+        )
+        .filter(
+            CheckRollup.service_id.in_(service_ids),
+            CheckRollup.granularity == "hour",
+            CheckRollup.bucket_start >= bucket_start(now - SUMMARY_WINDOW, "hour"),
+        )
+        .group_by(CheckRollup.service_id)
+    )
+    return {service_id: (count, up, latency_sum) for service_id, count, up, latency_sum in rows}
+
+
+def load_page(db, limit: int, after_id: int = 0, service_ids=None, history: int = 50, now: datetime = None) -> dict:
+    """
+    Dashboard data for up to `limit` services with id > `after_id`
+    (optionally only `service_ids`).
+
+    Returns:
+        {"services": [...], "next_after_id": id or None}
+    """
+    now = now or datetime.utcnow()
+
+    query = db.query(Service).filter(Service.id > after_id)
+    if service_ids is not None:
+        query = query.filter(Service.id.in_(service_ids))
+    services = query.order_by(Service.id).limit(limit).all()
+
+    ids = [service.id for service in services]
+    recent = recent_history(db, ids, history)
+    summaries = _summaries(db, ids, now) if ids else {}
+
+    items = []
+    for service in services:
+        checks = recent[service.id]
+        count, up, latency_sum = summaries.get(service.id, (0, 0, 0.0))
+        items.append({
+            "service": service,
+            "latest": checks[0] if checks else None,
+            "check_count_24h": count or 0,
+            "uptime_pct_24h": round(up / count * 100, 2) if count else None,
+            "avg_latency_ms_24h": round(latency_sum / up * 1000, 1) if up else None,
+            "recent": checks,
+        })
+
+    return {
+        "services": items,
+        "next_after_id": ids[-1] if len(ids) == limit else None,
+    }
@@ -13,4 +13,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def upsert_insert(db):
+    """
+    Return the dialect's `insert` construct, which supports ON CONFLICT upserts.
+
+    Postgres in production, SQLite in tests; both speak ON CONFLICT.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
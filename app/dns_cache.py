@@ -0,0 +1,133 @@
+"""
+dns_cache.py — In-process DNS cache for the check engine.
+
+Every new connection used to trigger a fresh system lookup, which added
+resolver latency to the stored `latency` and sent thousands of identical
+queries per run. DNSCache keeps answers for DNS_CACHE_TTL_SECONDS and
+failures (NXDOMAIN, resolver errors) for DNS_NEGATIVE_TTL_SECONDS, and
+coalesces concurrent lookups of the same host into one query.
+
+getaddrinfo() doesn't expose record TTLs, so the TTLs are configured rather
+than taken from the answer.
+
+CachingNetworkBackend plugs the cache into httpx/httpcore: it resolves the
+host itself and connects to the resulting IPs, while TLS SNI and the Host
+header still use the original hostname. Services with `bypass_dns_cache`
+set use the default backend and pay for a real lookup on every new
+connection.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+
+import httpcore
+
+from app.config import settings
+from app.timings import current_timings
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _system_resolve(host: str, port: int) -> list:
+    """Resolve `host` to a de-duplicated list of IP addresses via getaddrinfo."""
+    infos = await asyncio.get_running_loop().getaddrinfo(
+        host, port, type=socket.SOCK_STREAM
+    )
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+
+class DNSCache:
+    """TTL cache of host -> IP addresses, with negative caching."""
+
+    def __init__(self, ttl: float = None, negative_ttl: float = None, resolver=None):
+        self.ttl = settings.DNS_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.negative_ttl = (
+            settings.DNS_NEGATIVE_TTL_SECONDS if negative_ttl is None else negative_ttl
+        )
+        self._resolver = resolver or _system_resolve
+        self._entries = {}   # host -> (expires_at, addresses or OSError)
+        self._inflight = {}  # host -> Future shared by concurrent lookups
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def resolve(self, host: str, port: int) -> list:
+        """
+        Return IP addresses for `host`, from cache when fresh.
+
+        Raises:
+            OSError (usually socket.gaierror): the lookup failed, now or
+            within the last `negative_ttl` seconds.
+        """
+        entry = self._entries.get(host)
+        if entry is not None and entry[0] > time.monotonic():
+            if isinstance(entry[1], OSError):
+                raise entry[1]
+            return entry[1]
+
+        future = self._inflight.get(host)
+        if future is None:
+            future = asyncio.ensure_future(self._lookup(host, port))
+            self._inflight[host] = future
+            future.add_done_callback(lambda _: self._inflight.pop(host, None))
+        return await asyncio.shield(future)
+
+    async def _lookup(self, host: str, port: int) -> list:
+        try:
+            addresses = await self._resolver(host, port)
+        except OSError as exc:
+            logger.debug("DNS lookup failed for %s: %s", host, exc)
+            self._entries[host] = (time.monotonic() + self.negative_ttl, exc)
+            raise
+        self._entries[host] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+
+class CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that resolves hostnames through a DNSCache."""
+
+    def __init__(self, cache: DNSCache, backend: httpcore.AsyncNetworkBackend = None):
+        self.cache = cache
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            ipaddress.ip_address(host)
+            addresses = [host]
+        except ValueError:
+            started = time.perf_counter()
+            try:
+                addresses = await asyncio.wait_for(self.cache.resolve(host, port), timeout)
+            except asyncio.TimeoutError:
+                raise httpcore.ConnectTimeout(f"DNS lookup for {host} timed out")
+            except OSError as exc:
+                raise httpcore.ConnectError(str(exc))
+            finally:
+                timings = current_timings.get()
+                if timings is not None:
+                    timings.record_dns(time.perf_counter() - started)
+
+        # Try each address in turn, like the system connect would
+        for address in addresses[:-1]:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout, local_address, socket_options
+                )
+            except httpcore.ConnectError:
+                continue
+        return await self._backend.connect_tcp(
+            addresses[-1], port, timeout, local_address, socket_options
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
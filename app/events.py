@@ -0,0 +1,159 @@
+"""
+events.py — Live check results and alert transitions, fanned out via Redis.
+
+The dashboard only learnt about new results by polling, so it was always
+up to 30s stale while sending requests that mostly changed nothing. Now:
+
+  - Writers (ResultWriter, record_check) publish every new check result
+    and every alert status flip to the Redis channel EVENTS_CHANNEL, one
+    message per committed batch. Publishing is best-effort: if Redis is
+    down the results are still stored, the live view just misses them.
+  - Each API process runs one EventHub: a single Redis subscription whose
+    events are copied into a bounded asyncio.Queue per connected client,
+    so any number of API replicas can serve any number of SSE clients.
+  - GET /api/v1/stream (routes.py) turns a client's queue into a
+    Server-Sent Events stream.
+"""
+
+import asyncio
+import json
+import logging
+
+from datetime import datetime
+
+from app.config import settings
+from app.redis_client import get_async_redis, get_redis
+
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "sla:events"
+
+
+def check_event(record) -> dict:
+    checked_at = record.checked_at
+    return {
+        "type": "check",
+        "service_id": record.service_id,
+        "status": record.status,
+        "status_code": record.status_code,
+        "latency": record.latency,
+        "checked_at": checked_at.isoformat() if isinstance(checked_at, datetime) else checked_at,
+    }
+
+
+def alert_event(service_id: int, transition) -> dict:
+    return {
+        "type": "alert",
+        "service_id": service_id,
+        "status": transition.last_status,
+        "failure_count": transition.failure_count,
+        "flapping": transition.flapping,
+    }
+
+
+def publish_events(events: list):
+    """Publish `events` as one message. Never raises."""
+    if not events or not settings.EVENTS_ENABLED:
+        return
+    try:
+        get_redis().publish(EVENTS_CHANNEL, json.dumps(events))
+    except Exception as exc:
+        logger.warning("Failed to publish %d live events: %s", len(events), exc)
+
+
+def format_sse(event: dict) -> str:
+    """One Server-Sent Events frame; the event name is the event's type."""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+class EventHub:
+    """One Redis subscription per process, fanned out to per-client queues."""
+
+    def __init__(self, redis_factory=None, queue_size: int = None):
+        self._redis_factory = redis_factory or get_async_redis
+        self.queue_size = queue_size or settings.SSE_QUEUE_SIZE
+        self._queues = set()
+        self._task = None
+
+    def __len__(self):
+        return len(self._queues)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a client queue, starting the Redis listener if needed."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._queues.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._listen())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.discard(queue)
+
+    def dispatch(self, message):
+        """Copy one published message's events into every client queue."""
+        try:
+            events = json.loads(message)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring malformed live event message")
+            return
+        for queue in self._queues:
+            for event in events:
+                if queue.full():
+                    # Slow client: drop its oldest event rather than block everyone
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def _listen(self):
+        while self._queues:
+            client = self._redis_factory()
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(EVENTS_CHANNEL)
+                    while self._queues:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message is not None:
+                            self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Live event subscription failed, retrying: %s", exc)
+                await asyncio.sleep(1.0)
+            finally:
+                await client.aclose()
+
+    async def close(self):
+        self._queues.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+# Per-process hub used by the stream route
+hub = EventHub()
+
+
+async def stream(queue: asyncio.Queue, is_disconnected, service_ids=None, heartbeat: float = None):
+    """
+    Yield SSE frames from `queue` until `is_disconnected()` returns True.
+
+    Sends a comment line every `heartbeat` seconds of silence so proxies
+    keep the connection open and dead clients are noticed.
+    """
+    heartbeat = heartbeat or settings.SSE_HEARTBEAT_SECONDS
+    # Tell EventSource how long to wait before reconnecting
+    yield "retry: 5000\n\n"
+    while not await is_disconnected():
+        try:
+            event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+        except asyncio.TimeoutError:
+            yield ": keepalive\n\n"
+            continue
+        if service_ids is None or event.get("service_id") in service_ids:
+            yield format_sse(event)
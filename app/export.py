@@ -0,0 +1,230 @@
+"""
+export.py — Stream check history out as CSV, NDJSON or Parquet.
+
+SLA reports used to page through /services/{id}/history 500 rows at a time
+with OFFSET, re-reading every skipped row on every page. An export reads
+the requested services and time range in one ordered query through a
+server-side cursor (yield_per; psycopg2 then uses a named cursor on
+Postgres) and encodes it chunk by chunk, so memory stays constant however
+many rows there are.
+
+Used by GET /api/v1/export (routes.py) and from the command line:
+
+    python -m app.export --service 1 --service 2 \\
+        --start 2024-01-01 --end 2024-02-01 --format csv --output jan.csv
+
+Parquet needs pyarrow, which is optional; without it only CSV and NDJSON
+are offered.
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.models import CheckHistory
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+
+EXPORT_COLUMNS = (
+    "id",
+    "service_id",
+    "status",
+    "status_code",
+    "latency",
+    "dns_time",
+    "connect_time",
+    "tls_time",
+    "ttfb_time",
+    "body_time",
+    "checked_at",
+)
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def available_formats() -> list:
+    return [name for name in MEDIA_TYPES if name != "parquet" or pyarrow is not None]
+
+
+def naive_utc(value: datetime) -> datetime:
+    """checked_at is stored as naive UTC; convert aware bounds to match."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def iter_rows(db, service_ids=None, start: datetime = None, end: datetime = None, chunk_size: int = None):
+    """
+    Yield lists of up to `chunk_size` history rows (tuples in
+    EXPORT_COLUMNS order), ordered by service, then time.
+
+    `start` is inclusive and `end` exclusive; None leaves that side open.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    query = select(*(getattr(CheckHistory, column) for column in EXPORT_COLUMNS))
+    if service_ids is not None:
+        query = query.where(CheckHistory.service_id.in_(service_ids))
+    if start is not None:
+        query = query.where(CheckHistory.checked_at >= naive_utc(start))
+    if end is not None:
+        query = query.where(CheckHistory.checked_at < naive_utc(end))
+    # (service_id, checked_at, id) is ix_check_history_service_id_checked_at
+    query = query.order_by(CheckHistory.service_id, CheckHistory.checked_at, CheckHistory.id)
+
+    result = db.execute(query.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield [tuple(row) for row in partition]
+
+
+def _csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(
+            row[:-1] + (row[-1].isoformat(),) for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row[:-1] + (row[-1].isoformat(),)))) + "\n"
+            for row in rows
+        ).encode()
+
+
+class _ChunkSink:
+    """Write-only file that hands back whatever was written since last drained."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet_schema():
+    return pyarrow.schema([
+        ("id", pyarrow.int64()),
+        ("service_id", pyarrow.int64()),
+        ("status", pyarrow.string()),
+        ("status_code", pyarrow.int32()),
+        ("latency", pyarrow.float64()),
+        ("dns_time", pyarrow.float64()),
+        ("connect_time", pyarrow.float64()),
+        ("tls_time", pyarrow.float64()),
+        ("ttfb_time", pyarrow.float64()),
+        ("body_time", pyarrow.float64()),
+        ("checked_at", pyarrow.timestamp("us")),
+    ])
+
+
+def _parquet_chunks(chunks):
+    # One row group per chunk, streamed out as soon as it is encoded
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def encode(chunks, fmt: str):
+    """Encode row chunks from iter_rows() as a stream of `fmt` bytes."""
+    if fmt == "csv":
+        return _csv_chunks(chunks)
+    if fmt == "ndjson":
+        return _ndjson_chunks(chunks)
+    if fmt == "parquet":
+        if pyarrow is None:
+            raise ValueError("Parquet export requires pyarrow")
+        return _parquet_chunks(chunks)
+    raise ValueError(f"Unknown export format {fmt!r}")
+
+
+def export(db, fmt: str, service_ids=None, start: datetime = None, end: datetime = None, chunk_size: int = None):
+    """Stream history for `service_ids` in [start, end) as `fmt` bytes."""
+    return encode(iter_rows(db, service_ids, start, end, chunk_size), fmt)
+
+
+def main(argv=None):
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.export", description="Export check history.")
+    parser.add_argument("--service", type=int, action="append", dest="service_ids",
+                        help="service ID to export (repeatable; default: all services)")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="inclusive ISO start time (UTC)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="exclusive ISO end time (UTC)")
+    parser.add_argument("--format", choices=available_formats(), default="csv")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="rows fetched per round trip")
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet" and not args.output:
+        parser.error("--format parquet needs --output")
+
+    db = SessionLocal()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in export(db, args.format, args.service_ids, args.start, args.end, args.chunk_size):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
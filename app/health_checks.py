@@ -7,89 +7,69 @@ WHAT CHANGED:
     Before: you had no idea WHY a service was DOWN (timeout? DNS? refused?)
     Now: the exact exception is logged so you can diagnose real problems.
   - Added `failure_reason` local variable for log clarity.
+  - The probe itself moved to check_engine.py (asyncio + httpx) so a whole
+    run can be checked concurrently. This module now records the results.
 """
 
 import logging
-import requests
-
-from datetime import datetime, timezone
 
+from app.check_engine import run_checks
+from app.events import alert_event, check_event, publish_events
 from app.models import CheckHistory  # FIX: was wrongly imported as HealthCheck
+from app.rollups import RollupBuffer
+from app.status_store import record_statuses, status_entry
 
 
 logger = logging.getLogger(__name__)
 
 
-def check_service(db, service) -> CheckHistory:
+def record_check(db, service, record: CheckHistory) -> CheckHistory:
     """
-    Ping `service.url`, record the result in check_history, and return the record.
+    Save a probe result to check_history (and its rollups) and evaluate
+    alerts for it.
 
     Args:
         db: SQLAlchemy session
-        service: Service ORM instance (must have .id and .url)
+        service: Service ORM instance the record belongs to
+        record: unsaved CheckHistory produced by the check engine
 
     Returns:
-        The CheckHistory record that was saved.
+        The saved CheckHistory record.
     """
     from app.alerts import check_and_send_alert
-    
-    start = datetime.now(timezone.utc)
-    failure_reason = None
-
-    try:
-        response = requests.get(service.url, timeout=5)
-        status = "UP"
-        status_code = response.status_code
-
-        logger.info(
-            "Health check OK | service_id=%s url=%s status_code=%s",
-            service.id,
-            service.url,
-            status_code,
-        )
-
-    except requests.exceptions.Timeout:
-        # Service took longer than 5 seconds to respond
-        status = "DOWN"
-        status_code = 0
-        failure_reason = "Timeout after 5s"
-
-    except requests.exceptions.ConnectionError as exc:
-        # DNS failure, refused connection, etc.
-        status = "DOWN"
-        status_code = 0
-        failure_reason = f"ConnectionError: {exc}"
-
-    except Exception as exc:
-        # Catch-all for anything unexpected — still logged with detail
-        status = "DOWN"
-        status_code = 0
-        failure_reason = f"Unexpected error: {exc}"
-
-    if failure_reason:
-        logger.warning(
-            "Health check FAILED | service_id=%s url=%s reason=%s",
-            service.id,
-            service.url,
-            failure_reason,
-        )
-
-    end = datetime.now(timezone.utc)
-    latency = (end - start).total_seconds()
-
-    record = CheckHistory(
-        service_id=service.id,
-        status=status,
-        status_code=status_code,
-        latency=latency,
-        checked_at=end,
-    )
+
+    rollups = RollupBuffer()
+    rollups.add(service.id, record.status, record.latency, record.checked_at)
 
     db.add(record)
+    rollups.write(db)
     db.commit()
     db.refresh(record)
-    
+
     # Check if alert should be sent
-    check_and_send_alert(db, service, record)
+    transition = check_and_send_alert(db, service, record)
+
+    events = [check_event(record)]
+    if transition.changed:
+        events.append(alert_event(service.id, transition))
+    publish_events(events)
+    record_statuses({
+        service.id: status_entry(record, transition.failure_count, transition.last_status)
+    })
+
+    return record
 
-    return record
\ No newline at end of file
+
+def check_service(db, service) -> CheckHistory:
+    """
+    Ping `service.url`, record the result in check_history, and return the record.
+
+    Args:
+        db: SQLAlchemy session
+        service: Service ORM instance (must have .id and .url)
+
+    Returns:
+        The CheckHistory record that was saved.
+    """
+    record = run_checks([service])[0]
+    return record_check(db, service, record)
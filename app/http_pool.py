@@ -0,0 +1,133 @@
+"""
+http_pool.py — Long-lived keep-alive HTTP clients for the check engine.
+
+Every probe used to open a brand-new TCP (and TLS) connection. OriginPool keeps
+one httpx.AsyncClient per origin (scheme + host + port) for the life of the
+worker process, so repeat probes of the same origin reuse a warm connection.
+
+  - HTTP_POOL_SIZE caps the connections held per origin.
+  - HTTP_POOL_KEEPALIVE_SECONDS is how long an idle *connection* stays open.
+  - HTTP_POOL_IDLE_SECONDS is how long an unused *origin* keeps its client
+    before evict_idle() closes it.
+  - HTTP_POOL_WAIT_SECONDS is how long a probe may queue for one of its
+    origin's connections (check_engine.probe_service).
+
+Services with `fresh_connection` set bypass the pool and get a throwaway client,
+so their latency always includes the cold connect.
+
+New connections resolve hostnames through the pool's DNSCache (dns_cache.py)
+unless the service sets `bypass_dns_cache`; those get their own client per
+origin that uses the system resolver.
+
+Clients are bound to the event loop they were created on; check_engine owns the
+one loop per process that the pool lives on.
+"""
+
+import contextlib
+import functools
+import logging
+import time
+
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+
+from app.config import settings
+from app.dns_cache import CachingNetworkBackend, DNSCache
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+@functools.lru_cache(maxsize=1)
+def _ssl_context():
+    """One SSL context (CA bundle loaded once) shared by every client."""
+    return httpx.create_ssl_context()
+
+
+def _build_transport(dns_cache: DNSCache = None) -> httpx.AsyncBaseTransport:
+    """
+    Transport for one origin's client. Tests patch this with httpx.MockTransport.
+
+    With `dns_cache`, new connections resolve through the cache.
+    """
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_POOL_SIZE,
+        max_keepalive_connections=settings.HTTP_POOL_SIZE,
+        keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_SECONDS,
+    )
+    transport = httpx.AsyncHTTPTransport(verify=_ssl_context(), limits=limits)
+    if dns_cache is not None:
+        # httpx has no public hook for a custom network backend, so swap in
+        # an equivalent httpcore pool that resolves through the cache
+        transport._pool = httpcore.AsyncConnectionPool(
+            ssl_context=_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=CachingNetworkBackend(dns_cache),
+        )
+    return transport
+
+
+def _build_client(dns_cache: DNSCache = None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=_build_transport(dns_cache), follow_redirects=True)
+
+
+def origin_of(url: str) -> tuple:
+    """Return the (scheme, host, port) pool key for `url`."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    return scheme, (parts.hostname or "").lower(), parts.port or _DEFAULT_PORTS.get(scheme)
+
+
+class OriginPool:
+    """One keep-alive AsyncClient per origin, evicted after sitting idle."""
+
+    def __init__(self, idle_seconds: float = None, dns_cache: DNSCache = None):
+        self.idle_seconds = idle_seconds or settings.HTTP_POOL_IDLE_SECONDS
+        self.dns_cache = dns_cache
+        self._clients = {}    # (origin, bypass_dns_cache) -> AsyncClient
+        self._last_used = {}  # same key -> time.monotonic() of last acquire
+
+    def __len__(self):
+        return len(self._clients)
+
+    def _dns_cache_for(self, bypass_dns_cache: bool):
+        return None if bypass_dns_cache else self.dns_cache
+
+    def acquire(self, url: str, bypass_dns_cache: bool = False) -> httpx.AsyncClient:
+        """Return the shared client for `url`'s origin, creating it on first use."""
+        key = (origin_of(url), bool(bypass_dns_cache))
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = _build_client(self._dns_cache_for(bypass_dns_cache))
+        self._last_used[key] = time.monotonic()
+        return client
+
+    @contextlib.asynccontextmanager
+    async def fresh(self, bypass_dns_cache: bool = False):
+        """A throwaway client whose connection is closed after the probe."""
+        async with _build_client(self._dns_cache_for(bypass_dns_cache)) as client:
+            yield client
+
+    async def evict_idle(self) -> int:
+        """Close clients for origins unused for `idle_seconds`. Returns how many."""
+        cutoff = time.monotonic() - self.idle_seconds
+        stale = [key for key, used in self._last_used.items() if used < cutoff]
+        for key in stale:
+            del self._last_used[key]
+            await self._clients.pop(key).aclose()
+        if stale:
+            logger.debug("Evicted %d idle HTTP pool origins", len(stale))
+        return len(stale)
+
+    async def aclose(self):
+        """Close every pooled client."""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        self._last_used.clear()
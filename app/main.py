@@ -17,6 +17,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.database import Base, engine
+from app.events import hub
 from app.routes import router
 from app.alert_routes import router as alert_router
 
@@ -70,6 +71,7 @@ async def lifespan(app: FastAPI):
     logger.info("Application startup complete.")
     yield
     logger.info("Shutting down SLA Monitor")
+    await hub.close()
 
 
 # -----------------------------------------------------------------------
@@ -80,7 +82,7 @@ app = FastAPI(
     title="SLA Monitor",
     description=(
         "Monitors external services for uptime and latency. "
-        "Celery Beat pings registered URLs every 2 minutes and stores results."
+        "Celery Beat pings each registered URL on its own interval and stores results."
     ),
     version="0.1.0",
     lifespan=lifespan,
@@ -96,6 +98,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # History pages carry their cursor in a header browsers must be allowed to read
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(router)
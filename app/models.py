@@ -8,9 +8,10 @@ WHAT CHANGED:
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 
+from app.config import settings
 from app.database import Base
 
 
@@ -20,6 +21,20 @@ class Service(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     url = Column(String, nullable=False)
+    # Skip the keep-alive pool so every probe pays (and measures) a cold connect
+    fresh_connection = Column(Boolean, nullable=False, default=False)
+    # Resolve with the system resolver on every new connection, so latency
+    # includes DNS time
+    bypass_dns_cache = Column(Boolean, nullable=False, default=False)
+    # How much of the response to fetch: GET (whole body), GET_CAPPED
+    # (max_body_bytes), GET_HEADERS (status line + headers) or HEAD
+    check_method = Column(String, nullable=False, default="GET")
+    max_body_bytes = Column(Integer, nullable=True)  # NULL = CHECK_MAX_BODY_BYTES
+    interval_seconds = Column(
+        Integer,
+        nullable=False,
+        default=lambda: settings.DEFAULT_CHECK_INTERVAL_SECONDS,
+    )
     created_at = Column(
         DateTime,
         default=lambda: datetime.now(timezone.utc),
@@ -42,9 +57,18 @@ class Service(Base):
 
 
 class CheckHistory(Base):
+    # On Postgres this table is range-partitioned by day on checked_at
+    # (migration 010, partitions.py) and its real primary key is
+    # (id, checked_at). id is still unique, so the ORM keeps using it alone.
+    # There is no separate index on id: the primary key's index covers it.
     __tablename__ = "check_history"
+    __table_args__ = (
+        # Serves "latest N checks for a service" and keyset pagination
+        # (checked_at, id) without scanning or sorting the table
+        Index("ix_check_history_service_id_checked_at", "service_id", "checked_at", "id"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     service_id = Column(
         Integer,
         ForeignKey("services.id", ondelete="CASCADE"),
@@ -53,6 +77,13 @@ class CheckHistory(Base):
     status = Column(String, nullable=False)       # "UP" or "DOWN"
     status_code = Column(Integer, nullable=False)  # HTTP code, or 0 on timeout
     latency = Column(Float, nullable=False)        # seconds
+    # Phase breakdown of `latency` (seconds); NULL when the phase didn't
+    # happen, e.g. no DNS/connect/TLS on a reused keep-alive connection
+    dns_time = Column(Float, nullable=True)
+    connect_time = Column(Float, nullable=True)
+    tls_time = Column(Float, nullable=True)
+    ttfb_time = Column(Float, nullable=True)
+    body_time = Column(Float, nullable=True)
     checked_at = Column(
         DateTime,
         default=lambda: datetime.now(timezone.utc),
@@ -67,6 +98,59 @@ class CheckHistory(Base):
         )
 
 
+# Upper bounds (seconds) of the CheckRollup latency histogram columns; a
+# check counts in the first bucket whose bound it doesn't exceed, or gt_10s
+LATENCY_BUCKETS = (
+    ("le_50ms", 0.05),
+    ("le_100ms", 0.1),
+    ("le_250ms", 0.25),
+    ("le_500ms", 0.5),
+    ("le_1s", 1.0),
+    ("le_2500ms", 2.5),
+    ("le_5s", 5.0),
+    ("le_10s", 10.0),
+)
+LATENCY_OVERFLOW_BUCKET = "gt_10s"
+
+
+class CheckRollup(Base):
+    """
+    Per-service aggregate of CheckHistory over one minute, hour or day.
+    Maintained incrementally by rollups.py as results are written.
+    """
+    __tablename__ = "check_rollups"
+
+    service_id = Column(
+        Integer,
+        ForeignKey("services.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    granularity = Column(String, primary_key=True)   # "minute", "hour" or "day"
+    bucket_start = Column(DateTime, primary_key=True)  # UTC
+    check_count = Column(Integer, nullable=False, default=0)
+    up_count = Column(Integer, nullable=False, default=0)
+    # Latency sum/min/max and histogram cover the up_count UP checks only
+    latency_sum = Column(Float, nullable=False, default=0.0)
+    latency_min = Column(Float, nullable=True)
+    latency_max = Column(Float, nullable=True)
+    # Latency histogram, see LATENCY_BUCKETS
+    le_50ms = Column(Integer, nullable=False, default=0)
+    le_100ms = Column(Integer, nullable=False, default=0)
+    le_250ms = Column(Integer, nullable=False, default=0)
+    le_500ms = Column(Integer, nullable=False, default=0)
+    le_1s = Column(Integer, nullable=False, default=0)
+    le_2500ms = Column(Integer, nullable=False, default=0)
+    le_5s = Column(Integer, nullable=False, default=0)
+    le_10s = Column(Integer, nullable=False, default=0)
+    gt_10s = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<CheckRollup service_id={self.service_id} {self.granularity} "
+            f"bucket_start={self.bucket_start} checks={self.check_count}>"
+        )
+
+
 class AlertState(Base):
     """
     Tracks the ongoing alert state per service.
@@ -85,6 +169,11 @@ class AlertState(Base):
     last_status = Column(String, nullable=False, default="UP")
     failure_count = Column(Integer, default=0, nullable=False)
     last_alert_at = Column(DateTime, nullable=True)
+    # Ring buffer of the latest check outcomes, "U"/"D", newest last, for
+    # N-of-M confirmation and flap detection (see alerts.evaluate_alert)
+    recent_outcomes = Column(String, nullable=False, default="", server_default="")
+    flap_score = Column(Float, nullable=False, default=0.0, server_default="0")
+    flapping = Column(Boolean, nullable=False, default=False, server_default="false")
     created_at = Column(
         DateTime,
         default=lambda: datetime.now(timezone.utc),
@@ -120,4 +209,44 @@ class AlertSettings(Base):
     )
 
     def __repr__(self):
-        return f"<AlertSettings key={self.key!r} value={self.value!r}>"
\ No newline at end of file
+        return f"<AlertSettings key={self.key!r} value={self.value!r}>"
+
+class AlertDelivery(Base):
+    """
+    One alert email to deliver, and how delivery went.
+
+    Rows are created when a transition calls for an alert and handed to the
+    deliver_alert Celery task (see alerts.enqueue_alert). idempotency_key
+    identifies the transition, so a re-run check can't queue it twice.
+    """
+    __tablename__ = "alert_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    idempotency_key = Column(String, unique=True, nullable=False)
+    service_id = Column(
+        Integer,
+        ForeignKey("services.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    alert_status = Column(String, nullable=False)   # "DOWN" or "UP"
+    failure_count = Column(Integer, nullable=False, default=0)
+    state = Column(String, nullable=False, default="pending")  # pending/sent/skipped/failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+    )
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+    sent_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return (
+            f"<AlertDelivery id={self.id} service_id={self.service_id} "
+            f"alert_status={self.alert_status!r} state={self.state!r}>"
+        )
@@ -0,0 +1,217 @@
+"""
+partitions.py — Daily range partitions of check_history (Postgres only).
+
+Migration 010 turns check_history into a table partitioned by RANGE
+(checked_at), one partition per UTC day named check_history_pYYYYMMDD.
+The rows that existed at migration time stay in check_history_legacy,
+which covers everything before the first daily partition.
+
+  - ensure_partitions() creates the partitions for the next
+    PARTITION_PREMAKE_DAYS days, so inserts always land in a real daily
+    partition (the DEFAULT partition only catches stragglers).
+  - drop_expired_partitions() is how raw retention works on a partitioned
+    table: a day that is entirely past RAW_RETENTION_DAYS is dropped as a
+    whole, with no row-by-row DELETE and no bloat left behind.
+
+Rows only land in the DEFAULT partition when their day has no partition
+(e.g. Beat was down for longer than PARTITION_PREMAKE_DAYS). That is logged
+as an error on every maintenance run until it is empty again. A day's rows
+are moved out when its partition is created, since Postgres refuses to
+create it otherwise, and expired ones are deleted in batches by retention.
+
+On SQLite (tests) or an unpartitioned table every function is a no-op and
+retention.py falls back to batched deletes.
+"""
+
+import logging
+import re
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "check_history"
+LEGACY_PARTITION = "check_history_legacy"
+DEFAULT_PARTITION = "check_history_default"
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def partition_name(day: datetime) -> str:
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+
+def is_partitioned(db) -> bool:
+    """True if check_history is a partitioned table in this database."""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = current_schema()::regnamespace"
+        ),
+        {"table": PARENT_TABLE},
+    ).first() is not None
+
+
+def list_partitions(db) -> list:
+    """
+    Return [(name, upper_bound, estimated_rows)] for the range partitions,
+    oldest first. The DEFAULT partition is not included.
+    """
+    rows = db.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples "
+            "FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "WHERE parent.relname = :table AND parent.relnamespace = current_schema()::regnamespace"
+        ),
+        {"table": PARENT_TABLE},
+    )
+    partitions = []
+    for name, bound, estimated_rows in rows:
+        match = _UPPER_BOUND.search(bound or "")
+        if match is None:
+            continue  # DEFAULT
+        partitions.append((name, datetime.fromisoformat(match.group(1)), max(int(estimated_rows), 0)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def default_partition_rows(db) -> int:
+    """Rows in the DEFAULT partition (0 if there is none)."""
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() is None:
+        return 0
+    return db.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}")).scalar()
+
+
+def _create_partition(db, name: str, day: datetime, move_from_default: bool) -> int:
+    """
+    Create the partition for `day`, first moving that day's rows out of the
+    DEFAULT partition if asked to. One transaction.
+
+    Returns:
+        Rows moved.
+    """
+    start, end = day, day + timedelta(days=1)
+    moved = 0
+    if move_from_default:
+        db.execute(text(
+            f"CREATE TEMPORARY TABLE check_history_moved (LIKE {PARENT_TABLE}) ON COMMIT DROP"
+        ))
+        moved = db.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE checked_at >= :start AND checked_at < :end RETURNING *) "
+                "INSERT INTO check_history_moved SELECT * FROM moved"
+            ),
+            {"start": start, "end": end},
+        ).rowcount
+    db.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    ))
+    if moved:
+        db.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM check_history_moved"))
+    db.commit()
+    return moved
+
+
+def ensure_partitions(db, now: datetime = None, days_ahead: int = None) -> list:
+    """
+    Create any missing daily partitions from today to `days_ahead` days out.
+
+    Returns:
+        Names of the partitions created.
+    """
+    if not is_partitioned(db):
+        return []
+
+    now = now or datetime.utcnow()
+    days_ahead = settings.PARTITION_PREMAKE_DAYS if days_ahead is None else days_ahead
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    partitions = list_partitions(db)
+    existing = {name for name, _, _ in partitions}
+    # Days before this are covered by the legacy partition
+    legacy_until = next(
+        (upper for name, upper, _ in partitions if name == LEGACY_PARTITION), None
+    )
+
+    stray = default_partition_rows(db)
+    db.commit()
+    if stray:
+        logger.error(
+            "%d check_history rows are in the DEFAULT partition %s; their days have no partition",
+            stray,
+            DEFAULT_PARTITION,
+        )
+
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = partition_name(day)
+        if name in existing or (legacy_until is not None and day < legacy_until):
+            continue
+        try:
+            moved = _create_partition(db, name, day, move_from_default=bool(stray))
+            created.append(name)
+            if moved:
+                logger.warning("Moved %d rows from %s into %s", moved, DEFAULT_PARTITION, name)
+        except Exception as exc:
+            db.rollback()
+            logger.error("Failed to create partition %s: %s", name, exc)
+
+    if created:
+        logger.info("Created check_history partitions: %s", ", ".join(created))
+    return created
+
+
+def drop_expired_partitions(db, cutoff: datetime, batch_size: int = None) -> tuple:
+    """
+    Drop every range partition whose rows are all older than `cutoff`, and
+    delete rows older than `cutoff` from the DEFAULT partition, at most
+    `batch_size` per transaction.
+
+    Returns:
+        (partitions dropped, rows removed: estimated for dropped
+        partitions, exact for the DEFAULT partition)
+    """
+    if not is_partitioned(db):
+        return 0, 0
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+
+    dropped = rows = 0
+    for name, upper_bound, estimated_rows in list_partitions(db):
+        if upper_bound > cutoff:
+            break
+        db.execute(text(f'DROP TABLE "{name}"'))
+        db.commit()
+        dropped += 1
+        rows += estimated_rows
+        logger.info("Dropped check_history partition %s (~%d rows)", name, estimated_rows)
+
+    if default_partition_rows(db):
+        stray = 0
+        while True:
+            deleted = db.execute(
+                text(
+                    f"DELETE FROM {DEFAULT_PARTITION} WHERE ctid = ANY(ARRAY("
+                    f"SELECT ctid FROM {DEFAULT_PARTITION} WHERE checked_at < :cutoff LIMIT :limit))"
+                ),
+                {"cutoff": cutoff, "limit": batch_size},
+            ).rowcount
+            db.commit()
+            stray += deleted
+            if deleted < batch_size:
+                break
+        if stray:
+            logger.info("Deleted %d expired rows from %s", stray, DEFAULT_PARTITION)
+        rows += stray
+    db.commit()
+    return dropped, rows
@@ -0,0 +1,32 @@
+"""
+redis_client.py — Shared Redis clients for app features beyond Celery.
+
+Celery talks to Redis on its own; these are for live events (events.py)
+and anything else the API or workers need directly. Clients are created
+lazily, so importing this module never touches the network.
+"""
+
+import functools
+
+import redis
+import redis.asyncio
+
+from app.config import settings
+
+
+@functools.lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """Process-wide synchronous client (Celery workers, sync routes)."""
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """New asyncio client; bound to the running event loop, so not cached."""
+    return redis.asyncio.Redis.from_url(
+        settings.REDIS_URL,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+    )
@@ -0,0 +1,226 @@
+"""
+result_writer.py — Batched persistence of check results for a check run.
+
+The per-check path (health_checks.record_check) costs an INSERT + COMMIT +
+REFRESH for the CheckHistory row and another COMMIT for the AlertState, i.e.
+two transactions per probe. ResultWriter buffers both for a run and flushes
+every RESULT_BATCH_SIZE results with one bulk INSERT into check_history, one
+bulk upsert into alert_states and a single COMMIT.
+
+Alert states are loaded once per run: preload() fetches every service's
+state in one query, the writer keeps them in memory across flushes and
+evaluates transitions there, and only states that actually changed go
+into the flush's bulk upsert.
+
+Each flush also adds the batch to the minute/hour/day rollups (rollups.py)
+in the same transaction, so rollups never disagree with the raw rows.
+
+Alert emails for a batch are only queued for delivery (alerts.enqueue_alerts)
+after its commit succeeds, the same "state first, then email" order as
+check_and_send_alert. So are the live events for the batch (events.py) and
+the latest-status hash (status_store.py).
+"""
+
+import logging
+
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app.alerts import enqueue_alerts, evaluate_alert
+from app.config import settings
+from app.database import upsert_insert
+from app.events import alert_event, check_event, publish_events
+from app.models import AlertState, CheckHistory
+from app.rollups import RollupBuffer
+from app.status_store import record_statuses, status_entry
+
+
+logger = logging.getLogger(__name__)
+
+# AlertState columns besides last_status that evaluate_alert may change
+_TRACKED_COLUMNS = ("failure_count", "recent_outcomes", "flap_score", "flapping")
+
+
+class ResultWriter:
+    """Buffer CheckHistory rows and AlertState changes; flush them in bulk."""
+
+    def __init__(self, db, batch_size: int = None):
+        self.db = db
+        self.batch_size = batch_size or settings.RESULT_BATCH_SIZE
+        self._checks = []   # CheckHistory rows as dicts
+        self._states = {}   # service_id -> changed AlertState row, to upsert
+        self._known = {}    # service_id -> current alert state, kept across flushes
+        self._alerts = []   # enqueue_alerts entries, queued after commit
+        self._rollups = RollupBuffer()
+        self._events = []   # live events, published after commit
+        self._statuses = {} # service_id -> latest status, stored after commit
+        self.written = 0    # CheckHistory rows committed so far
+        self.failed = 0     # rows lost to failed flushes
+
+    def __len__(self):
+        return len(self._checks)
+
+    def preload(self, service_ids):
+        """Load the alert states of `service_ids` in one query."""
+        missing = [service_id for service_id in service_ids if service_id not in self._known]
+        if not missing:
+            return
+        rows = self.db.query(
+            AlertState.service_id,
+            AlertState.last_status,
+            AlertState.failure_count,
+            AlertState.last_alert_at,
+            AlertState.recent_outcomes,
+            AlertState.flap_score,
+            AlertState.flapping,
+        ).filter(AlertState.service_id.in_(missing))
+        for row in rows:
+            self._known[row.service_id] = {
+                "last_status": row.last_status,
+                "failure_count": row.failure_count or 0,
+                "last_alert_at": row.last_alert_at,
+                "recent_outcomes": row.recent_outcomes or "",
+                "flap_score": row.flap_score or 0.0,
+                "flapping": bool(row.flapping),
+                "stored": True,
+            }
+        for service_id in missing:
+            # No row yet: the implicit initial state, which needs writing
+            self._known.setdefault(service_id, {
+                "last_status": "UP",
+                "failure_count": 0,
+                "last_alert_at": None,
+                "recent_outcomes": "",
+                "flap_score": 0.0,
+                "flapping": False,
+                "stored": False,
+            })
+
+    def add(self, service, record: CheckHistory):
+        """Buffer one check result and its alert state change."""
+        service_id = service.id
+        if service_id not in self._known:
+            self.preload([service_id])
+        state = self._known[service_id]
+        transition = evaluate_alert(
+            state["last_status"],
+            state["failure_count"],
+            record.status,
+            state["recent_outcomes"],
+            state["flapping"],
+        )
+
+        # A steady service (same status, full buffer of the same outcome)
+        # comes out unchanged and is not rewritten
+        if transition.changed or not state["stored"] or any(
+            getattr(transition, column) != state[column] for column in _TRACKED_COLUMNS
+        ):
+            now = datetime.utcnow()
+            last_alert_at = now if transition.changed else state["last_alert_at"]
+            row = {
+                column: getattr(transition, column)
+                for column in ("last_status", *_TRACKED_COLUMNS)
+            }
+            self._known[service_id] = {**row, "last_alert_at": last_alert_at, "stored": True}
+            self._states[service_id] = {
+                "service_id": service_id,
+                **row,
+                "last_alert_at": last_alert_at,
+                "updated_at": now,
+            }
+        self._checks.append({
+            "service_id": service_id,
+            "status": record.status,
+            "status_code": record.status_code,
+            "latency": record.latency,
+            "dns_time": record.dns_time,
+            "connect_time": record.connect_time,
+            "tls_time": record.tls_time,
+            "ttfb_time": record.ttfb_time,
+            "body_time": record.body_time,
+            "checked_at": record.checked_at,
+        })
+        self._rollups.add(service_id, record.status, record.latency, record.checked_at)
+        self._events.append(check_event(record))
+        self._statuses[service_id] = status_entry(
+            record, transition.failure_count, transition.last_status
+        )
+        if transition.changed:
+            self._events.append(alert_event(service_id, transition))
+        if transition.alert:
+            self._alerts.append(
+                (service, transition.alert, transition.failure_count, record.checked_at)
+            )
+
+        if len(self._checks) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write everything buffered in one transaction, then queue its alerts.
+
+        A failed flush is logged and rolled back rather than raised, so one
+        bad batch doesn't lose the rest of the run.
+
+        Returns:
+            Number of CheckHistory rows written.
+        """
+        if not self._checks:
+            return 0
+
+        checks, states, alerts = self._checks, list(self._states.values()), self._alerts
+        rollups, events, statuses = self._rollups, self._events, self._statuses
+        self._checks, self._states, self._alerts, self._events = [], {}, [], []
+        self._statuses = {}
+        self._rollups = RollupBuffer()
+
+        try:
+            self.db.execute(insert(CheckHistory), checks)
+
+            if states:
+                stmt = upsert_insert(self.db)(AlertState).values(states)
+                self.db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[AlertState.service_id],
+                        set_={
+                            column: stmt.excluded[column]
+                            for column in (
+                                "last_status",
+                                *_TRACKED_COLUMNS,
+                                "last_alert_at",
+                                "updated_at",
+                            )
+                        },
+                    )
+                )
+            rollups.write(self.db)
+            self.db.commit()
+        except Exception as exc:
+            self.db.rollback()
+            # What's in memory for these services was never stored; reload it
+            for state in states:
+                self._known.pop(state["service_id"], None)
+            self.failed += len(checks)
+            logger.error(
+                "Failed to write batch of %d check results: %s",
+                len(checks),
+                exc,
+                exc_info=True,
+            )
+            return 0
+
+        self.written += len(checks)
+
+        logger.debug(
+            "Flushed %d check results and %d alert states", len(checks), len(states)
+        )
+
+        publish_events(events)
+        record_statuses(statuses)
+
+        # One delivery batch per flush: an outage alerting many services
+        # goes out over one SMTP session
+        enqueue_alerts(self.db, alerts)
+
+        return len(checks)
@@ -0,0 +1,127 @@
+"""
+retention.py — Prune old raw check history and rollups.
+
+check_history used to grow forever. With the rollups (rollups.py) holding
+the long-range figures, raw rows only need to live for RAW_RETENTION_DAYS;
+rollups have their own per-granularity retention (0 = keep forever).
+
+Raw retention is off by default. History from before the rollups existed
+is only summarised once migration 013 has backfilled it, so enable
+RAW_RETENTION_DAYS after that migration has run, never before.
+
+Deletes run in bounded batches: at most RETENTION_BATCH_SIZE rows per
+DELETE, each committed on its own, walking services in chunks so every
+batch is an index range scan on (service_id, checked_at / bucket_start).
+No statement holds locks or produces WAL for more than one small batch.
+
+On Postgres with check_history partitioned by day (partitions.py), raw
+retention drops whole expired partitions instead of deleting rows; only
+stray rows in the DEFAULT partition are deleted, in the same batches.
+"""
+
+import logging
+import time
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, tuple_
+
+from app.config import settings
+from app.models import CheckHistory, CheckRollup, Service
+from app.partitions import drop_expired_partitions, is_partitioned
+
+
+logger = logging.getLogger(__name__)
+
+# Services per chunk; keeps the IN lists and each batch's index range small
+SERVICE_CHUNK_SIZE = 100
+
+
+def retention_days() -> dict:
+    """{table label: days} for everything that gets pruned (0 = keep forever)."""
+    return {
+        "check_history": settings.RAW_RETENTION_DAYS,
+        "rollup_minute": settings.MINUTE_ROLLUP_RETENTION_DAYS,
+        "rollup_hour": settings.HOUR_ROLLUP_RETENTION_DAYS,
+        "rollup_day": settings.DAY_ROLLUP_RETENTION_DAYS,
+    }
+
+
+def _delete_in_batches(db, key_columns, conditions, batch_size: int) -> int:
+    """
+    Delete rows matching `conditions`, at most `batch_size` per transaction.
+
+    `key_columns` identify a row (the primary key); each batch deletes the
+    keys found by a LIMITed SELECT, so no DELETE touches more than a batch.
+    """
+    key = key_columns[0] if len(key_columns) == 1 else tuple_(*key_columns)
+    table = key_columns[0].table
+    removed = 0
+    while True:
+        batch = select(*key_columns).where(*conditions).limit(batch_size)
+        deleted = db.execute(
+            delete(table).where(key.in_(batch)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        removed += deleted
+        if deleted < batch_size:
+            return removed
+
+
+def prune(db, now: datetime = None, batch_size: int = None) -> dict:
+    """
+    Apply the retention policy.
+
+    Returns:
+        {table label: rows removed, ..., "partitions_dropped": n,
+        "elapsed": seconds}. With partitions, check_history is the
+        planner's row estimate for the dropped partitions (plus the rows
+        deleted from the DEFAULT partition).
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    policy = retention_days()
+    removed = {label: 0 for label in policy}
+    removed["partitions_dropped"] = 0
+
+    delete_raw_rows = bool(policy["check_history"])
+    if delete_raw_rows and is_partitioned(db):
+        delete_raw_rows = False
+        removed["partitions_dropped"], removed["check_history"] = drop_expired_partitions(
+            db, now - timedelta(days=policy["check_history"]), batch_size
+        )
+
+    service_ids = [service_id for (service_id,) in db.query(Service.id).order_by(Service.id)]
+    db.commit()
+
+    for i in range(0, len(service_ids), SERVICE_CHUNK_SIZE):
+        chunk = service_ids[i:i + SERVICE_CHUNK_SIZE]
+
+        if delete_raw_rows:
+            cutoff = now - timedelta(days=policy["check_history"])
+            removed["check_history"] += _delete_in_batches(
+                db,
+                [CheckHistory.id],
+                [CheckHistory.service_id.in_(chunk), CheckHistory.checked_at < cutoff],
+                batch_size,
+            )
+
+        for granularity in ("minute", "hour", "day"):
+            label = f"rollup_{granularity}"
+            if not policy[label]:
+                continue
+            cutoff = now - timedelta(days=policy[label])
+            removed[label] += _delete_in_batches(
+                db,
+                [CheckRollup.service_id, CheckRollup.granularity, CheckRollup.bucket_start],
+                [
+                    CheckRollup.service_id.in_(chunk),
+                    CheckRollup.granularity == granularity,
+                    CheckRollup.bucket_start < cutoff,
+                ],
+                batch_size,
+            )
+
+    removed["elapsed"] = round(time.perf_counter() - started, 3)
+    return removed
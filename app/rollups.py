@@ -0,0 +1,128 @@
+"""
+rollups.py — Incremental minute/hour/day rollups of check results.
+
+Uptime and latency figures used to be recomputed from raw check_history
+rows (or, on the dashboard, from the last 50 of them in the browser).
+check_rollups keeps one row per service per time bucket with the check
+count, up count, latency sum/min/max and a latency histogram, so a 30d,
+90d or 1y figure reads a few hundred rows instead of millions.
+
+The latency columns cover UP checks only: a DOWN check's latency is
+usually a timeout or a refused connection, not a response time, so
+latency_sum / up_count is the average response time and a bucket with no
+UP checks has no latency_min/max.
+
+Rollups are maintained as results are written: RollupBuffer folds a batch
+of results into per-bucket deltas in memory, then write() adds them to the
+stored rows with one additive upsert, in the same transaction as the raw
+rows it summarises.
+"""
+
+import logging
+
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+
+from app.database import upsert_insert
+from app.models import CheckRollup, LATENCY_BUCKETS, LATENCY_OVERFLOW_BUCKET
+
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("minute", "hour", "day")
+HISTOGRAM_COLUMNS = tuple(name for name, _ in LATENCY_BUCKETS) + (LATENCY_OVERFLOW_BUCKET,)
+COUNTER_COLUMNS = ("check_count", "up_count", "latency_sum") + HISTOGRAM_COLUMNS
+
+
+def bucket_start(checked_at: datetime, granularity: str) -> datetime:
+    """Start of the `granularity` bucket containing `checked_at`, as naive UTC."""
+    if checked_at.tzinfo is not None:
+        checked_at = checked_at.astimezone(timezone.utc).replace(tzinfo=None)
+    if granularity == "minute":
+        return checked_at.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return checked_at.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return checked_at.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup granularity: {granularity!r}")
+
+
+def histogram_column(latency: float) -> str:
+    """Name of the histogram column a check with `latency` seconds counts in."""
+    for name, upper in LATENCY_BUCKETS:
+        if latency <= upper:
+            return name
+    return LATENCY_OVERFLOW_BUCKET
+
+
+class RollupBuffer:
+    """Per-bucket rollup deltas for a batch of check results."""
+
+    def __init__(self):
+        self._rows = {}  # (service_id, granularity, bucket_start) -> row dict
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, service_id: int, status: str, latency: float, checked_at: datetime):
+        """Fold one check result into its minute, hour and day buckets."""
+        checked_at = checked_at or datetime.now(timezone.utc)
+        up = status == "UP"
+        histogram = histogram_column(latency) if up else None
+
+        for granularity in GRANULARITIES:
+            key = (service_id, granularity, bucket_start(checked_at, granularity))
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = {
+                    "service_id": service_id,
+                    "granularity": granularity,
+                    "bucket_start": key[2],
+                    "latency_min": None,
+                    "latency_max": None,
+                    **{column: 0 for column in COUNTER_COLUMNS},
+                }
+            row["check_count"] += 1
+            if not up:
+                continue
+            row["up_count"] += 1
+            row["latency_sum"] += latency
+            row["latency_min"] = latency if row["latency_min"] is None else min(row["latency_min"], latency)
+            row["latency_max"] = latency if row["latency_max"] is None else max(row["latency_max"], latency)
+            row[histogram] += 1
+
+    def write(self, db):
+        """
+        Add the buffered deltas to check_rollups. Doesn't commit, so the
+        caller can keep rollups in the same transaction as the raw rows.
+        """
+        if not self._rows:
+            return
+
+        # Sorted so concurrent writers lock shared rows in the same order
+        rows = [self._rows[key] for key in sorted(self._rows)]
+        self._rows = {}
+
+        stmt = upsert_insert(db)(CheckRollup).values(rows)
+        table = CheckRollup.__table__.c
+        # Postgres has least()/greatest(); SQLite's two-argument min()/max() are the same
+        if db.get_bind().dialect.name == "postgresql":
+            least, greatest = func.least, func.greatest
+        else:
+            least, greatest = func.min, func.max
+
+        update = {column: table[column] + stmt.excluded[column] for column in COUNTER_COLUMNS}
+        # Either side is NULL when its checks were all DOWN; SQLite's min()/max()
+        # would return NULL then, so fall back to the other side first
+        for column, pick in (("latency_min", least), ("latency_max", greatest)):
+            stored, added = table[column], stmt.excluded[column]
+            update[column] = pick(func.coalesce(stored, added), func.coalesce(added, stored))
+
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[CheckRollup.service_id, CheckRollup.granularity, CheckRollup.bucket_start],
+                set_=update,
+            )
+        )
+        logger.debug("Upserted %d rollup rows", len(rows))
@@ -10,16 +10,23 @@ FIXES:
 
 import logging
 
-from datetime import datetime
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from pydantic import BaseModel, ConfigDict, AnyHttpUrl
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, AnyHttpUrl, Field
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 
+from app.conditional import make_etag, not_modified
+from app.config import settings
 from app.database import get_db, SessionLocal
 from app.models import Service, CheckHistory
+from app.dashboard import load_page
+from app import events, export, status_store
 from app.health_checks import check_service
+from app.sla import parse_window, summarize
 
 
 logger = logging.getLogger(__name__)
@@ -34,12 +41,26 @@ router = APIRouter(prefix="/api/v1", tags=["services"])
 class ServiceCreate(BaseModel):
     name: str
     url: AnyHttpUrl
+    fresh_connection: bool = False
+    bypass_dns_cache: bool = False
+    check_method: Literal["GET", "HEAD", "GET_CAPPED", "GET_HEADERS"] = "GET"
+    max_body_bytes: Optional[int] = Field(default=None, ge=1)
+    interval_seconds: int = Field(
+        default=settings.DEFAULT_CHECK_INTERVAL_SECONDS,
+        ge=settings.MIN_CHECK_INTERVAL_SECONDS,
+        le=86400,
+    )
 
 
 class ServiceOut(BaseModel):
     id: int
     name: str
     url: str
+    fresh_connection: bool
+    bypass_dns_cache: bool
+    check_method: str
+    max_body_bytes: Optional[int]
+    interval_seconds: int
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -50,11 +71,73 @@ class HistoryOut(BaseModel):
     status: str
     status_code: int
     latency: float
+    dns_time: Optional[float] = None
+    connect_time: Optional[float] = None
+    tls_time: Optional[float] = None
+    ttfb_time: Optional[float] = None
+    body_time: Optional[float] = None
     checked_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class SLAOut(BaseModel):
+    service_id: int
+    window: str
+    window_start: datetime
+    window_end: datetime
+    granularity: str
+    check_count: int
+    up_count: int
+    uptime_pct: Optional[float]
+    downtime_minutes: float
+    latency_avg_ms: Optional[float]
+    latency_min_ms: Optional[float]
+    latency_max_ms: Optional[float]
+    p50_ms: Optional[float]
+    p90_ms: Optional[float]
+    p95_ms: Optional[float]
+    p99_ms: Optional[float]
+
+
+class RecentCheckOut(BaseModel):
+    status: str
+    status_code: int
+    latency: float
+    checked_at: datetime
+
+
+class DashboardServiceOut(BaseModel):
+    service: ServiceOut
+    latest: Optional[RecentCheckOut]
+    check_count_24h: int
+    uptime_pct_24h: Optional[float]
+    avg_latency_ms_24h: Optional[float]
+    recent: List[RecentCheckOut]
+
+
+class DashboardOut(BaseModel):
+    services: List[DashboardServiceOut]
+    next_after_id: Optional[int]
+
+
+class ServiceStatusOut(BaseModel):
+    service_id: int
+    status: str
+    status_code: int
+    latency: float
+    checked_at: datetime
+    failure_count: int
+
+
+class StatusOverviewOut(BaseModel):
+    total_services: int
+    up_services: int
+    down_services: int
+    unchecked_services: int
+    services: List[ServiceStatusOut]
+
+
 # -----------------------------------------------------------------------
 # Background task: run one immediate health check after service creation
 # so the frontend shows real data instantly instead of waiting ~2 minutes.
@@ -88,9 +171,17 @@ def create_service(
     Register a new service to monitor.
     Triggers an immediate health check in the background so the
     frontend shows real data within seconds instead of waiting for
-    the next Celery Beat tick (~2 minutes).
+    the scheduler to pick the service up.
     """
-    service = Service(name=payload.name, url=str(payload.url))
+    service = Service(
+        name=payload.name,
+        url=str(payload.url),
+        fresh_connection=payload.fresh_connection,
+        bypass_dns_cache=payload.bypass_dns_cache,
+        check_method=payload.check_method,
+        max_body_bytes=payload.max_body_bytes,
+        interval_seconds=payload.interval_seconds,
+    )
     db.add(service)
     db.commit()
     db.refresh(service)
@@ -103,8 +194,17 @@ def create_service(
 
 
 @router.get("/services", response_model=List[ServiceOut])
-def list_services(db: Session = Depends(get_db)):
-    """Return all registered services."""
+def list_services(request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Return all registered services.
+
+    Services are only ever created or deleted, so (count, max id) is a
+    version of the whole list; a matching If-None-Match gets a 304.
+    """
+    count, max_id = db.query(func.count(Service.id), func.max(Service.id)).one()
+    cached = not_modified(request, response, make_etag("services", count, max_id))
+    if cached is not None:
+        return cached
     return db.query(Service).order_by(Service.id).all()
 
 
@@ -131,6 +231,7 @@ def delete_service(
         raise HTTPException(status_code=404, detail="Service not found")
     db.delete(service)
     db.commit()
+    status_store.forget(service_id)
     logger.info("Deleted service id=%s", service_id)
     return
 
@@ -139,30 +240,271 @@ def delete_service(
 # Health Check History Route
 # -----------------------------------------------------------------------
 
+def _encode_cursor(check: CheckHistory) -> str:
+    return f"{check.checked_at.isoformat()},{check.id}"
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    """Parse a `<checked_at>,<id>` history cursor into (datetime, int)."""
+    try:
+        checked_at, check_id = cursor.rsplit(",", 1)
+        checked_at = datetime.fromisoformat(checked_at)
+        check_id = int(check_id)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor, expected <checked_at>,<id>")
+    if checked_at.tzinfo is not None:
+        # checked_at is stored as naive UTC
+        checked_at = checked_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return checked_at, check_id
+
+
 @router.get("/services/{service_id}/history", response_model=List[HistoryOut])
 def get_history(
     service_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    before: Optional[str] = Query(default=None),
 ):
     """
-    Return paginated health check history for a service.
+    Return paginated health check history for a service, newest first.
 
     Query params:
       - limit: how many records to return (1-500, default 50)
       - offset: how many records to skip (for pagination)
+      - before: keyset cursor `<checked_at>,<id>`; returns records older
+        than that one. Takes precedence over offset and costs the same on
+        every page, where a deep offset has to skip every row before it.
+
+    When a full page is returned, the X-Next-Cursor header holds the
+    `before` value for the next page.
+
+    The service's latest check is the version of its history: ETag and
+    Last-Modified come from it, and If-None-Match / If-Modified-Since get
+    a 304 without running the page query.
     """
     service = db.query(Service).filter(Service.id == service_id).first()
     if not service:
         raise HTTPException(status_code=404, detail="Service not found")
 
-    history = (
+    latest = (
+        db.query(CheckHistory.id, CheckHistory.checked_at)
+        .filter(CheckHistory.service_id == service_id)
+        .order_by(CheckHistory.checked_at.desc(), CheckHistory.id.desc())
+        .first()
+    )
+    latest_id, last_modified = latest if latest else (None, None)
+    etag = make_etag("history", service_id, latest_id, limit, offset, before)
+    cached = not_modified(request, response, etag, last_modified)
+    if cached is not None:
+        return cached
+
+    # Walks ix_check_history_service_id_checked_at backwards; id breaks
+    # ties between checks recorded in the same instant
+    query = (
         db.query(CheckHistory)
         .filter(CheckHistory.service_id == service_id)
-        .order_by(CheckHistory.checked_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+        .order_by(CheckHistory.checked_at.desc(), CheckHistory.id.desc())
+    )
+    if before is not None:
+        query = query.filter(
+            tuple_(CheckHistory.checked_at, CheckHistory.id) < _decode_cursor(before)
+        )
+    else:
+        query = query.offset(offset)
+
+    history = query.limit(limit).all()
+    if len(history) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(history[-1])
+    return history
+
+
+# -----------------------------------------------------------------------
+# SLA Summary Route
+# -----------------------------------------------------------------------
+
+@router.get("/services/{service_id}/sla", response_model=SLAOut)
+def get_sla(
+    service_id: int,
+    db: Session = Depends(get_db),
+    window: str = Query(default="30d"),
+):
+    """
+    Return uptime, downtime and latency percentiles for a service.
+
+    Query params:
+      - window: how far back to look, e.g. 24h, 7d, 4w (default 30d, max 366d)
+
+    Computed from the check rollups, not raw history; see sla.py for how
+    the bucket size is picked and how percentiles are estimated.
+    """
+    try:
+        length = parse_window(window)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    service = db.query(Service).filter(Service.id == service_id).first()
+    if not service:
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    return {"window": window, **summarize(db, service_id, length)}
+
+
+def _parse_ids(ids: Optional[str]):
+    """Parse an optional comma-separated list of service IDs."""
+    if not ids:
+        return None
+    try:
+        return [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+
+
+# -----------------------------------------------------------------------
+# Dashboard Route
+# -----------------------------------------------------------------------
+
+@router.get("/dashboard", response_model=DashboardOut)
+def get_dashboard(
+    db: Session = Depends(get_db),
+    limit: int = Query(default=100, ge=1, le=500),
+    after_id: int = Query(default=0, ge=0),
+    ids: Optional[str] = Query(default=None),
+    history: int = Query(default=50, ge=0, le=100),
+):
+    """
+    Return latest status, 24h summary and recent checks for a page of services.
+
+    Replaces one /history request per service with one request per page,
+    answered with a fixed number of queries (see dashboard.py).
+
+    Query params:
+      - limit: services per page (1-500, default 100)
+      - after_id: return services with a higher id (use next_after_id)
+      - ids: optional comma-separated service IDs to restrict to
+      - history: recent checks per service (0-100, default 50)
+    """
+    service_ids = _parse_ids(ids)
+    return load_page(db, limit, after_id=after_id, service_ids=service_ids, history=history)
+
+
+# -----------------------------------------------------------------------
+# Export Route
+# -----------------------------------------------------------------------
+
+@router.get("/export")
+def export_history(
+    ids: Optional[str] = Query(default=None),
+    start: Optional[datetime] = Query(default=None),
+    end: Optional[datetime] = Query(default=None),
+    format: str = Query(default="csv"),
+):
+    """
+    Stream check history for many services and a time range as a file.
+
+    Reads through a server-side cursor and encodes chunk by chunk, so
+    memory use doesn't grow with the export (see export.py).
+
+    Query params:
+      - ids: optional comma-separated service IDs (default: all services)
+      - start: inclusive ISO timestamp; end: exclusive ISO timestamp
+      - format: csv (default), ndjson, or parquet if pyarrow is installed
+    """
+    service_ids = _parse_ids(ids)
+    if format not in export.available_formats():
+        raise HTTPException(
+            status_code=422,
+            detail=f"format must be one of {', '.join(export.available_formats())}",
+        )
+
+    def body():
+        # Own session: the request's is closed before a streamed body is sent
+        db = SessionLocal()
+        try:
+            yield from export.export(db, format, service_ids, start, end)
+        finally:
+            db.close()
+
+    filename = f"check_history.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# -----------------------------------------------------------------------
+# Status Overview Route
+# -----------------------------------------------------------------------
+
+@router.get("/status", response_model=StatusOverviewOut)
+def get_status_overview(
+    db: Session = Depends(get_db),
+    ids: Optional[str] = Query(default=None),
+):
+    """
+    Return the latest status of every service (or only `ids`).
+
+    Read from the Redis latest-status hash in one round trip, falling back
+    to a rebuild from the database if Redis is unavailable (see
+    status_store.py).
+
+    Query params:
+      - ids: optional comma-separated service IDs to restrict to
+    """
+    service_ids = _parse_ids(ids)
+    if service_ids is None:
+        total = db.query(func.count(Service.id)).scalar()
+    else:
+        total = db.query(func.count(Service.id)).filter(Service.id.in_(service_ids)).scalar()
+    statuses = status_store.load_statuses(db, service_ids)
+
+    up = sum(1 for entry in statuses.values() if entry["status"] == "UP")
+    return {
+        "total_services": total,
+        "up_services": up,
+        "down_services": len(statuses) - up,
+        "unchecked_services": max(total - len(statuses), 0),
+        "services": [
+            {"service_id": service_id, **entry}
+            for service_id, entry in sorted(statuses.items())
+        ],
+    }
+
+
+# -----------------------------------------------------------------------
+# Live Events Route
+# -----------------------------------------------------------------------
+
+@router.get("/stream")
+async def stream_events(request: Request, ids: Optional[str] = Query(default=None)):
+    """
+    Server-Sent Events stream of new check results and alert transitions.
+
+    Query params:
+      - ids: optional comma-separated service IDs to restrict to
+
+    Frames are `event: check` (one per check result) and `event: alert`
+    (status flips), each with a JSON `data` line; see events.py.
+    """
+    service_ids = _parse_ids(ids)
+    queue = events.hub.subscribe()
+
+    async def body():
+        try:
+            async for frame in events.stream(
+                queue,
+                request.is_disconnected,
+                service_ids=set(service_ids) if service_ids else None,
+            ):
+                yield frame
+        finally:
+            events.hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return history
\ No newline at end of file
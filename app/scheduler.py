@@ -0,0 +1,209 @@
+"""
+scheduler.py — Per-service check intervals driven by a priority queue.
+
+Every service used to be checked on one fixed 120s Beat entry. Now each
+service has its own `interval_seconds`, and a custom Celery Beat scheduler
+keeps a min-heap of (next due time, service id). Each Beat tick pops only the
+services that are due and dispatches them to workers as check_shard tasks,
+so a 15s critical endpoint and a 10m low-value one cost what they should.
+
+Services are not all due at the same instant: each one runs on a fixed grid
+offset by a phase derived from a hash of its id, spread evenly across its
+interval, plus optional random jitter. The result is a flat dispatch rate
+instead of a thundering herd every interval. Grid times are wall-clock, so a
+service keeps its phase across Beat restarts.
+
+The heap is refreshed from the `services` table (id + interval only) every
+SCHEDULER_SYNC_SECONDS, not on every tick. New services don't have to wait
+for that: the API already runs an immediate check on creation.
+
+Enabled via `beat_scheduler` in celery_app.py; the regular beat_schedule
+entries keep working alongside it.
+"""
+
+import collections
+import heapq
+import logging
+import random
+import time
+
+from celery.beat import PersistentScheduler
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import Service
+from app.sharding import range_shards, stable_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+def phase_offset(service_id: int, interval: float) -> float:
+    """Deterministic offset of `service_id` within its interval, in [0, interval)."""
+    return (stable_hash(f"phase-{service_id}") % 1_000_000) / 1_000_000 * interval
+
+
+def next_slot(service_id: int, interval: float, after: float) -> float:
+    """First grid time >= `after` for this service: phase + k * interval."""
+    phase = phase_offset(service_id, interval)
+    return after + (phase - after) % interval
+
+
+class DueQueue:
+    """
+    Min-heap of (due_at, service_id, version, slot_at).
+
+    `slot_at` is the service's grid time; `due_at` is that plus jitter.
+    Removed services and changed intervals are handled by lazy deletion:
+    the heap entry whose version no longer matches is skipped when popped.
+    """
+
+    def __init__(self, jitter: float = 0.0):
+        self.jitter = jitter
+        self._heap = []
+        self._intervals = {}  # service_id -> interval_seconds
+        self._versions = {}   # service_id -> version of its live heap entry
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def _push(self, service_id: int, slot_at: float):
+        version = self._versions.get(service_id, 0) + 1
+        self._versions[service_id] = version
+        due_at = slot_at + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        heapq.heappush(self._heap, (due_at, service_id, version, slot_at))
+
+    def expected_rate(self) -> float:
+        """Steady-state dispatches per second for the current services."""
+        return sum(1.0 / interval for interval in self._intervals.values())
+
+    def sync(self, intervals: dict, now: float):
+        """
+        Reconcile with the current {service_id: interval_seconds} map.
+
+        New services and services whose interval changed are scheduled at
+        their next grid slot; removed ones are dropped.
+        """
+        for service_id in self._intervals.keys() - intervals.keys():
+            del self._intervals[service_id]
+            del self._versions[service_id]
+
+        for service_id, interval in intervals.items():
+            if self._intervals.get(service_id) == interval:
+                continue
+            self._intervals[service_id] = interval
+            self._push(service_id, next_slot(service_id, interval, now))
+
+        # Drop dead entries once they dominate the heap
+        if len(self._heap) > 2 * len(self._intervals) + 64:
+            self._heap = [
+                entry for entry in self._heap
+                if self._versions.get(entry[1]) == entry[2]
+            ]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now: float) -> list:
+        """Return the IDs of all services due at `now` and schedule their next run."""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, service_id, version, slot_at = heapq.heappop(self._heap)
+            if self._versions.get(service_id) != version:
+                continue
+            due.append(service_id)
+            interval = self._intervals[service_id]
+            # Fell behind (e.g. Beat was paused): skip missed slots, don't burst
+            self._push(service_id, max(slot_at + interval, next_slot(service_id, interval, now)))
+        return due
+
+    def next_due(self):
+        """Due time of the earliest live entry, or None if the queue is empty."""
+        while self._heap and self._versions.get(self._heap[0][1]) != self._heap[0][2]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+
+class DispatchRate:
+    """Sliding-window count of dispatched checks, reported as checks/second."""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._events = collections.deque()  # (timestamp, count)
+        self._total = 0
+
+    def record(self, count: int, now: float):
+        if count:
+            self._events.append((now, count))
+            self._total += count
+        while self._events and self._events[0][0] <= now - self.window:
+            self._total -= self._events.popleft()[1]
+
+    def per_second(self) -> float:
+        return self._total / self.window
+
+
+class DueCheckScheduler(PersistentScheduler):
+    """Celery Beat scheduler that also dispatches per-service due checks."""
+
+    def __init__(self, *args, **kwargs):
+        self.due_queue = DueQueue(jitter=settings.SCHEDULER_JITTER_SECONDS)
+        self.dispatch_rate = DispatchRate()
+        self._next_sync = 0.0
+        self._next_report = 0.0
+        super().__init__(*args, **kwargs)
+
+    def _load_intervals(self) -> dict:
+        db = SessionLocal()
+        try:
+            return dict(db.query(Service.id, Service.interval_seconds))
+        finally:
+            db.close()
+
+    def sync_services(self, now: float):
+        try:
+            self.due_queue.sync(self._load_intervals(), now)
+            logger.debug("Scheduler synced %d services", len(self.due_queue))
+        except Exception as exc:
+            # Keep dispatching from the last known schedule
+            logger.error("Failed to sync services into scheduler: %s", exc, exc_info=True)
+        self._next_sync = now + settings.SCHEDULER_SYNC_SECONDS
+
+    def dispatch_due(self, now: float) -> int:
+        """Send every due service to the workers. Returns how many were sent."""
+        due = self.due_queue.pop_due(now)
+        for shard in range_shards(due, settings.CHECK_SHARD_SIZE):
+            try:
+                self.send_task("app.tasks.check_shard", args=[shard])
+            except Exception as exc:
+                # These services just miss this run; they stay scheduled
+                logger.error("Failed to dispatch %d checks: %s", len(shard), exc)
+        self.dispatch_rate.record(len(due), now)
+        return len(due)
+
+    def report(self, now: float):
+        """Log the dispatch-rate metric every SCHEDULER_METRICS_SECONDS."""
+        if now < self._next_report:
+            return
+        self._next_report = now + settings.SCHEDULER_METRICS_SECONDS
+        logger.info(
+            "Scheduler metrics | dispatch_rate=%.2f/s expected_rate=%.2f/s services=%d",
+            self.dispatch_rate.per_second(),
+            self.due_queue.expected_rate(),
+            len(self.due_queue),
+        )
+
+    def tick(self, *args, **kwargs):
+        now = time.time()
+        if now >= self._next_sync:
+            self.sync_services(now)
+        self.dispatch_due(now)
+        self.report(now)
+
+        # Sleep until whichever comes first: a regular beat entry,
+        # the next due service, or the next service sync. Never less than
+        # SCHEDULER_MIN_TICK_SECONDS, so due services are batched per tick
+        # instead of becoming one tiny task each.
+        sleep_for = min(super().tick(*args, **kwargs), self._next_sync - now)
+        next_due = self.due_queue.next_due()
+        if next_due is not None:
+            sleep_for = min(sleep_for, next_due - now)
+        return max(sleep_for, settings.SCHEDULER_MIN_TICK_SECONDS)
@@ -0,0 +1,64 @@
+"""
+sharding.py — Split the service ID space into shards for parallel check runs.
+
+Two strategies, picked by CHECK_SHARD_STRATEGY:
+
+  - "range": sorted IDs cut into contiguous chunks of CHECK_SHARD_SIZE.
+    Shard count grows with the fleet; good default.
+  - "hash":  IDs placed on a consistent-hash ring of CHECK_SHARD_COUNT shards.
+    A service stays in the same shard from run to run, and changing the shard
+    count only moves ~1/N of the services.
+"""
+
+import bisect
+import hashlib
+
+from app.config import settings
+
+
+def stable_hash(key: str) -> int:
+    """32-bit hash that is stable across processes (unlike the builtin hash())."""
+    return int(hashlib.md5(key.encode()).hexdigest()[:8], 16)
+
+
+class HashRing:
+    """Consistent-hash ring mapping service IDs onto `shard_count` shards."""
+
+    def __init__(self, shard_count: int, vnodes: int = 64):
+        self.shard_count = shard_count
+        points = sorted(
+            (stable_hash(f"shard-{shard}-{vnode}"), shard)
+            for shard in range(shard_count)
+            for vnode in range(vnodes)
+        )
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def shard_for(self, service_id: int) -> int:
+        index = bisect.bisect(self._keys, stable_hash(str(service_id))) % len(self._keys)
+        return self._shards[index]
+
+
+def range_shards(service_ids, shard_size: int) -> list:
+    """Cut sorted `service_ids` into contiguous chunks of `shard_size`."""
+    ids = sorted(service_ids)
+    return [ids[i:i + shard_size] for i in range(0, len(ids), shard_size)]
+
+
+def hash_shards(service_ids, shard_count: int) -> list:
+    """Group `service_ids` by consistent-hash shard, dropping empty shards."""
+    ring = HashRing(shard_count)
+    shards = [[] for _ in range(shard_count)]
+    for service_id in sorted(service_ids):
+        shards[ring.shard_for(service_id)].append(service_id)
+    return [shard for shard in shards if shard]
+
+
+def build_shards(service_ids, strategy: str = None) -> list:
+    """Split `service_ids` into shards using the configured strategy."""
+    strategy = strategy or settings.CHECK_SHARD_STRATEGY
+    if strategy == "hash":
+        return hash_shards(service_ids, settings.CHECK_SHARD_COUNT)
+    if strategy == "range":
+        return range_shards(service_ids, settings.CHECK_SHARD_SIZE)
+    raise ValueError(f"Unknown CHECK_SHARD_STRATEGY: {strategy!r}")
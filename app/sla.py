@@ -0,0 +1,146 @@
+"""
+sla.py — SLA summaries (uptime, downtime, latency percentiles) from rollups.
+
+The dashboard used to work uptime out from the last 50 raw rows, so
+"uptime" meant the last 100 minutes and percentiles weren't available.
+summarize() answers any window from check_rollups (rollups.py) with one
+aggregate query over at most a few hundred bucket rows:
+
+    window <= 1 day   -> minute buckets
+    window <= 30 days -> hour buckets
+    longer            -> day buckets
+
+The window start is rounded down to a bucket boundary, so the first bucket
+is counted whole. Latency figures are over UP checks only, as in the
+rollups. Percentiles are interpolated linearly inside the latency
+histogram buckets, so they are estimates with the histogram's resolution.
+"""
+
+import re
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import Float, cast, func
+
+from app.models import CheckRollup, LATENCY_BUCKETS
+from app.rollups import HISTOGRAM_COLUMNS, bucket_start
+
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+BUCKET_MINUTES = {"minute": 1, "hour": 60, "day": 1440}
+MAX_WINDOW = timedelta(days=366)
+
+_WINDOW = re.compile(r"^(\d+)([hdw])$")
+_WINDOW_UNITS = {"h": "hours", "d": "days", "w": "weeks"}
+
+
+def parse_window(window: str) -> timedelta:
+    """
+    Parse "24h", "7d", "4w" etc. into a timedelta.
+
+    Raises:
+        ValueError: unknown format, zero, or longer than MAX_WINDOW.
+    """
+    match = _WINDOW.match(window or "")
+    if match is None:
+        raise ValueError(f"Invalid window {window!r}, expected e.g. 24h, 7d or 4w")
+    length = timedelta(**{_WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+    if not timedelta(0) < length <= MAX_WINDOW:
+        raise ValueError(f"Window must be between 1h and {MAX_WINDOW.days}d")
+    return length
+
+
+def granularity_for(length: timedelta) -> str:
+    if length <= timedelta(days=1):
+        return "minute"
+    if length <= timedelta(days=30):
+        return "hour"
+    return "day"
+
+
+def histogram_percentile(counts: list, q: float, latency_min: float, latency_max: float) -> float:
+    """
+    Estimate the `q` quantile (seconds) from histogram `counts`, ordered like
+    HISTOGRAM_COLUMNS. The overflow bucket is bounded by `latency_max`.
+    """
+    total = sum(counts)
+    if not total:
+        return None
+    bounds = [0.0] + [upper for _, upper in LATENCY_BUCKETS] + [max(latency_max, LATENCY_BUCKETS[-1][1])]
+    target = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= target:
+            lower, upper = bounds[i], bounds[i + 1]
+            estimate = lower + (upper - lower) * (target - seen) / count
+            return min(max(estimate, latency_min), latency_max)
+        seen += count
+    return latency_max
+
+
+def summarize(db, service_id: int, length: timedelta, now: datetime = None) -> dict:
+    """SLA figures for `service_id` over the `length` before `now`."""
+    now = now or datetime.utcnow()
+    granularity = granularity_for(length)
+    start = bucket_start(now - length, granularity)
+
+    columns = [
+        func.sum(CheckRollup.check_count),
+        func.sum(CheckRollup.up_count),
+        func.sum(CheckRollup.latency_sum),
+        func.min(CheckRollup.latency_min),
+        func.max(CheckRollup.latency_max),
+        # Fraction of each bucket's checks that were DOWN, summed over buckets
+        func.sum(
+            cast(CheckRollup.check_count - CheckRollup.up_count, Float) / CheckRollup.check_count
+        ),
+    ] + [func.sum(getattr(CheckRollup, column)) for column in HISTOGRAM_COLUMNS]
+
+    row = (
+        db.query(*columns)
+        .filter(
+            CheckRollup.service_id == service_id,
+            CheckRollup.granularity == granularity,
+            CheckRollup.bucket_start >= start,
+            CheckRollup.bucket_start <= now,
+        )
+        .one()
+    )
+    check_count, up_count, latency_sum, latency_min, latency_max, down_buckets = row[:6]
+    histogram = [count or 0 for count in row[6:]]
+
+    summary = {
+        "service_id": service_id,
+        "window_start": start,
+        "window_end": now,
+        "granularity": granularity,
+        "check_count": check_count or 0,
+        "up_count": up_count or 0,
+        "uptime_pct": None,
+        "downtime_minutes": 0.0,
+        "latency_avg_ms": None,
+        "latency_min_ms": None,
+        "latency_max_ms": None,
+    }
+    summary.update({f"p{round(q * 100)}_ms": None for q in PERCENTILES})
+    if not check_count:
+        return summary
+
+    def ms(seconds):
+        return round(seconds * 1000, 3)
+
+    summary.update({
+        "uptime_pct": round(up_count / check_count * 100, 4),
+        "downtime_minutes": round((down_buckets or 0) * BUCKET_MINUTES[granularity], 2),
+    })
+    if not up_count:
+        return summary
+
+    summary.update({
+        "latency_avg_ms": ms(latency_sum / up_count),
+        "latency_min_ms": ms(latency_min),
+        "latency_max_ms": ms(latency_max),
+    })
+    for q in PERCENTILES:
+        summary[f"p{round(q * 100)}_ms"] = ms(histogram_percentile(histogram, q, latency_min, latency_max))
+    return summary
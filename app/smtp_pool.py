@@ -0,0 +1,136 @@
+"""
+smtp_pool.py — One reusable, authenticated SMTP session per process.
+
+Every alert email used to open its own connection, do STARTTLS and log in,
+so a mass outage meant hundreds of handshakes in a burst and providers
+rate-limited us. SMTPPool keeps the session open between messages:
+
+  - send() reuses the open session, connecting (STARTTLS + login) only
+    when there is none;
+  - send_batch() sends many messages over one session and reports the
+    outcome of each, so one rejected message doesn't sink the rest;
+  - a session the server has dropped is replaced transparently, and the
+    message retried once on the new session;
+  - sessions idle for SMTP_SESSION_IDLE_SECONDS, or that have carried
+    SMTP_SESSION_MAX_MESSAGES messages, are closed and replaced before
+    the server times them out or starts refusing.
+
+Settings are read when a session is opened, so changing them takes effect
+on the next connection.
+"""
+
+import logging
+import smtplib
+import threading
+import time
+
+from app.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    """A single SMTP session, opened lazily and reused until stale."""
+
+    def __init__(self, smtp_factory=None):
+        self._smtp_factory = smtp_factory if smtp_factory is not None else smtplib.SMTP
+        self._lock = threading.Lock()
+        self._conn = None
+        self._last_used = 0.0
+        self._sent_on_session = 0
+        self.connects = 0   # sessions opened so far
+
+    def _connect(self):
+        conn = self._smtp_factory(
+            settings.SMTP_HOST,
+            settings.SMTP_PORT,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
+        try:
+            if settings.SMTP_USE_TLS:
+                conn.starttls()
+            if settings.SMTP_USER and settings.SMTP_PASSWORD:
+                conn.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        except Exception:
+            conn.close()
+            raise
+        self.connects += 1
+        self._sent_on_session = 0
+        self._last_used = time.monotonic()
+        logger.debug("Opened SMTP session to %s:%s", settings.SMTP_HOST, settings.SMTP_PORT)
+        return conn
+
+    def _discard(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    def _session(self):
+        if self._conn is not None and (
+            time.monotonic() - self._last_used > settings.SMTP_SESSION_IDLE_SECONDS
+            or self._sent_on_session >= settings.SMTP_SESSION_MAX_MESSAGES
+        ):
+            self._discard()
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _send(self, msg):
+        for attempt in (1, 2):
+            conn = self._session()
+            try:
+                conn.send_message(msg)
+            except smtplib.SMTPServerDisconnected as exc:
+                lost = exc
+            except smtplib.SMTPException:
+                # The server answered and refused this message; the session is fine
+                self._last_used = time.monotonic()
+                raise
+            except OSError as exc:
+                lost = exc
+            else:
+                self._sent_on_session += 1
+                self._last_used = time.monotonic()
+                return
+
+            # Dropped session (idle timeout, server restart): reconnect once
+            self._conn = None
+            conn.close()
+            if attempt == 2:
+                raise lost
+            logger.info("SMTP session lost (%s), reconnecting", lost)
+
+    def send(self, msg):
+        """Send one message over the pooled session. Raises on failure."""
+        with self._lock:
+            self._send(msg)
+
+    def send_batch(self, messages) -> list:
+        """
+        Send `messages` over one session.
+
+        Returns:
+            One entry per message: None if it was sent, else the exception.
+        """
+        results = []
+        with self._lock:
+            for msg in messages:
+                try:
+                    self._send(msg)
+                    results.append(None)
+                except Exception as exc:
+                    results.append(exc)
+        return results
+
+    def close(self):
+        with self._lock:
+            self._discard()
+
+
+# Per-process pool used by alerts.py and the test-alert route
+smtp_pool = SMTPPool()
@@ -0,0 +1,139 @@
+"""
+status_store.py — Latest status of every service, kept in a Redis hash.
+
+"What is the current state of every service" used to mean querying
+alert_states or the newest check_history row per service (and
+get_alert_status loaded every AlertState into Python to count them).
+
+The check pipeline now writes each service's latest status, status code,
+latency, check time, consecutive failure count and alert status (the
+confirmed UP/DOWN of alert_states, which with ALERT_CONFIRM_FAILURES > 1
+can lag the latest probe) into the Redis hash STATUS_KEY (field = service
+id, value = JSON) after every committed batch.
+Readers get any set of services in one HMGET.
+
+If Redis is unreachable, readers rebuild the same data from the database:
+the latest check per service plus alert_states, in two queries. Services
+missing from the hash (a fresh or flushed Redis that so far only holds the
+shards checked since) are rebuilt the same way and written back, so a
+partial hash never makes services look unchecked until their next check.
+STATUS_CACHE_ENABLED=false skips Redis entirely.
+"""
+
+import json
+import logging
+
+from datetime import datetime
+
+from app.config import settings
+from app.dashboard import recent_history
+from app.models import AlertState, Service
+from app.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_KEY = "sla:status"
+
+
+def status_entry(record, failure_count: int, alert_status: str) -> dict:
+    checked_at = record.checked_at
+    return {
+        "status": record.status,
+        "status_code": record.status_code,
+        "latency": record.latency,
+        "checked_at": checked_at.isoformat() if isinstance(checked_at, datetime) else checked_at,
+        "failure_count": failure_count,
+        "alert_status": alert_status,
+    }
+
+
+def record_statuses(entries: dict):
+    """Store {service_id: status_entry} in Redis. Never raises."""
+    if not entries or not settings.STATUS_CACHE_ENABLED:
+        return
+    try:
+        get_redis().hset(
+            STATUS_KEY,
+            mapping={str(service_id): json.dumps(entry) for service_id, entry in entries.items()},
+        )
+    except Exception as exc:
+        logger.warning("Failed to store latest status for %d services: %s", len(entries), exc)
+
+
+def forget(service_id: int):
+    """Drop a deleted service's entry. Never raises."""
+    if not settings.STATUS_CACHE_ENABLED:
+        return
+    try:
+        get_redis().hdel(STATUS_KEY, str(service_id))
+    except Exception as exc:
+        logger.warning("Failed to remove latest status for service %s: %s", service_id, exc)
+
+
+def rebuild(db, service_ids=None) -> dict:
+    """{service_id: status_entry} from the database, for services with checks."""
+    if service_ids is None:
+        service_ids = [service_id for (service_id,) in db.query(Service.id)]
+    if not service_ids:
+        return {}
+
+    latest = recent_history(db, service_ids, 1)
+    states = {
+        service_id: (last_status, failure_count)
+        for service_id, last_status, failure_count in db.query(
+            AlertState.service_id, AlertState.last_status, AlertState.failure_count
+        ).filter(AlertState.service_id.in_(service_ids))
+    }
+
+    statuses = {}
+    for service_id, checks in latest.items():
+        if not checks:
+            continue
+        check = checks[0]
+        last_status, failure_count = states.get(service_id, ("UP", 0))
+        statuses[service_id] = {
+            "status": check["status"],
+            "status_code": check["status_code"],
+            "latency": check["latency"],
+            "checked_at": check["checked_at"].isoformat(),
+            "failure_count": failure_count or 0,
+            "alert_status": last_status or "UP",
+        }
+    return statuses
+
+
+def load_statuses(db, service_ids=None) -> dict:
+    """
+    Latest status of `service_ids` (default: every service), from Redis
+    when possible, else rebuilt from the database.
+
+    Returns:
+        {service_id: status_entry}; services never checked are absent.
+    """
+    if not settings.STATUS_CACHE_ENABLED:
+        return rebuild(db, service_ids)
+    if service_ids is None:
+        service_ids = [service_id for (service_id,) in db.query(Service.id)]
+    if not service_ids:
+        return {}
+
+    try:
+        fields = [str(service_id) for service_id in service_ids]
+        raw = get_redis().hmget(STATUS_KEY, fields)
+    except Exception as exc:
+        logger.warning("Latest status unavailable from Redis, rebuilding from DB: %s", exc)
+        return rebuild(db, service_ids)
+
+    stored = {
+        service_id: json.loads(value)
+        for service_id, value in zip(service_ids, raw)
+        if value is not None
+    }
+    missing = [service_id for service_id in service_ids if service_id not in stored]
+    if missing:
+        # Not in the hash yet (fresh or flushed Redis): fill in from the DB
+        rebuilt = rebuild(db, missing)
+        record_statuses(rebuilt)
+        stored.update(rebuilt)
+    return stored
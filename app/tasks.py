@@ -8,11 +8,32 @@ WHAT CHANGED:
 """
 
 import logging
+import time
+
+from datetime import datetime
+
+from celery import chord
+from celery.signals import worker_process_shutdown
 
 from app.celery_app import celery_app
+from app.config import settings
 from app.database import SessionLocal
-from app.models import Service
-from app.health_checks import check_service
+from app.alerts import (
+    alert_recipients,
+    alerts_configured,
+    build_alert_message,
+    redispatch_pending,
+    retry_delay,
+    send_alert_email,
+)
+from app.models import AlertDelivery, Service
+from app.check_engine import run_checks, close_pool
+from app.result_writer import ResultWriter
+from app.partitions import ensure_partitions
+from app.retention import prune
+from app.smtp_pool import smtp_pool
+from app.sharding import build_shards
+from app.timeouts import adaptive_timeouts
 
 
 logger = logging.getLogger(__name__)
@@ -21,31 +42,340 @@ logger = logging.getLogger(__name__)
 @celery_app.task(name="app.tasks.run_all_health_checks")
 def run_all_health_checks():
     """
-    Scheduled task: ping every registered service and record results.
-    Runs every 2 minutes via Celery Beat.
+    On-demand task: ping every registered service now and record results.
+    Routine checks don't go through here; Beat dispatches check_shard
+    directly for the services that are due (see scheduler.py).
+
+    This is only a dispatcher: it splits the service IDs into shards
+    (see sharding.py) and fans them out as a chord of check_shard tasks,
+    so every worker node takes a share of the run. summarize_check_run
+    collects the per-shard totals once all shards are done.
+    """
+    started_at = time.time()
+
+    db = SessionLocal()
+    try:
+        service_ids = [service_id for (service_id,) in db.query(Service.id)]
+    finally:
+        db.close()
+
+    shards = build_shards(service_ids)
+    if not shards:
+        logger.info("No services registered, skipping health check run")
+        return
+
+    logger.info(
+        "Dispatching health checks for %d services in %d shards",
+        len(service_ids),
+        len(shards),
+    )
+    chord(check_shard.s(shard) for shard in shards)(
+        summarize_check_run.s(started_at=started_at)
+    )
+
+
+@celery_app.task(name="app.tasks.check_shard")
+def check_shard(service_ids):
+    """
+    Check one shard of services and record the results.
+
+    Services are probed concurrently by the check engine first, then the
+    results and alert state changes are written in bulk by ResultWriter
+    (one transaction per RESULT_BATCH_SIZE results, not two per check),
+    with the shard's alert states loaded in a single query up front.
+    With CHECK_TIMEOUT_MODE=adaptive each service gets its own timeout
+    from timeouts.adaptive_timeouts.
+
+    The shard's totals are logged here, since shards dispatched by Beat
+    have no chord callback to report them.
+
+    Returns:
+        Shard totals: {"checked", "up", "down", "errors", "wall_time"}.
+    """
+    started = time.perf_counter()
+    totals = {"checked": 0, "up": 0, "down": 0, "errors": 0}
+
+    # Keep loaded services readable across batch commits without a
+    # refresh SELECT per service
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        services = db.query(Service).filter(Service.id.in_(service_ids)).all()
+
+        adaptive = settings.CHECK_TIMEOUT_MODE == "adaptive"
+        timeouts = adaptive_timeouts.for_services(db, services) if adaptive else None
+        records = run_checks(services, timeouts=timeouts)
+        writer = ResultWriter(db)
+        # Every alert state of the shard in one query
+        writer.preload([service.id for service in services])
+
+        for service, record in zip(services, records):
+            if adaptive:
+                adaptive_timeouts.observe(record.service_id, record.status, record.latency)
+            writer.add(service, record)
+            totals["up" if record.status == "UP" else "down"] += 1
+        writer.flush()
+
+        totals["checked"] = writer.written
+        totals["errors"] = writer.failed
+
+    finally:
+        db.close()
+
+    totals["wall_time"] = round(time.perf_counter() - started, 3)
+    logger.log(
+        logging.WARNING if totals["errors"] else logging.INFO,
+        "Shard checked | services=%d checked=%d up=%d down=%d errors=%d wall_time=%.3fs",
+        len(service_ids),
+        totals["checked"],
+        totals["up"],
+        totals["down"],
+        totals["errors"],
+        totals["wall_time"],
+    )
+    return totals
+
+
+@celery_app.task(name="app.tasks.summarize_check_run")
+def summarize_check_run(shard_totals, started_at: float):
+    """Chord callback: log and return the totals for a whole check run."""
+    summary = {"shards": len(shard_totals), "checked": 0, "up": 0, "down": 0, "errors": 0}
+    for totals in shard_totals:
+        for key in ("checked", "up", "down", "errors"):
+            summary[key] += totals[key]
+    summary["wall_time"] = round(time.time() - started_at, 3)
+
+    logger.info(
+        "Health check run complete | shards=%d checked=%d up=%d down=%d errors=%d wall_time=%.3fs",
+        summary["shards"],
+        summary["checked"],
+        summary["up"],
+        summary["down"],
+        summary["errors"],
+        summary["wall_time"],
+    )
+    return summary
+
+
+@celery_app.task(name="app.tasks.prune_history")
+def prune_history():
+    """
+    Scheduled task: delete raw history and rollups past their retention
+    (see retention.py), in small batches.
+
+    Returns:
+        Rows removed per table and the time spent.
+    """
+    db = SessionLocal()
+    try:
+        report = prune(db)
+    finally:
+        db.close()
+
+    logger.info(
+        "Retention run complete | check_history=%d partitions_dropped=%d "
+        "rollup_minute=%d rollup_hour=%d rollup_day=%d elapsed=%.3fs",
+        report["check_history"],
+        report["partitions_dropped"],
+        report["rollup_minute"],
+        report["rollup_hour"],
+        report["rollup_day"],
+        report["elapsed"],
+    )
+    return report
+
+
+@celery_app.task(name="app.tasks.ensure_history_partitions")
+def ensure_history_partitions():
+    """
+    Scheduled task: create the next PARTITION_PREMAKE_DAYS daily
+    check_history partitions ahead of time (Postgres only, see partitions.py).
+
+    Returns:
+        Names of the partitions created.
+    """
+    db = SessionLocal()
+    try:
+        return ensure_partitions(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="app.tasks.redispatch_pending_alerts")
+def redispatch_pending_alerts():
+    """
+    Scheduled task: queue delivery again for alerts whose task was lost
+    (see alerts.redispatch_pending).
+
+    Returns:
+        Ids of the deliveries queued.
+    """
+    db = SessionLocal()
+    try:
+        delivery_ids = redispatch_pending(db)
+    finally:
+        db.close()
+
+    if delivery_ids:
+        logger.warning("Redispatched %d pending alert deliveries", len(delivery_ids))
+    return delivery_ids
+
+
+@celery_app.task(
+    name="app.tasks.deliver_alert",
+    bind=True,
+    acks_late=True,
+    max_retries=settings.ALERT_MAX_RETRIES,
+)
+def deliver_alert(self, delivery_id: int):
+    """
+    Send one queued alert email (see alerts.enqueue_alert).
+
+    Runs on the ALERT_QUEUE queue, so mail latency never holds up checks.
+    A failed send is retried after retry_delay() seconds, until the
+    delivery has had ALERT_MAX_RETRIES retries; every attempt (including
+    one made by a deliver_alerts batch) is recorded on the AlertDelivery
+    row. A delivery already sent is not sent again, so a
+    redelivered task message is harmless.
+
+    Returns:
+        The delivery's final or current state.
     """
     db = SessionLocal()
     try:
-        services = db.query(Service).all()
-        logger.info("Running health checks for %d services", len(services))
-
-        for service in services:
-            try:
-                check_service(db, service)
-            except Exception as exc:
-                # Don't let one bad service kill checks for all others
+        delivery = db.get(AlertDelivery, delivery_id)
+        if delivery is None:
+            logger.warning("Alert delivery %s not found (service deleted?)", delivery_id)
+            return None
+        if delivery.state in ("sent", "skipped", "failed"):
+            return delivery.state
+
+        service = db.get(Service, delivery.service_id)
+        delivery.attempts += 1
+        try:
+            sent = send_alert_email(
+                service.name,
+                service.url,
+                delivery.alert_status,
+                delivery.failure_count,
+                db,
+                raise_errors=True,
+            )
+        except Exception as exc:
+            delivery.last_error = str(exc)
+            if delivery.attempts > self.max_retries:
+                delivery.state = "failed"
+                db.commit()
                 logger.error(
-                    "Unexpected error checking service_id=%s: %s",
-                    service.id,
-                    exc,
-                    exc_info=True,
+                    "Giving up on %s alert for %s after %d attempts",
+                    delivery.alert_status,
+                    service.name,
+                    delivery.attempts,
                 )
+                return delivery.state
+            db.commit()
+            raise self.retry(exc=exc, countdown=retry_delay(delivery.attempts - 1))
+
+        delivery.state = "sent" if sent else "skipped"
+        delivery.sent_at = datetime.utcnow() if sent else None
+        delivery.last_error = None
+        db.commit()
+        return delivery.state
+    finally:
+        db.close()
 
-        logger.info("Health check run complete")
 
+@celery_app.task(name="app.tasks.deliver_alerts")
+def deliver_alerts(delivery_ids):
+    """
+    Send a batch of queued alert emails over one SMTP session.
+
+    Queued by a check batch that raised several alerts at once (a mass
+    outage), so they cost one handshake instead of one each. Deliveries
+    that fail here are handed to deliver_alert, which retries them one
+    by one with backoff.
+
+    Returns:
+        {"sent", "skipped", "retrying"} counts.
+    """
+    totals = {"sent": 0, "skipped": 0, "retrying": 0}
+    retrying = []
+
+    db = SessionLocal()
+    try:
+        deliveries = (
+            db.query(AlertDelivery)
+            .filter(AlertDelivery.id.in_(delivery_ids), AlertDelivery.state == "pending")
+            .order_by(AlertDelivery.id)
+            .all()
+        )
+        if not deliveries:
+            return totals
+
+        if not alerts_configured():
+            for delivery in deliveries:
+                delivery.state = "skipped"
+            totals["skipped"] = len(deliveries)
+            db.commit()
+            return totals
+
+        services = {
+            service.id: service
+            for service in db.query(Service).filter(
+                Service.id.in_({delivery.service_id for delivery in deliveries})
+            )
+        }
+        to_emails = alert_recipients(db)
+        results = smtp_pool.send_batch(
+            build_alert_message(
+                services[delivery.service_id].name,
+                services[delivery.service_id].url,
+                delivery.alert_status,
+                delivery.failure_count,
+                to_emails,
+            )
+            for delivery in deliveries
+        )
+
+        now = datetime.utcnow()
+        for delivery, error in zip(deliveries, results):
+            delivery.attempts += 1
+            if error is None:
+                delivery.state = "sent"
+                delivery.sent_at = now
+                delivery.last_error = None
+                totals["sent"] += 1
+            else:
+                delivery.last_error = str(error)
+                retrying.append(delivery.id)
+        db.commit()
     finally:
         db.close()
 
+    for delivery_id in retrying:
+        deliver_alert.apply_async(
+            (delivery_id,), queue=settings.ALERT_QUEUE, countdown=retry_delay(0)
+        )
+    totals["retrying"] = len(retrying)
+
+    logger.info(
+        "Alert batch delivered | sent=%d retrying=%d",
+        totals["sent"],
+        totals["retrying"],
+    )
+    return totals
+
+
+@worker_process_shutdown.connect
+def _close_http_pool(**kwargs):
+    """Close pooled keep-alive connections when a worker process exits."""
+    close_pool()
+
+
+@worker_process_shutdown.connect
+def _close_smtp_pool(**kwargs):
+    """Say QUIT on the pooled SMTP session when a worker process exits."""
+    smtp_pool.close()
+
 
 @celery_app.task
 def test_task():
@@ -0,0 +1,160 @@
+"""
+timeouts.py — Adaptive per-service probe timeouts.
+
+With one global 5s timeout, a 50ms API that suddenly takes 4.9s still counts
+as UP, and every dead endpoint holds a probe slot for the full 5s. In
+adaptive mode (CHECK_TIMEOUT_MODE=adaptive) each service instead gets
+
+    timeout = percentile(recent UP latencies) * ADAPTIVE_TIMEOUT_FACTOR
+
+clamped to [ADAPTIVE_TIMEOUT_MIN_SECONDS, ADAPTIVE_TIMEOUT_MAX_SECONDS].
+Services with fewer than ADAPTIVE_TIMEOUT_MIN_SAMPLES successful checks
+keep the fixed CHECK_TIMEOUT_SECONDS.
+
+Latencies live in a per-process ring buffer per service. They are seeded
+from check_history with one query per shard (only for services not seen
+in the last ADAPTIVE_TIMEOUT_REFRESH_SECONDS) and then fed by the probe
+results themselves, so nothing extra is queried per check. The seed only
+looks back over the last ADAPTIVE_TIMEOUT_SAMPLES check intervals (times
+HISTORY_SLACK), so it reads the recent partitions rather than each
+service's whole history.
+"""
+
+import collections
+import logging
+import math
+import time
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.models import CheckHistory
+
+
+logger = logging.getLogger(__name__)
+
+# How many times `samples` check intervals the seed query looks back, to
+# allow for DOWN results and missed runs in between
+HISTORY_SLACK = 2
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of `values` (0 < q <= 1)."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+class AdaptiveTimeouts:
+    """Rolling UP-latency samples and the timeout derived from them, per service."""
+
+    def __init__(self, samples: int = None):
+        self.samples = samples or settings.ADAPTIVE_TIMEOUT_SAMPLES
+        self._latencies = {}   # service_id -> deque of recent UP latencies
+        self._timeouts = {}    # service_id -> cached timeout, None = recompute
+        self._seeded_at = {}   # service_id -> time.monotonic() of last DB seed
+
+    def clear(self):
+        self._latencies.clear()
+        self._timeouts.clear()
+        self._seeded_at.clear()
+
+    def _samples_for(self, service_id: int):
+        samples = self._latencies.get(service_id)
+        if samples is None:
+            samples = self._latencies[service_id] = collections.deque(maxlen=self.samples)
+        return samples
+
+    def observe(self, service_id: int, status: str, latency: float):
+        """Feed one probe result. Only successful probes shape the timeout."""
+        if status != "UP":
+            return
+        self._samples_for(service_id).append(latency)
+        self._timeouts[service_id] = None
+
+    def timeout_for(self, service_id: int) -> float:
+        """Current timeout for `service_id` in seconds."""
+        cached = self._timeouts.get(service_id)
+        if cached is not None:
+            return cached
+
+        samples = self._latencies.get(service_id)
+        if not samples or len(samples) < settings.ADAPTIVE_TIMEOUT_MIN_SAMPLES:
+            timeout = settings.CHECK_TIMEOUT_SECONDS
+        else:
+            timeout = percentile(samples, settings.ADAPTIVE_TIMEOUT_PERCENTILE)
+            timeout = min(
+                max(timeout * settings.ADAPTIVE_TIMEOUT_FACTOR, settings.ADAPTIVE_TIMEOUT_MIN_SECONDS),
+                settings.ADAPTIVE_TIMEOUT_MAX_SECONDS,
+            )
+        self._timeouts[service_id] = timeout
+        return timeout
+
+    def seed(self, db, service_ids, interval_seconds: float = None):
+        """
+        Load recent UP latencies for services not seeded recently.
+
+        One windowed query for the whole batch, newest `samples` rows each,
+        out of the last `samples` * `interval_seconds` * HISTORY_SLACK
+        seconds of history.
+        """
+        now = time.monotonic()
+        max_age = settings.ADAPTIVE_TIMEOUT_REFRESH_SECONDS
+        stale = [
+            service_id for service_id in service_ids
+            if now - self._seeded_at.get(service_id, -math.inf) > max_age
+        ]
+        if not stale:
+            return
+
+        interval_seconds = interval_seconds or settings.DEFAULT_CHECK_INTERVAL_SECONDS
+        since = datetime.utcnow() - timedelta(seconds=self.samples * interval_seconds * HISTORY_SLACK)
+        ranked = (
+            select(
+                CheckHistory.service_id,
+                CheckHistory.latency,
+                func.row_number().over(
+                    partition_by=CheckHistory.service_id,
+                    order_by=CheckHistory.checked_at.desc(),
+                ).label("rank"),
+            )
+            .where(
+                CheckHistory.service_id.in_(stale),
+                CheckHistory.status == "UP",
+                CheckHistory.checked_at >= since,
+            )
+            .subquery()
+        )
+        rows = db.execute(
+            select(ranked.c.service_id, ranked.c.latency)
+            .where(ranked.c.rank <= self.samples)
+            .order_by(ranked.c.service_id, ranked.c.rank.desc())
+        )
+
+        for service_id in stale:
+            self._latencies.pop(service_id, None)
+            self._timeouts[service_id] = None
+            self._seeded_at[service_id] = now
+        for service_id, latency in rows:
+            self._samples_for(service_id).append(latency)
+
+    def for_services(self, db, services) -> dict:
+        """Seed as needed and return {service_id: timeout} for `services`."""
+        service_ids = [service.id for service in services]
+        # Long enough for the slowest-checked service in the batch
+        interval_seconds = max(
+            (service.interval_seconds or settings.DEFAULT_CHECK_INTERVAL_SECONDS for service in services),
+            default=None,
+        )
+        try:
+            self.seed(db, service_ids, interval_seconds)
+        except Exception as exc:
+            # Fall back to whatever is cached (or the fixed timeout)
+            logger.error("Failed to load latency history for timeouts: %s", exc)
+            db.rollback()
+        return {service_id: self.timeout_for(service_id) for service_id in service_ids}
+
+
+# Per-process instance used by the check tasks
+adaptive_timeouts = AdaptiveTimeouts()
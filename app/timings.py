@@ -0,0 +1,84 @@
+"""
+timings.py — Per-phase latency breakdown (DNS, connect, TLS, TTFB, body) of one probe.
+
+PhaseTimings is fed by httpcore's "trace" request extension, which reports
+when each step of a request starts and ends, plus the DNS time reported by
+dns_cache.CachingNetworkBackend through the `current_timings` context var.
+All times come from the monotonic perf_counter clock and are in seconds.
+
+The first trace event of a probe also marks when the connection pool
+handed it a connection (`acquired_at`): httpcore's pool emits no events of
+its own, so anything before that was queueing for a connection.
+
+A phase that didn't happen stays None: a reused keep-alive connection has no
+DNS/connect/TLS phases, plain http has no TLS, and a service that bypasses
+the DNS cache has its lookup folded into `connect`. Redirect hops add up.
+"""
+
+import contextvars
+import time
+
+
+# PhaseTimings of the probe running in the current asyncio task, if any
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+# httpcore trace spans that map one-to-one onto a phase
+_SPANS = {
+    "connection.connect_tcp": "connect",
+    "connection.start_tls": "tls",
+    "http11.receive_response_body": "body",
+}
+
+
+class PhaseTimings:
+    """Accumulates phase durations for one probe from trace events."""
+
+    PHASES = ("dns", "connect", "tls", "ttfb", "body")
+
+    def __init__(self):
+        self.dns = None
+        self.connect = None
+        self.tls = None
+        self.ttfb = None
+        self.body = None
+        self.acquired_at = None  # perf_counter() when a connection was obtained
+        self._started = {}
+        self._dns_in_connect = 0.0
+
+    def add(self, phase: str, seconds: float):
+        setattr(self, phase, (getattr(self, phase) or 0.0) + max(seconds, 0.0))
+
+    def record_dns(self, seconds: float):
+        """Called by the caching network backend from inside connect_tcp."""
+        self.add("dns", seconds)
+        self._dns_in_connect += seconds
+
+    async def trace(self, event: str, info: dict):
+        """httpcore trace extension callback."""
+        now = time.perf_counter()
+        name, _, stage = event.rpartition(".")
+        if self.acquired_at is None:
+            # connect_tcp for a new connection, send_request_headers on a reused one
+            self.acquired_at = now
+
+        # TTFB: from starting to send the request until the response headers are in
+        if name == "http11.send_request_headers" and stage == "started":
+            self._started["ttfb"] = now
+        elif name == "http11.receive_response_headers" and stage != "started":
+            if "ttfb" in self._started:
+                self.add("ttfb", now - self._started.pop("ttfb"))
+
+        elif name in _SPANS:
+            if stage == "started":
+                self._started[name] = now
+            elif name in self._started:
+                # "complete" or "failed": time spent counts either way
+                elapsed = now - self._started.pop(name)
+                if name == "connection.connect_tcp":
+                    elapsed -= self._dns_in_connect
+                    self._dns_in_connect = 0.0
+                self.add(_SPANS[name], elapsed)
+
+    def as_columns(self) -> dict:
+        """CheckHistory column values for these timings."""
+        return {f"{phase}_time": getattr(self, phase) for phase in self.PHASES}
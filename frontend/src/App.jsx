@@ -1,11 +1,13 @@
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { AreaChart, Area, XAxis, YAxis, Tooltip, ResponsiveContainer, CartesianGrid } from "recharts";
 
 // ── Constants ─────────────────────────────────────────────────────────────────
 const API_BASE = import.meta.env.VITE_API_URL || "http://localhost:8000/api/v1";
-const FAST_POLL = 3_000;   // first 20s after mount
+const FAST_POLL = 3_000;   // first 20s after mount or after adding a service
 const SLOW_POLL = 30_000;  // thereafter
 const FAST_DURATION = 20_000;
+const PAGE_SIZE = 200;     // services per /dashboard request
+const HISTORY_SIZE = 50;   // recent checks kept per service
 
 // ── Helpers ───────────────────────────────────────────────────────────────────
 const fmt      = (iso) => new Date(iso).toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" });
@@ -13,14 +15,6 @@ const fmtDate  = (iso) => new Date(iso).toLocaleDateString([], { month: "short",
 const fmtMs    = (s)   => s < 1 ? `${Math.round(s * 1000)}ms` : `${s.toFixed(2)}s`;
 const isHttp   = (s)   => { try { const u = new URL(s); return u.protocol === "http:" || u.protocol === "https:"; } catch { return false; } };
 
-const uptimePct = (h) => {
-  if (!h.length) return null;
-  return ((h.filter(x => x.status === "UP").length / h.length) * 100).toFixed(1);
-};
-const avgLatency = (h) => {
-  const up = h.filter(x => x.status === "UP");
-  return up.length ? up.reduce((a, x) => a + x.latency, 0) / up.length : null;
-};
 const uptimeColor = (pct) =>
   pct == null ? null : pct >= 99 ? "var(--green)" : pct >= 95 ? "#f59e0b" : "var(--red)";
 
@@ -34,16 +28,17 @@ async function apiFetch(path, opts = {}) {
   return res.json();
 }
 
-// ── usePoller — shared polling logic ─────────────────────────────────────────
-function usePoller(fn, { interval = SLOW_POLL } = {}) {
-  useEffect(() => {
-    let cancelled = false;
-    const run = async () => { if (!cancelled) await fn(); };
-    run();
-    const id = setInterval(run, interval);
-    return () => { cancelled = true; clearInterval(id); };
-  // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, []);
+// All services with their latest status, 24h summary and recent checks,
+// one request per PAGE_SIZE services instead of one per service.
+async function fetchDashboard() {
+  const entries = [];
+  let after = 0;
+  for (;;) {
+    const page = await apiFetch(`/dashboard?limit=${PAGE_SIZE}&after_id=${after}&history=${HISTORY_SIZE}`);
+    entries.push(...page.services);
+    if (page.next_after_id == null) return entries;
+    after = page.next_after_id;
+  }
 }
 
 // ── Styles ────────────────────────────────────────────────────────────────────
@@ -533,44 +528,12 @@ function AlertPanel({ onClose }) {
 }
 
 // ── ServiceCard ───────────────────────────────────────────────────────────────
-function ServiceCard({ service, onDelete }) {
-  const [history, setHistory]     = useState([]);
-  const [loading, setLoading]     = useState(true);
-  const [fetchErr, setFetchErr]   = useState("");
+function ServiceCard({ entry, onDelete }) {
+  const { service, recent: history, latest } = entry;
   const [expanded, setExpanded]   = useState(false);
   const [showDel, setShowDel]     = useState(false);
   const [deleting, setDeleting]   = useState(false);
 
-  useEffect(() => {
-    let cancelled = false;
-    let slowId = null;
-
-    const load = async () => {
-      try {
-        const data = await apiFetch(`/services/${service.id}/history?limit=50`);
-        if (!cancelled) { setHistory(data); setFetchErr(""); setLoading(false); }
-      } catch {
-        if (!cancelled) { setFetchErr("Failed to load"); setLoading(false); }
-      }
-    };
-
-    // Fast poll for first 20s so the immediate backend check shows up quickly,
-    // then settle to 30s to reduce load.
-    load();
-    const fastId = setInterval(load, FAST_POLL);
-    const switchId = setTimeout(() => {
-      clearInterval(fastId);
-      if (!cancelled) { load(); slowId = setInterval(load, SLOW_POLL); }
-    }, FAST_DURATION);
-
-    return () => {
-      cancelled = true;
-      clearInterval(fastId);
-      clearTimeout(switchId);
-      if (slowId) clearInterval(slowId);
-    };
-  }, [service.id]);
-
   const doDelete = async (e) => {
     e.stopPropagation();
     setShowDel(false);
@@ -578,10 +541,9 @@ function ServiceCard({ service, onDelete }) {
     await onDelete(service.id);
   };
 
-  const latest  = history[0];
-  const uptime  = uptimePct(history);
-  const latency = avgLatency(history);
-  const uColor  = uptimeColor(Number(uptime));
+  const uptime  = entry.uptime_pct_24h != null ? entry.uptime_pct_24h.toFixed(1) : null;
+  const latency = entry.avg_latency_ms_24h != null ? entry.avg_latency_ms_24h / 1000 : null;
+  const uColor  = uptimeColor(entry.uptime_pct_24h);
 
   // The entire header row is one flex container.
   // Left side (name/url) gets onClick=toggle.
@@ -598,7 +560,7 @@ function ServiceCard({ service, onDelete }) {
           style={{ display:"flex", alignItems:"center", gap:14, flex:1, minWidth:0, cursor:"pointer" }}
         >
           <div style={{ flexShrink:0 }}>
-            {loading ? <Spinner /> : <Dot status={latest?.status || "DOWN"} />}
+            {latest ? <Dot status={latest.status} /> : <Spinner />}
           </div>
           <div style={{ minWidth:0 }}>
             <div style={{ fontWeight:600, fontSize:15, color:"var(--text)", marginBottom:2, whiteSpace:"nowrap", overflow:"hidden", textOverflow:"ellipsis" }}>
@@ -612,11 +574,9 @@ function ServiceCard({ service, onDelete }) {
 
         {/* Right — actions (stopPropagation so clicks here don't toggle expand) */}
         <div style={{ display:"flex", alignItems:"center", gap:10, flexShrink:0 }} onClick={e => e.stopPropagation()}>
-          {fetchErr
-            ? <span style={{ fontSize:12, color:"var(--red)" }}>⚠ {fetchErr}</span>
-            : latest
-              ? <Tag status={latest.status} />
-              : !loading && <span style={{ fontSize:12, color:"var(--muted)" }}>No data</span>
+          {latest
+            ? <Tag status={latest.status} />
+            : <span style={{ fontSize:12, color:"var(--muted)" }}>No data</span>
           }
 
           {uptime != null && (
@@ -649,11 +609,11 @@ function ServiceCard({ service, onDelete }) {
       {expanded && (
         <div style={{ borderTop:"1px solid var(--border)", padding:20, animation:"expand .2s ease" }}>
           <div style={{ display:"flex", gap:10, flexWrap:"wrap", marginBottom:20 }}>
-            <StatTile label="Uptime"      value={uptime  != null ? `${uptime}%`  : null} accent={uColor} />
+            <StatTile label="Uptime 24h"  value={uptime  != null ? `${uptime}%`  : null} accent={uColor} />
             <StatTile label="Avg Latency" value={latency != null ? fmtMs(latency): null} />
             <StatTile label="HTTP Status" value={latest?.status_code || null}
               accent={latest?.status === "UP" ? "var(--green)" : "var(--red)"} />
-            <StatTile label="Checks"      value={history.length} />
+            <StatTile label="Checks 24h"  value={entry.check_count_24h} />
           </div>
 
           <div style={{ marginBottom:18 }}>
@@ -761,25 +721,58 @@ function AddServiceModal({ onAdd, onClose }) {
 
 // ── App ───────────────────────────────────────────────────────────────────────
 export default function App() {
-  const [services, setServices] = useState([]);
+  const [services, setServices] = useState([]);   // /dashboard entries
   const [loading,  setLoading]  = useState(true);
   const [error,    setError]    = useState("");
   const [modal,    setModal]    = useState(false);
   const [showAlerts, setShowAlerts] = useState(false);
+  const fastUntil = useRef(Date.now() + FAST_DURATION);
 
-  usePoller(async () => {
-    try {
-      const data = await apiFetch("/services");
-      setServices(data); setError(""); setLoading(false);
-    } catch {
-      setError("Cannot reach API — is Docker running?"); setLoading(false);
-    }
-  });
+  // Fast poll for 20s after mount (and after adding a service) so the
+  // immediate backend check shows up quickly, then settle to 30s.
+  useEffect(() => {
+    let cancelled = false;
+    let timer = null;
+
+    const load = async () => {
+      try {
+        const data = await fetchDashboard();
+        if (!cancelled) { setServices(data); setError(""); setLoading(false); }
+      } catch {
+        if (!cancelled) { setError("Cannot reach API — is Docker running?"); setLoading(false); }
+      }
+      if (!cancelled) {
+        timer = setTimeout(load, Date.now() < fastUntil.current ? FAST_POLL : SLOW_POLL);
+      }
+    };
+    load();
+
+    return () => { cancelled = true; clearTimeout(timer); };
+  }, []);
+
+  // Live results pushed over SSE (/stream); polling above still refreshes
+  // the 24h summaries and catches anything missed while disconnected.
+  useEffect(() => {
+    if (typeof EventSource === "undefined") return;
+    const source = new EventSource(`${API_BASE}/stream`);
+    source.addEventListener("check", (e) => {
+      const check = JSON.parse(e.data);
+      setServices(s => s.map(x => x.service.id !== check.service_id ? x : {
+        ...x, latest: check, recent: [check, ...x.recent].slice(0, HISTORY_SIZE),
+      }));
+    });
+    return () => source.close();
+  }, []);
+
+  const handleAdd = (svc) => {
+    setServices(s => [...s, { service: svc, latest: null, recent: [], check_count_24h: 0, uptime_pct_24h: null, avg_latency_ms_24h: null }]);
+    fastUntil.current = Date.now() + FAST_DURATION;
+  };
 
   const handleDelete = async (id) => {
     try {
       await apiFetch(`/services/${id}`, { method:"DELETE" });
-      setServices(s => s.filter(x => x.id !== id));
+      setServices(s => s.filter(x => x.service.id !== id));
     } catch (e) {
       setError(`Delete failed: ${e.message}`);
     }
@@ -808,7 +801,7 @@ export default function App() {
             </div>
             <h1 style={{ fontSize:38, fontWeight:700, color:"var(--text)", lineHeight:1.1, letterSpacing:"-.025em" }}>SLA Monitor</h1>
             <p style={{ marginTop:8, color:"var(--muted)", fontSize:14 }}>
-              {services.length} service{services.length !== 1 ? "s" : ""} tracked · refreshes every 30s
+              {services.length} service{services.length !== 1 ? "s" : ""} tracked · live updates
             </p>
           </div>
           <button className="btn btn-primary" onClick={() => setModal(true)} style={{ marginTop:8, flexShrink:0 }}>
@@ -839,9 +832,9 @@ export default function App() {
           </div>
         ) : (
           <div style={{ display:"flex", flexDirection:"column", gap:10 }}>
-            {services.map((svc, i) => (
-              <div key={svc.id} style={{ animationDelay:`${i * 0.05}s` }}>
-                <ServiceCard service={svc} onDelete={handleDelete} />
+            {services.map((entry, i) => (
+              <div key={entry.service.id} style={{ animationDelay:`${i * 0.05}s` }}>
+                <ServiceCard entry={entry} onDelete={handleDelete} />
               </div>
             ))}
           </div>
@@ -852,7 +845,7 @@ export default function App() {
         </div>
       </div>
 
-      {modal && <AddServiceModal onAdd={svc => setServices(s => [...s, svc])} onClose={() => setModal(false)} />}
+      {modal && <AddServiceModal onAdd={handleAdd} onClose={() => setModal(false)} />}
       {showAlerts && <AlertPanel onClose={() => setShowAlerts(false)} />}
     </>
   );
@@ -1,4 +1,4 @@
 #!/bin/bash
-celery -A app.celery_app worker --loglevel=info &
+celery -A app.celery_app worker -Q celery,alerts --loglevel=info &
 celery -A app.celery_app beat --loglevel=info &
 uvicorn app.main:app --host 0.0.0.0 --port 10000
\ No newline at end of file
@@ -1,7 +1,11 @@
 """
 Pytest fixtures for testing SLA Monitor.
 """
+import socketserver
+import threading
+
 import pytest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -23,6 +27,15 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def no_live_events():
+    """Keep tests off a real Redis (live events, status hash, recipients version); tests opt back in."""
+    with patch("app.events.settings.EVENTS_ENABLED", False), \
+         patch("app.status_store.settings.STATUS_CACHE_ENABLED", False), \
+         patch("app.alerts.settings.RECIPIENTS_CACHE_ENABLED", False):
+        yield
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database session for each test."""
@@ -50,6 +63,13 @@ def client(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def task_db(db_session):
+    """Point Celery tasks (which open their own sessions) at the test database."""
+    with patch("app.tasks.SessionLocal", TestingSessionLocal):
+        yield db_session
+
+
 @pytest.fixture
 def sample_service(db_session):
     """Create a sample service for testing."""
@@ -61,3 +81,75 @@ def sample_service(db_session):
     db_session.commit()
     db_session.refresh(service)
     return service
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: no TLS, no auth."""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        received = 0
+        self.reply("220 localhost stand-in SMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.reply("250 localhost")
+            elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data in iter(self.rfile.readline, b""):
+                    if data == b".\r\n":
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                server.messages.append(b"".join(lines).decode())
+                received += 1
+                self.reply("250 OK queued")
+                if server.drop_after and received >= server.drop_after:
+                    return  # hang up, like a server ending an idle or long session
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    """Local stand-in SMTP server; .messages holds what was delivered."""
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.messages = []
+    server.connections = 0
+    server.drop_after = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def smtp_settings(smtp_server):
+    """Point alerting at smtp_server, with a fresh pooled session."""
+    from app.smtp_pool import smtp_pool
+
+    with patch("app.alerts.settings.ENABLE_EMAIL_ALERTS", True), \
+         patch("app.alerts.settings.SMTP_HOST", "127.0.0.1"), \
+         patch("app.alerts.settings.SMTP_PORT", smtp_server.server_address[1]), \
+         patch("app.alerts.settings.SMTP_USE_TLS", False), \
+         patch("app.alerts.settings.ALERT_FROM_EMAIL", "alerts@test.com"), \
+         patch("app.alerts.settings.ALERT_TO_EMAILS", "test@example.com"):
+        smtp_pool.close()
+        yield smtp_server
+        smtp_pool.close()
@@ -1,34 +1,46 @@
 """
 Tests for alerting functionality.
 """
+import smtplib
 import pytest
-from unittest.mock import patch, MagicMock
-from app.alerts import send_alert_email, check_and_send_alert
-from app.models import Service, CheckHistory, AlertState
+from datetime import datetime, timezone
+from unittest.mock import patch
+from app.alerts import (
+    RECIPIENTS_VERSION_KEY,
+    AlertTransition,
+    RecipientsCache,
+    check_and_send_alert,
+    enqueue_alert,
+    enqueue_alerts,
+    evaluate_alert,
+    flap_score,
+    get_alert_recipients,
+    load_alert_recipients,
+    redispatch_pending,
+    retry_delay,
+    send_alert_email,
+)
+from app.models import Service, CheckHistory, AlertState, AlertDelivery
+from app.tasks import deliver_alert, deliver_alerts, redispatch_pending_alerts
 
 
 def test_send_alert_email_disabled(db_session):
     """Test that alerts are skipped when disabled."""
     with patch('app.alerts.settings.ENABLE_EMAIL_ALERTS', False):
-        with patch('app.alerts.smtplib.SMTP') as mock_smtp:
-            send_alert_email("Test", "https://test.com", "DOWN", 1)
-            mock_smtp.assert_not_called()
+        with patch('app.alerts.smtp_pool') as mock_pool:
+            assert send_alert_email("Test", "https://test.com", "DOWN", 1) is False
+            mock_pool.send.assert_not_called()
 
 
-def test_send_alert_email_success(db_session):
-    """Test successful email sending."""
-    with patch('app.alerts.settings.ENABLE_EMAIL_ALERTS', True):
-        with patch('app.alerts.settings.SMTP_HOST', 'smtp.test.com'):
-            with patch('app.alerts.settings.ALERT_TO_EMAILS', 'test@example.com'):
-                with patch('app.alerts.settings.ALERT_FROM_EMAIL', 'alerts@test.com'):
-                    with patch('app.alerts.smtplib.SMTP') as mock_smtp:
-                        mock_server = MagicMock()
-                        mock_smtp.return_value.__enter__.return_value = mock_server
-                        
-                        send_alert_email("Test Service", "https://test.com", "DOWN", 1)
-                        
-                        mock_server.starttls.assert_called_once()
-                        mock_server.send_message.assert_called_once()
+def test_send_alert_email_success(db_session, smtp_settings):
+    """Test successful email sending, reusing one SMTP session."""
+    assert send_alert_email("Test Service", "https://test.com", "DOWN", 1) is True
+    assert send_alert_email("Test Service", "https://test.com", "UP", 0) is True
+
+    assert len(smtp_settings.messages) == 2
+    assert "Subject: =?utf-8?" in smtp_settings.messages[0]
+    assert "To: test@example.com" in smtp_settings.messages[0]
+    assert smtp_settings.connections == 1
 
 
 def test_check_and_send_alert_new_service_down(db_session):
@@ -46,10 +58,10 @@ def test_check_and_send_alert_new_service_down(db_session):
     db_session.add(check)
     db_session.commit()
     
-    with patch('app.alerts.send_alert_email') as mock_send:
+    with patch('app.alerts.enqueue_alert') as mock_enqueue:
         check_and_send_alert(db_session, service, check)
-        mock_send.assert_called_once()
-        assert mock_send.call_args[0][2] == "DOWN"
+        mock_enqueue.assert_called_once()
+        assert mock_enqueue.call_args[0][2] == "DOWN"
 
 
 def test_check_and_send_alert_recovery(db_session):
@@ -77,10 +89,10 @@ def test_check_and_send_alert_recovery(db_session):
     db_session.add(check)
     db_session.commit()
     
-    with patch('app.alerts.send_alert_email') as mock_send:
+    with patch('app.alerts.enqueue_alert') as mock_enqueue:
         check_and_send_alert(db_session, service, check)
-        mock_send.assert_called_once()
-        assert mock_send.call_args[0][2] == "UP"
+        mock_enqueue.assert_called_once()
+        assert mock_enqueue.call_args[0][2] == "UP"
 
 
 def test_check_and_send_alert_consecutive_failures(db_session):
@@ -106,13 +118,318 @@ def test_check_and_send_alert_consecutive_failures(db_session):
     db_session.add(check)
     db_session.commit()
     
-    with patch('app.alerts.send_alert_email') as mock_send:
+    with patch('app.alerts.enqueue_alert') as mock_enqueue:
         check_and_send_alert(db_session, service, check)
         # Should send alert on 5th failure
-        mock_send.assert_called_once()
+        mock_enqueue.assert_called_once()
         
         # Check failure count incremented
         updated_state = db_session.query(AlertState).filter(
             AlertState.service_id == service.id
         ).first()
         assert updated_state.failure_count == 5
+
+
+@pytest.fixture
+def alerts_enabled():
+    with patch('app.alerts.settings.ENABLE_EMAIL_ALERTS', True):
+        yield
+
+
+def test_enqueue_alert_is_idempotent_per_transition(db_session, alerts_enabled):
+    """Queuing the same transition twice creates one delivery and one task."""
+    service = Service(name="Test", url="https://test.com")
+    db_session.add(service)
+    db_session.commit()
+    checked_at = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    with patch('app.tasks.deliver_alert.apply_async') as mock_apply:
+        delivery_id = enqueue_alert(db_session, service, "DOWN", 1, checked_at)
+        assert enqueue_alert(db_session, service, "DOWN", 1, checked_at.replace(tzinfo=None)) is None
+
+    mock_apply.assert_called_once_with((delivery_id,), queue="alerts")
+    delivery = db_session.query(AlertDelivery).one()
+    assert (delivery.state, delivery.alert_status, delivery.attempts) == ("pending", "DOWN", 0)
+
+
+def test_enqueue_alert_skipped_when_disabled(db_session):
+    service = Service(name="Test", url="https://test.com")
+    db_session.add(service)
+    db_session.commit()
+
+    with patch('app.tasks.deliver_alert.apply_async') as mock_apply:
+        assert enqueue_alert(db_session, service, "DOWN", 1, datetime(2024, 1, 1)) is None
+    mock_apply.assert_not_called()
+    assert db_session.query(AlertDelivery).count() == 0
+
+
+def _pending_delivery(db):
+    service = Service(name="Test", url="https://test.com")
+    db.add(service)
+    db.commit()
+    delivery = AlertDelivery(
+        idempotency_key=f"{service.id}:DOWN:1:{db.query(AlertDelivery).count()}",
+        service_id=service.id,
+        alert_status="DOWN",
+        failure_count=1,
+    )
+    db.add(delivery)
+    db.commit()
+    return delivery.id
+
+
+def test_deliver_alert_retries_then_sends(task_db):
+    delivery_id = _pending_delivery(task_db)
+
+    with patch('app.tasks.send_alert_email', side_effect=[smtplib.SMTPServerDisconnected("gone"), True]) as mock_send:
+        assert deliver_alert.apply(args=(delivery_id,)).get() == "sent"
+        assert mock_send.call_args.kwargs["raise_errors"] is True
+
+    task_db.expire_all()
+    delivery = task_db.get(AlertDelivery, delivery_id)
+    assert (delivery.state, delivery.attempts, delivery.last_error) == ("sent", 2, None)
+    assert delivery.sent_at is not None
+
+    # Already sent: a redelivered task does nothing
+    with patch('app.tasks.send_alert_email') as mock_send:
+        assert deliver_alert.apply(args=(delivery_id,)).get() == "sent"
+        mock_send.assert_not_called()
+
+
+def test_deliver_alert_gives_up_after_max_retries(task_db):
+    delivery_id = _pending_delivery(task_db)
+
+    with patch.object(deliver_alert, 'max_retries', 2), \
+         patch('app.tasks.send_alert_email', side_effect=smtplib.SMTPException("rate limited")):
+        assert deliver_alert.apply(args=(delivery_id,)).get() == "failed"
+
+    task_db.expire_all()
+    delivery = task_db.get(AlertDelivery, delivery_id)
+    assert (delivery.state, delivery.attempts, delivery.last_error) == ("failed", 3, "rate limited")
+
+
+def test_redispatch_pending_requeues_lost_deliveries(db_session):
+    now = datetime(2024, 1, 1, 12, 0)
+    lost, waiting, sent = (_pending_delivery(db_session) for _ in range(3))
+    for delivery_id, state, updated_at in (
+        (lost, "pending", datetime(2024, 1, 1, 10, 0)),
+        (waiting, "pending", datetime(2024, 1, 1, 11, 50)),  # retry still scheduled
+        (sent, "sent", datetime(2024, 1, 1, 10, 0)),
+    ):
+        db_session.query(AlertDelivery).filter(AlertDelivery.id == delivery_id).update(
+            {AlertDelivery.state: state, AlertDelivery.updated_at: updated_at},
+            synchronize_session=False,
+        )
+    db_session.commit()
+
+    # Broker still down: nothing changes, the next run tries again
+    with patch('app.alerts.dispatch_deliveries', side_effect=ConnectionError("broker down")):
+        with pytest.raises(ConnectionError):
+            redispatch_pending(db_session, now=now)
+
+    with patch('app.tasks.deliver_alert.apply_async') as mock_apply:
+        assert redispatch_pending(db_session, now=now) == [lost]
+        # Stamped, so it isn't queued again until another period has passed
+        assert redispatch_pending(db_session, now=now) == []
+    mock_apply.assert_called_once_with((lost,), queue="alerts")
+
+
+def test_redispatch_pending_alerts_task(task_db):
+    delivery_id = _pending_delivery(task_db)
+    task_db.query(AlertDelivery).update({AlertDelivery.updated_at: datetime(2024, 1, 1)})
+    task_db.commit()
+
+    with patch('app.tasks.deliver_alert.apply_async') as mock_apply:
+        assert redispatch_pending_alerts.apply().get() == [delivery_id]
+    mock_apply.assert_called_once_with((delivery_id,), queue="alerts")
+
+
+def test_enqueue_alerts_survives_broker_outage(db_session, alerts_enabled):
+    service = Service(name="Test", url="https://test.com")
+    db_session.add(service)
+    db_session.commit()
+
+    with patch('app.tasks.deliver_alert.apply_async', side_effect=ConnectionError("broker down")):
+        delivery_id = enqueue_alert(db_session, service, "DOWN", 1, datetime(2024, 1, 1))
+
+    assert db_session.get(AlertDelivery, delivery_id).state == "pending"
+
+
+def test_retry_delay_doubles_up_to_cap():
+    with patch('app.alerts.settings.ALERT_RETRY_BACKOFF_SECONDS', 30.0), \
+         patch('app.alerts.settings.ALERT_RETRY_BACKOFF_MAX_SECONDS', 100.0):
+        assert [retry_delay(n) for n in range(4)] == [30.0, 60.0, 100.0, 100.0]
+
+
+def test_deliver_alerts_sends_batch_over_one_session(task_db, smtp_settings):
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(3)]
+    task_db.add_all(services)
+    task_db.commit()
+
+    with patch('app.tasks.deliver_alert.apply_async') as mock_single, \
+         patch('app.tasks.deliver_alerts.apply_async') as mock_batch:
+        delivery_ids = enqueue_alerts(
+            task_db, [(service, "DOWN", 1, datetime(2024, 1, 1)) for service in services]
+        )
+        # Several alerts at once go out as one deliver_alerts batch
+        mock_batch.assert_called_once_with((delivery_ids,), queue="alerts")
+
+        assert deliver_alerts.apply(args=(delivery_ids,)).get() == {"sent": 3, "skipped": 0, "retrying": 0}
+        mock_single.assert_not_called()
+
+    assert len(smtp_settings.messages) == 3
+    assert smtp_settings.connections == 1
+    task_db.expire_all()
+    states = {d.id: d.state for d in task_db.query(AlertDelivery)}
+    assert [states[delivery_id] for delivery_id in delivery_ids] == ["sent"] * 3
+
+
+def test_deliver_alerts_hands_failures_to_deliver_alert(task_db):
+    delivery_ids = [_pending_delivery(task_db), _pending_delivery(task_db)]
+
+    with patch('app.alerts.settings.ENABLE_EMAIL_ALERTS', True), \
+         patch('app.alerts.settings.SMTP_HOST', 'smtp.test.com'), \
+         patch('app.alerts.settings.ALERT_TO_EMAILS', 'test@example.com'), \
+         patch('app.tasks.smtp_pool.send_batch', return_value=[None, smtplib.SMTPDataError(451, b"later")]), \
+         patch('app.tasks.deliver_alert.apply_async') as mock_retry:
+        assert deliver_alerts.apply(args=(delivery_ids,)).get() == {"sent": 1, "skipped": 0, "retrying": 1}
+
+    assert mock_retry.call_args[0][0] == (delivery_ids[1],)
+    task_db.expire_all()
+    failed = task_db.get(AlertDelivery, delivery_ids[1])
+    assert (failed.state, failed.attempts) == ("pending", 1)
+
+
+def _run(statuses, last_status="UP"):
+    """Feed `statuses` through evaluate_alert; return the alerts raised."""
+    state = AlertTransition(last_status, 0, None, False)
+    alerts = []
+    for status in statuses:
+        state = evaluate_alert(state.last_status, state.failure_count, status,
+                               state.recent_outcomes, state.flapping)
+        alerts.append(state.alert)
+    return alerts, state
+
+
+def test_default_engine_matches_legacy_alerts():
+    alerts, state = _run(["DOWN"] * 5 + ["UP", "UP"])
+    assert alerts == ["DOWN", None, None, None, "DOWN", "UP", None]
+    assert state.recent_outcomes == "U"
+
+
+def test_n_of_m_confirmation():
+    with patch('app.alerts.settings.ALERT_CONFIRM_FAILURES', 2), \
+         patch('app.alerts.settings.ALERT_CONFIRM_WINDOW', 3):
+        # One flaky probe alerts nobody
+        alerts, state = _run(["DOWN", "UP", "UP", "UP"])
+        assert alerts == [None] * 4
+        assert state.last_status == "UP"
+
+        alerts, state = _run(["DOWN", "UP", "DOWN"])
+        assert alerts == [None, None, "DOWN"]
+        assert state.last_status == "DOWN"
+
+
+def test_recovery_hysteresis():
+    with patch('app.alerts.settings.ALERT_RECOVERY_SUCCESSES', 3):
+        alerts, state = _run(["UP", "UP", "DOWN", "UP", "UP", "UP"], last_status="DOWN")
+        assert alerts == [None, None, None, None, None, "UP"]
+        assert state.last_status == "UP"
+
+
+def test_flap_detection_suppresses_storm():
+    with patch('app.alerts.settings.FLAP_DETECTION_ENABLED', True), \
+         patch('app.alerts.settings.FLAP_WINDOW', 10):
+        alerts, state = _run(["DOWN", "UP"] * 10)
+        sent = [alert for alert in alerts if alert]
+        # A couple of real flips, then one FLAPPING alert and silence
+        assert sent[-1] == "FLAPPING"
+        assert len(sent) < 6
+        assert state.flapping and state.flap_score == 1.0
+
+        settled = []
+        for _ in range(10):
+            state = evaluate_alert(state.last_status, state.failure_count, "UP",
+                                   state.recent_outcomes, state.flapping)
+            settled.append(state.alert)
+        # One alert with the settled status once the score drops below the low threshold
+        assert [alert for alert in settled if alert] == ["UP"]
+        assert not state.flapping
+
+
+def test_flap_score_weights_recent_changes():
+    assert flap_score("") == 0.0
+    assert flap_score("UUUU") == 0.0
+    assert flap_score("UDUD") == 1.0
+    assert flap_score("UDUUU") < flap_score("UUUDU")
+
+
+def test_check_and_send_alert_keeps_outcome_buffer(db_session):
+    service = Service(name="Test", url="https://test.com")
+    db_session.add(service)
+    db_session.commit()
+
+    with patch('app.alerts.settings.ALERT_CONFIRM_FAILURES', 2), \
+         patch('app.alerts.settings.ALERT_CONFIRM_WINDOW', 3), \
+         patch('app.alerts.enqueue_alert') as mock_enqueue:
+        for status in ("DOWN", "UP", "DOWN"):
+            check_and_send_alert(db_session, service, CheckHistory(service_id=service.id, status=status))
+
+    state = db_session.query(AlertState).filter(AlertState.service_id == service.id).one()
+    assert (state.last_status, state.recent_outcomes) == ("DOWN", "DUD")
+    mock_enqueue.assert_called_once()
+
+
+class FakeVersionRedis:
+    def __init__(self):
+        self.values = {}
+        self.down = False
+
+    def get(self, key):
+        if self.down:
+            raise ConnectionError("redis down")
+        return self.values.get(key)
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key) or 0) + 1
+        return self.values[key]
+
+
+@pytest.fixture
+def recipients_redis():
+    redis = FakeVersionRedis()
+    with patch('app.alerts.settings.RECIPIENTS_CACHE_ENABLED', True), \
+         patch('app.alerts.get_redis', return_value=redis), \
+         patch('app.alerts.recipients_cache', RecipientsCache()):
+        yield redis
+
+
+def test_recipients_cached_until_version_bumps(client, db_session, recipients_redis):
+    with patch('app.alerts.load_alert_recipients', wraps=load_alert_recipients) as mock_load:
+        client.post("/api/v1/alerts/recipients", json={"emails": ["a@example.com"]})
+        for _ in range(5):
+            assert get_alert_recipients(db_session) == ["a@example.com"]
+        assert mock_load.call_count == 1
+
+        # Another process updating bumps the shared version
+        recipients_redis.incr(RECIPIENTS_VERSION_KEY)
+        assert get_alert_recipients(db_session) == ["a@example.com"]
+        assert mock_load.call_count == 2
+
+        # Updating through the API invalidates this process and the others
+        client.post("/api/v1/alerts/recipients", json={"emails": ["b@example.com", "c@example.com"]})
+        assert get_alert_recipients(db_session) == ["b@example.com", "c@example.com"]
+        assert mock_load.call_count == 3
+    assert int(recipients_redis.values[RECIPIENTS_VERSION_KEY]) == 3
+
+
+def test_recipients_cache_uses_ttl_without_redis(db_session, recipients_redis):
+    recipients_redis.down = True
+    with patch('app.alerts.load_alert_recipients', return_value=["a@example.com"]) as mock_load:
+        get_alert_recipients(db_session)
+        get_alert_recipients(db_session)
+        assert mock_load.call_count == 1
+
+        with patch('app.alerts.settings.RECIPIENTS_CACHE_TTL_SECONDS', 0):
+            get_alert_recipients(db_session)
+        assert mock_load.call_count == 2
@@ -2,6 +2,7 @@
 Tests for API endpoints.
 """
 import pytest
+from datetime import datetime, timedelta
 from app.models import Service, CheckHistory
 
 
@@ -27,6 +28,46 @@ def test_create_service(client):
     assert "created_at" in data
 
 
+def test_create_service_with_interval(client):
+    """Test creating a service with its own check interval."""
+    payload = {
+        "name": "Critical",
+        "url": "https://critical.example.com",
+        "interval_seconds": 15,
+    }
+    response = client.post("/api/v1/services", json=payload)
+    assert response.status_code == 201
+    assert response.json()["interval_seconds"] == 15
+
+    response = client.post("/api/v1/services", json={"name": "Default", "url": "https://a.com"})
+    assert response.json()["interval_seconds"] == 120
+
+
+def test_create_service_check_method(client):
+    """Test creating a service with a bounded check method."""
+    payload = {
+        "name": "Heavy page",
+        "url": "https://heavy.example.com",
+        "check_method": "GET_CAPPED",
+        "max_body_bytes": 1024,
+    }
+    response = client.post("/api/v1/services", json=payload)
+    assert response.status_code == 201
+    assert response.json()["check_method"] == "GET_CAPPED"
+    assert response.json()["max_body_bytes"] == 1024
+
+    payload["check_method"] = "POST"
+    response = client.post("/api/v1/services", json=payload)
+    assert response.status_code == 422
+
+
+def test_create_service_interval_too_short(client):
+    """Test that intervals below the minimum are rejected."""
+    payload = {"name": "Spammy", "url": "https://a.com", "interval_seconds": 1}
+    response = client.post("/api/v1/services", json=payload)
+    assert response.status_code == 422
+
+
 def test_create_service_invalid_url(client):
     """Test creating service with invalid URL."""
     payload = {
@@ -84,7 +125,8 @@ def test_get_history(client, sample_service, db_session):
         service_id=sample_service.id,
         status="UP",
         status_code=200,
-        latency=0.5
+        latency=0.5,
+        ttfb_time=0.3
     )
     db_session.add(check)
     db_session.commit()
@@ -95,6 +137,8 @@ def test_get_history(client, sample_service, db_session):
     assert len(data) == 1
     assert data[0]["status"] == "UP"
     assert data[0]["status_code"] == 200
+    assert data[0]["ttfb_time"] == 0.3
+    assert data[0]["tls_time"] is None
 
 
 def test_get_history_pagination(client, sample_service, db_session):
@@ -125,3 +169,135 @@ def test_get_history_service_not_found(client):
     """Test getting history for non-existent service."""
     response = client.get("/api/v1/services/999/history")
     assert response.status_code == 404
+
+
+def test_get_history_keyset_pagination(client, sample_service, db_session):
+    """Cursor pages walk the history newest first without gaps or repeats."""
+    # Two checks share each timestamp, so the id tie-breaker matters
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    for i in range(12):
+        db_session.add(CheckHistory(
+            service_id=sample_service.id,
+            status="UP",
+            status_code=200,
+            latency=0.1,
+            checked_at=base + timedelta(minutes=i // 2),
+        ))
+    db_session.commit()
+
+    url = f"/api/v1/services/{sample_service.id}/history?limit=5"
+    seen = []
+    response = client.get(url)
+    while True:
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        response = client.get(url, params={"before": cursor})
+
+    assert seen == list(range(12, 0, -1))
+
+    # Cross-origin clients (the dashboard) may read the cursor header
+    response = client.get(url, headers={"Origin": "http://localhost:5173"})
+    assert "X-Next-Cursor" in response.headers["Access-Control-Expose-Headers"]
+
+
+def test_get_history_invalid_cursor(client, sample_service):
+    response = client.get(
+        f"/api/v1/services/{sample_service.id}/history",
+        params={"before": "yesterday"},
+    )
+    assert response.status_code == 422
+
+
+def test_dashboard(client, db_session):
+    """One request returns latest status, summary and recent checks per service."""
+    from app.result_writer import ResultWriter
+    from unittest.mock import patch
+
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(3)]
+    db_session.add_all(services)
+    db_session.commit()
+
+    now = datetime.utcnow()
+    with patch('app.result_writer.enqueue_alerts'):
+        writer = ResultWriter(db_session)
+        for i in range(5):
+            for service in services[:2]:
+                writer.add(service, CheckHistory(
+                    service_id=service.id,
+                    status="DOWN" if (service is services[1] and i == 0) else "UP",
+                    status_code=200,
+                    latency=5.0 if (service is services[1] and i == 0) else 0.1,
+                    checked_at=now - timedelta(minutes=i),
+                ))
+        writer.flush()
+
+    response = client.get("/api/v1/dashboard?history=3&limit=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["next_after_id"] == services[1].id
+
+    first, second = data["services"]
+    assert first["service"]["name"] == "S0"
+    assert len(first["recent"]) == 3
+    assert first["recent"][0]["checked_at"] > first["recent"][1]["checked_at"]
+    assert first["check_count_24h"] == 5
+    assert first["uptime_pct_24h"] == 100.0
+    assert first["avg_latency_ms_24h"] == 100.0
+    assert second["latest"]["status"] == "DOWN"
+    assert second["uptime_pct_24h"] == 80.0
+    assert second["avg_latency_ms_24h"] == 100.0  # UP checks only
+
+    response = client.get(f"/api/v1/dashboard?after_id={data['next_after_id']}")
+    data = response.json()
+    assert [item["service"]["name"] for item in data["services"]] == ["S2"]
+    assert data["services"][0]["latest"] is None
+    assert data["services"][0]["recent"] == []
+    assert data["next_after_id"] is None
+
+    response = client.get(f"/api/v1/dashboard?ids={services[2].id}")
+    assert len(response.json()["services"]) == 1
+    assert client.get("/api/v1/dashboard?ids=a,b").status_code == 422
+
+
+def test_list_services_etag(client, db_session):
+    response = client.get("/api/v1/services")
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/v1/services", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.post("/api/v1/services", json={"name": "New", "url": "https://new.com"})
+    response = client.get("/api/v1/services", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_history_conditional_get(client, sample_service, db_session):
+    db_session.add(CheckHistory(
+        service_id=sample_service.id, status="UP", status_code=200, latency=0.1,
+        checked_at=datetime(2024, 1, 1, 12, 0, 0, 500000),
+    ))
+    db_session.commit()
+    url = f"/api/v1/services/{sample_service.id}/history"
+
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"] == "Mon, 01 Jan 2024 12:00:00 GMT"
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-Modified-Since": "Mon, 01 Jan 2024 12:00:00 GMT"}).status_code == 304
+    # Different parameters are a different representation
+    assert client.get(url + "?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+    db_session.add(CheckHistory(
+        service_id=sample_service.id, status="DOWN", status_code=0, latency=5.0,
+        checked_at=datetime(2024, 1, 1, 12, 2, 0),
+    ))
+    db_session.commit()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
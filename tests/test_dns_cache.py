@@ -0,0 +1,107 @@
+"""
+Tests for the checker's DNS cache.
+"""
+import asyncio
+import socket
+
+import httpcore
+import pytest
+from unittest.mock import AsyncMock
+from app.dns_cache import CachingNetworkBackend, DNSCache
+
+
+def counting_resolver(answers):
+    """Fake resolver returning `answers[host]` (or raising it) and counting calls."""
+    calls = []
+
+    async def resolve(host, port):
+        calls.append(host)
+        await asyncio.sleep(0.01)
+        answer = answers[host]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return resolve, calls
+
+
+def test_positive_answers_are_cached():
+    resolver, calls = counting_resolver({"a.com": ["10.0.0.1"]})
+    cache = DNSCache(ttl=60, negative_ttl=10, resolver=resolver)
+
+    async def scenario():
+        first = await cache.resolve("a.com", 443)
+        second = await cache.resolve("a.com", 443)
+        return first, second
+
+    assert asyncio.run(scenario()) == (["10.0.0.1"], ["10.0.0.1"])
+    assert calls == ["a.com"]
+
+
+def test_expired_answers_are_refreshed():
+    resolver, calls = counting_resolver({"a.com": ["10.0.0.1"]})
+    cache = DNSCache(ttl=0, negative_ttl=0, resolver=resolver)
+
+    async def scenario():
+        await cache.resolve("a.com", 443)
+        await cache.resolve("a.com", 443)
+
+    asyncio.run(scenario())
+    assert calls == ["a.com", "a.com"]
+
+
+def test_failures_are_negatively_cached():
+    resolver, calls = counting_resolver({"gone.com": socket.gaierror("NXDOMAIN")})
+    cache = DNSCache(ttl=60, negative_ttl=10, resolver=resolver)
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(socket.gaierror):
+                await cache.resolve("gone.com", 443)
+
+    asyncio.run(scenario())
+    assert calls == ["gone.com"]
+
+
+def test_concurrent_lookups_are_coalesced():
+    resolver, calls = counting_resolver({"a.com": ["10.0.0.1"]})
+    cache = DNSCache(ttl=60, negative_ttl=10, resolver=resolver)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.resolve("a.com", 443) for _ in range(50)))
+
+    results = asyncio.run(scenario())
+    assert all(r == ["10.0.0.1"] for r in results)
+    assert calls == ["a.com"]
+
+
+def test_backend_connects_to_cached_addresses():
+    """The network backend dials resolved IPs, falling through on failure."""
+    resolver, calls = counting_resolver({"a.com": ["10.0.0.1", "10.0.0.2"]})
+    inner = AsyncMock()
+    inner.connect_tcp.side_effect = [httpcore.ConnectError("refused"), "stream"]
+    backend = CachingNetworkBackend(DNSCache(resolver=resolver), backend=inner)
+
+    stream = asyncio.run(backend.connect_tcp("a.com", 443, timeout=5))
+
+    assert stream == "stream"
+    assert [c.args[0] for c in inner.connect_tcp.call_args_list] == ["10.0.0.1", "10.0.0.2"]
+
+
+def test_backend_maps_dns_failure_to_connect_error():
+    resolver, _ = counting_resolver({"gone.com": socket.gaierror("NXDOMAIN")})
+    backend = CachingNetworkBackend(DNSCache(resolver=resolver), backend=AsyncMock())
+
+    with pytest.raises(httpcore.ConnectError):
+        asyncio.run(backend.connect_tcp("gone.com", 443, timeout=5))
+
+
+def test_backend_skips_lookup_for_ip_literals():
+    resolver, calls = counting_resolver({})
+    inner = AsyncMock()
+    backend = CachingNetworkBackend(DNSCache(resolver=resolver), backend=inner)
+
+    asyncio.run(backend.connect_tcp("127.0.0.1", 80, timeout=5))
+
+    assert calls == []
+    assert inner.connect_tcp.call_args.args[0] == "127.0.0.1"
@@ -0,0 +1,118 @@
+"""
+Tests for live check/alert events.
+"""
+import asyncio
+import json
+
+from unittest.mock import MagicMock, patch
+from app.events import EVENTS_CHANNEL, EventHub, format_sse, publish_events, stream
+from app.models import Service, CheckHistory
+from app.result_writer import ResultWriter
+
+
+class FakePubSub:
+    """Stand-in for redis.asyncio PubSub fed from an asyncio.Queue."""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.channels = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return {"data": await asyncio.wait_for(self.messages.get(), timeout)}
+        except asyncio.TimeoutError:
+            return None
+
+
+class FakeRedis:
+    def __init__(self, messages):
+        self._pubsub = FakePubSub(messages)
+
+    def pubsub(self):
+        return self._pubsub
+
+    async def aclose(self):
+        pass
+
+
+def test_publish_events_is_best_effort():
+    redis = MagicMock()
+    with patch("app.events.settings.EVENTS_ENABLED", True), \
+         patch("app.events.get_redis", return_value=redis):
+        publish_events([{"type": "check", "service_id": 1}])
+        redis.publish.assert_called_once_with(EVENTS_CHANNEL, '[{"type": "check", "service_id": 1}]')
+
+        redis.publish.side_effect = ConnectionError("redis down")
+        publish_events([{"type": "check", "service_id": 1}])  # does not raise
+
+
+def test_writer_publishes_after_commit(db_session):
+    service = Service(name="S", url="https://s.com")
+    db_session.add(service)
+    db_session.commit()
+
+    with patch("app.result_writer.enqueue_alerts"), \
+         patch("app.result_writer.publish_events") as mock_publish:
+        writer = ResultWriter(db_session)
+        writer.add(service, CheckHistory(service_id=service.id, status="DOWN", status_code=0, latency=5.0))
+        writer.add(service, CheckHistory(service_id=service.id, status="DOWN", status_code=0, latency=5.0))
+        mock_publish.assert_not_called()
+        writer.flush()
+
+    events = mock_publish.call_args[0][0]
+    assert [event["type"] for event in events] == ["check", "alert", "check"]
+    assert events[1] == {"type": "alert", "service_id": service.id, "status": "DOWN", "failure_count": 1, "flapping": False}
+    json.dumps(events)  # serializable as published
+
+
+def test_format_sse():
+    frame = format_sse({"type": "check", "service_id": 3})
+    assert frame == 'event: check\ndata: {"type": "check", "service_id": 3}\n\n'
+
+
+def test_hub_fans_out_to_every_client():
+    async def scenario():
+        messages = asyncio.Queue()
+        hub = EventHub(redis_factory=lambda: FakeRedis(messages), queue_size=2)
+        first, second = hub.subscribe(), hub.subscribe()
+
+        await messages.put(json.dumps([{"type": "check", "service_id": 1}]))
+        got = await asyncio.wait_for(first.get(), 1)
+        assert got["service_id"] == 1
+        assert (await asyncio.wait_for(second.get(), 1))["service_id"] == 1
+
+        # A slow client keeps only the newest queue_size events
+        hub.unsubscribe(first)
+        hub.dispatch(json.dumps([{"type": "check", "service_id": i} for i in range(5)]))
+        assert [second.get_nowait()["service_id"] for _ in range(2)] == [3, 4]
+        assert first.empty()
+
+        await hub.close()
+
+    asyncio.run(scenario())
+
+
+def test_stream_filters_and_sends_heartbeats():
+    async def scenario():
+        queue = asyncio.Queue()
+        for service_id in (1, 2):
+            queue.put_nowait({"type": "check", "service_id": service_id})
+        disconnected = iter([False, False, False, True])
+
+        async def is_disconnected():
+            return next(disconnected)
+
+        return [frame async for frame in stream(queue, is_disconnected, service_ids={2}, heartbeat=0.01)]
+
+    frames = asyncio.run(scenario())
+    assert frames[0].startswith("retry:")
+    assert frames[1:] == [format_sse({"type": "check", "service_id": 2}), ": keepalive\n\n"]
@@ -0,0 +1,107 @@
+"""
+Tests for streaming history export.
+"""
+import csv
+import io
+import json
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from sqlalchemy.orm import sessionmaker
+
+from app import export
+from app.models import CheckHistory, Service
+
+
+START = datetime(2024, 1, 1)
+
+
+def _history(db_session, services, count):
+    for service in services:
+        db_session.add_all([
+            CheckHistory(service_id=service.id, status="UP" if i % 3 else "DOWN", status_code=200,
+                         latency=0.1 * i, checked_at=START + timedelta(minutes=i))
+            for i in range(count)
+        ])
+    db_session.commit()
+
+
+@pytest.fixture
+def services(db_session):
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(3)]
+    db_session.add_all(services)
+    db_session.commit()
+    _history(db_session, services, 10)
+    return services
+
+
+def test_iter_rows_filters_orders_and_chunks(db_session, services):
+    chunks = list(export.iter_rows(
+        db_session,
+        [services[0].id, services[2].id],
+        start=START + timedelta(minutes=2),
+        end=START + timedelta(minutes=8),
+        chunk_size=4,
+    ))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 4]
+    rows = [row for chunk in chunks for row in chunk]
+    assert [row[1] for row in rows] == [services[0].id] * 6 + [services[2].id] * 6
+    assert rows[0][-1] == START + timedelta(minutes=2)
+    assert rows[5][-1] == START + timedelta(minutes=7)
+
+
+def test_csv_export(db_session, services):
+    data = b"".join(export.export(db_session, "csv", [services[1].id], chunk_size=3)).decode()
+    rows = list(csv.DictReader(io.StringIO(data)))
+    assert len(rows) == 10
+    assert rows[0]["checked_at"] == "2024-01-01T00:00:00"
+    assert rows[0]["status"] == "DOWN"
+
+    empty = b"".join(export.export(db_session, "csv", [999])).decode()
+    assert empty.strip() == ",".join(export.EXPORT_COLUMNS)
+
+
+def test_ndjson_export(db_session, services):
+    lines = b"".join(export.export(db_session, "ndjson", chunk_size=7)).decode().splitlines()
+    assert len(lines) == 30
+    first = json.loads(lines[0])
+    assert list(first) == list(export.EXPORT_COLUMNS)
+    assert first["service_id"] == services[0].id
+
+
+def test_unknown_format_rejected(db_session):
+    with pytest.raises(ValueError):
+        export.export(db_session, "xlsx")
+
+
+@pytest.mark.skipif(export.pyarrow is None, reason="pyarrow not installed")
+def test_parquet_export(db_session, services):
+    data = b"".join(export.export(db_session, "parquet", chunk_size=4))
+    table = export.pyarrow.parquet.read_table(export.pyarrow.BufferReader(data))
+    assert table.num_rows == 30
+    assert table.column_names == list(export.EXPORT_COLUMNS)
+
+
+def test_export_endpoint(client, db_session, services):
+    # The route opens its own session for the streamed body
+    with patch("app.routes.SessionLocal", sessionmaker(bind=db_session.get_bind())):
+        response = client.get(
+            "/api/v1/export",
+            params={"ids": f"{services[0].id}", "start": "2024-01-01T00:05:00Z", "format": "ndjson"},
+        )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "check_history.ndjson" in response.headers["content-disposition"]
+    assert len(response.text.splitlines()) == 5
+
+    assert client.get("/api/v1/export", params={"format": "xlsx"}).status_code == 422
+
+
+def test_cli_writes_file(db_session, services, tmp_path):
+    output = tmp_path / "out.csv"
+    with patch("app.database.SessionLocal", sessionmaker(bind=db_session.get_bind())):
+        export.main(["--service", str(services[2].id), "--end", "2024-01-01T00:03:00", "--output", str(output)])
+    assert len(output.read_text().splitlines()) == 4
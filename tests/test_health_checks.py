@@ -1,10 +1,30 @@
 """
 Tests for health check functionality.
 """
+import asyncio
+import contextlib
+import time
+
+import httpx
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
+from app.check_engine import run_checks, close_pool
 from app.health_checks import check_service
+from app import http_pool
+from app.http_pool import OriginPool, origin_of
 from app.models import Service, CheckHistory
+from app.timings import PhaseTimings
+
+
+@contextlib.contextmanager
+def mock_transport(handler):
+    """Route every probe through `handler`, starting and ending with an empty pool."""
+    close_pool()
+    with patch('app.http_pool._build_transport', side_effect=lambda *_: httpx.MockTransport(handler)):
+        try:
+            yield
+        finally:
+            close_pool()
 
 
 def test_check_service_success(db_session):
@@ -12,13 +32,10 @@ def test_check_service_success(db_session):
     service = Service(name="Test", url="https://example.com")
     db_session.add(service)
     db_session.commit()
-    
-    mock_response = Mock()
-    mock_response.status_code = 200
-    
-    with patch('app.health_checks.requests.get', return_value=mock_response):
+
+    with mock_transport(lambda request: httpx.Response(200)):
         result = check_service(db_session, service)
-    
+
     assert result.status == "UP"
     assert result.status_code == 200
     assert result.latency > 0
@@ -30,10 +47,13 @@ def test_check_service_timeout(db_session):
     service = Service(name="Test", url="https://slow-site.com")
     db_session.add(service)
     db_session.commit()
-    
-    with patch('app.health_checks.requests.get', side_effect=Exception("Timeout")):
+
+    def handler(request):
+        raise httpx.ReadTimeout("Timeout", request=request)
+
+    with mock_transport(handler):
         result = check_service(db_session, service)
-    
+
     assert result.status == "DOWN"
     assert result.status_code == 0
     assert result.latency > 0
@@ -44,10 +64,239 @@ def test_check_service_connection_error(db_session):
     service = Service(name="Test", url="https://nonexistent.com")
     db_session.add(service)
     db_session.commit()
-    
-    from requests.exceptions import ConnectionError
-    with patch('app.health_checks.requests.get', side_effect=ConnectionError("Failed")):
+
+    def handler(request):
+        raise httpx.ConnectError("Failed", request=request)
+
+    with mock_transport(handler):
         result = check_service(db_session, service)
-    
+
+    assert result.status == "DOWN"
+    assert result.status_code == 0
+
+
+def test_check_service_unexpected_error(db_session):
+    """Test that any other exception is still recorded as DOWN."""
+    service = Service(name="Test", url="https://broken.com")
+    db_session.add(service)
+    db_session.commit()
+
+    def handler(request):
+        raise Exception("Boom")
+
+    with mock_transport(handler):
+        result = check_service(db_session, service)
+
     assert result.status == "DOWN"
     assert result.status_code == 0
+
+
+def test_run_checks_is_concurrent():
+    """A run over N slow services takes about one latency, not N."""
+    services = [Service(id=i, name=f"S{i}", url=f"https://s{i}.com") for i in range(1, 11)]
+
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200)
+
+    start = time.monotonic()
+    with mock_transport(handler):
+        records = run_checks(services, concurrency=10)
+    elapsed = time.monotonic() - start
+
+    assert [r.service_id for r in records] == list(range(1, 11))
+    assert all(r.status == "UP" for r in records)
+    assert elapsed < 1.0
+
+
+def test_run_checks_respects_concurrency_limit():
+    """No more than `concurrency` probes are ever in flight."""
+    services = [Service(id=i, name=f"S{i}", url=f"https://s{i}.com") for i in range(1, 13)]
+    in_flight = 0
+    peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return httpx.Response(204)
+
+    with mock_transport(handler):
+        records = run_checks(services, concurrency=3)
+
+    assert len(records) == 12
+    assert peak == 3
+
+
+def test_origin_of_normalises_default_ports():
+    """Pool keys are scheme + host + port, with default ports filled in."""
+    assert origin_of("https://Example.com/health") == ("https", "example.com", 443)
+    assert origin_of("http://example.com:8080/") == ("http", "example.com", 8080)
+    assert origin_of("http://example.com") != origin_of("https://example.com")
+
+
+def test_pool_reuses_client_per_origin():
+    """Services on the same origin share one keep-alive client across runs."""
+    services = [
+        Service(id=1, name="A", url="https://shared.com/a"),
+        Service(id=2, name="B", url="https://shared.com/b"),
+        Service(id=3, name="C", url="https://other.com/"),
+    ]
+    with mock_transport(lambda request: httpx.Response(200)):
+        with patch('app.http_pool._build_client', wraps=http_pool._build_client) as build:
+            run_checks(services)
+            run_checks(services)
+    assert build.call_count == 2
+
+
+def test_fresh_connection_bypasses_pool():
+    """fresh_connection services get a throwaway client every time."""
+    service = Service(id=1, name="Cold", url="https://cold.com/", fresh_connection=True)
+    with mock_transport(lambda request: httpx.Response(200)):
+        with patch('app.http_pool._build_client', wraps=http_pool._build_client) as build:
+            records = run_checks([service])
+            run_checks([service])
+    assert records[0].status == "UP"
+    assert build.call_count == 2
+
+
+def test_pool_evicts_idle_origins():
+    """Origins unused for idle_seconds have their client closed."""
+    async def scenario():
+        pool = OriginPool(idle_seconds=0.01)
+        client = pool.acquire("https://idle.com/")
+        await asyncio.sleep(0.02)
+        evicted = await pool.evict_idle()
+        return pool, client, evicted
+
+    with patch('app.http_pool._build_transport', side_effect=lambda *_: httpx.MockTransport(lambda r: httpx.Response(200))):
+        pool, client, evicted = asyncio.run(scenario())
+    assert evicted == 1
+    assert len(pool) == 0
+    assert client.is_closed
+
+
+def test_phase_timings_from_trace_events():
+    """Trace events are folded into DNS/connect/TLS/TTFB/body phases."""
+    timings = PhaseTimings()
+    clock = iter([0.0, 0.5, 0.6, 1.0, 1.5, 2.0, 2.1])
+
+    async def feed():
+        with patch('app.timings.time.perf_counter', side_effect=lambda: next(clock)):
+            await timings.trace("connection.connect_tcp.started", {})
+            timings.record_dns(0.2)
+            await timings.trace("connection.connect_tcp.complete", {})   # 0.5
+            await timings.trace("connection.start_tls.started", {})      # 0.6
+            await timings.trace("connection.start_tls.complete", {})     # 1.0
+            await timings.trace("http11.send_request_headers.started", {})     # 1.5
+            await timings.trace("http11.receive_response_headers.complete", {})  # 2.0
+            await timings.trace("http11.receive_response_body.started", {})    # 2.1
+
+    asyncio.run(feed())
+
+    assert timings.dns == pytest.approx(0.2)
+    assert timings.connect == pytest.approx(0.3)
+    assert timings.tls == pytest.approx(0.4)
+    assert timings.ttfb == pytest.approx(0.5)
+    assert timings.body is None
+    assert timings.acquired_at == 0.0
+    assert timings.as_columns()["tls_time"] == pytest.approx(0.4)
+
+
+def test_latency_excludes_wait_for_pooled_connection(db_session):
+    """The clock starts when the pool hands out a connection."""
+    service = Service(name="Test", url="https://example.com")
+    db_session.add(service)
+    db_session.commit()
+
+    async def handler(request):
+        await asyncio.sleep(0.3)  # queued behind other probes to the origin
+        await request.extensions["trace"]("http11.send_request_headers.started", {})
+        return httpx.Response(200)
+
+    with mock_transport(handler):
+        result = check_service(db_session, service)
+
+    assert result.status == "UP"
+    assert result.latency < 0.3
+
+
+def test_pool_timeout_is_not_a_service_timeout(db_session):
+    service = Service(name="Test", url="https://example.com")
+    db_session.add(service)
+    db_session.commit()
+
+    def handler(request):
+        assert request.extensions["timeout"]["pool"] == 30.0
+        raise httpx.PoolTimeout("No connection", request=request)
+
+    with mock_transport(handler):
+        result = check_service(db_session, service)
+
+    assert result.status == "DOWN"
+    assert result.latency == 0.0
+
+
+def test_check_without_new_connection_has_no_connect_phases(db_session):
+    """Phases that didn't happen are stored as NULL."""
+    service = Service(name="Test", url="https://example.com")
+    db_session.add(service)
+    db_session.commit()
+
+    with mock_transport(lambda request: httpx.Response(200)):
+        result = check_service(db_session, service)
+
+    assert result.dns_time is None
+    assert result.connect_time is None
+    assert result.tls_time is None
+
+
+def big_body_handler(served, chunk_size=1024, chunks=1000):
+    """Handler streaming a ~1MB body and recording how many chunks were pulled."""
+    async def handler(request):
+        served["method"] = request.method
+        served["chunks"] = 0
+
+        async def body():
+            for _ in range(chunks):
+                served["chunks"] += 1
+                yield b"x" * chunk_size
+
+        return httpx.Response(200, content=body())
+    return handler
+
+
+@pytest.mark.parametrize("check_method, max_chunks", [
+    ("GET", 1000),
+    ("GET_CAPPED", 4),
+    ("GET_HEADERS", 0),
+])
+def test_check_method_limits_body_download(check_method, max_chunks):
+    """Bounded check modes stop reading the body early."""
+    served = {}
+    service = Service(
+        id=1, name="Big", url="https://big.com/",
+        check_method=check_method, max_body_bytes=4096,
+    )
+    with mock_transport(big_body_handler(served)):
+        record = run_checks([service])[0]
+
+    assert record.status == "UP"
+    assert record.status_code == 200
+    assert served["method"] == "GET"
+    assert served["chunks"] <= max_chunks
+    if check_method == "GET":
+        assert served["chunks"] == 1000
+
+
+def test_head_check_method():
+    """HEAD services send a HEAD request."""
+    served = {}
+    service = Service(id=1, name="Head", url="https://head.com/", check_method="HEAD")
+    with mock_transport(big_body_handler(served, chunks=0)):
+        record = run_checks([service])[0]
+
+    assert record.status == "UP"
+    assert served["method"] == "HEAD"
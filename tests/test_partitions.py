@@ -0,0 +1,106 @@
+"""
+Tests for check_history partition maintenance.
+
+The partition DDL is Postgres-only; on the SQLite test database these
+functions are no-ops, so the Postgres paths are exercised with a mock session.
+"""
+from datetime import datetime
+
+from unittest.mock import MagicMock, patch
+from app.models import CheckHistory
+from app.partitions import drop_expired_partitions, ensure_partitions, partition_name
+from app.retention import prune
+
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def executed_sql(db):
+    return [str(call.args[0]) for call in db.execute.call_args_list]
+
+
+def test_partition_name():
+    assert partition_name(datetime(2024, 6, 1)) == "check_history_p20240601"
+
+
+def test_noop_on_sqlite(db_session):
+    assert ensure_partitions(db_session, now=NOW) == []
+    assert drop_expired_partitions(db_session, NOW) == (0, 0)
+
+
+def test_ensure_partitions_creates_missing_days():
+    db = MagicMock()
+    existing = [
+        ("check_history_legacy", datetime(2024, 6, 1), 1000),
+        ("check_history_p20240601", datetime(2024, 6, 2), 10),
+    ]
+    with patch("app.partitions.is_partitioned", return_value=True), \
+         patch("app.partitions.default_partition_rows", return_value=0), \
+         patch("app.partitions.list_partitions", return_value=existing):
+        created = ensure_partitions(db, now=NOW, days_ahead=2)
+
+    assert created == ["check_history_p20240602", "check_history_p20240603"]
+    assert "FOR VALUES FROM ('2024-06-02') TO ('2024-06-03')" in executed_sql(db)[0]
+
+
+def test_drop_expired_partitions_stops_at_cutoff():
+    db = MagicMock()
+    existing = [
+        ("check_history_legacy", datetime(2024, 5, 1), 1000),
+        ("check_history_p20240501", datetime(2024, 5, 2), 10),
+        ("check_history_p20240502", datetime(2024, 5, 3), 10),
+    ]
+    with patch("app.partitions.is_partitioned", return_value=True), \
+         patch("app.partitions.default_partition_rows", return_value=0), \
+         patch("app.partitions.list_partitions", return_value=existing):
+        assert drop_expired_partitions(db, datetime(2024, 5, 2, 6)) == (2, 1010)
+
+    assert executed_sql(db) == [
+        'DROP TABLE "check_history_legacy"',
+        'DROP TABLE "check_history_p20240501"',
+    ]
+
+
+def test_rows_in_default_partition_are_moved_and_pruned():
+    db = MagicMock()
+    db.execute.return_value.rowcount = 3
+    existing = [("check_history_legacy", datetime(2024, 6, 1), 1000)]
+    with patch("app.partitions.is_partitioned", return_value=True), \
+         patch("app.partitions.default_partition_rows", return_value=3), \
+         patch("app.partitions.list_partitions", return_value=existing), \
+         patch("app.partitions.logger") as mock_logger:
+        assert ensure_partitions(db, now=NOW, days_ahead=0) == ["check_history_p20240601"]
+
+    # Reported, then the day's rows are moved out before its partition is created
+    mock_logger.error.assert_called_once()
+    statements = executed_sql(db)
+    assert "DELETE FROM check_history_default" in statements[1]
+    assert "PARTITION OF check_history" in statements[2]
+    assert statements[3] == "INSERT INTO check_history SELECT * FROM check_history_moved"
+
+    # Expired stray rows are deleted in batches until a batch comes up short
+    db = MagicMock()
+    db.execute.side_effect = [MagicMock(rowcount=2), MagicMock(rowcount=1)]
+    with patch("app.partitions.is_partitioned", return_value=True), \
+         patch("app.partitions.default_partition_rows", return_value=3), \
+         patch("app.partitions.list_partitions", return_value=[]):
+        assert drop_expired_partitions(db, datetime(2024, 5, 2), batch_size=2) == (0, 3)
+    assert all("DELETE FROM check_history_default" in sql for sql in executed_sql(db))
+
+
+def test_prune_drops_partitions_instead_of_deleting(db_session, sample_service):
+    db_session.add(CheckHistory(
+        service_id=sample_service.id, status="UP", status_code=200, latency=0.1,
+        checked_at=datetime(2024, 1, 1),
+    ))
+    db_session.commit()
+
+    with patch("app.retention.settings.RAW_RETENTION_DAYS", 14), \
+         patch("app.retention.is_partitioned", return_value=True), \
+         patch("app.retention.drop_expired_partitions", return_value=(3, 500)) as mock_drop:
+        report = prune(db_session, now=NOW)
+
+    mock_drop.assert_called_once_with(db_session, datetime(2024, 5, 18, 12, 0, 0), 5000)
+    assert report["partitions_dropped"] == 3
+    assert report["check_history"] == 500
+    assert db_session.query(CheckHistory).count() == 1
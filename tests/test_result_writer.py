@@ -0,0 +1,197 @@
+"""
+Tests for batched check result persistence.
+"""
+import pytest
+from unittest.mock import patch
+from sqlalchemy import event
+from app.models import Service, CheckHistory, AlertState
+from app.result_writer import ResultWriter
+
+
+def make_check(service, status):
+    return CheckHistory(
+        service_id=service.id,
+        status=status,
+        status_code=200 if status == "UP" else 0,
+        latency=0.2,
+    )
+
+
+@pytest.fixture
+def services(db_session):
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(3)]
+    db_session.add_all(services)
+    db_session.commit()
+    return services
+
+
+def test_flush_writes_checks_and_alert_states(db_session, services):
+    """One flush writes every buffered row and upserts alert states."""
+    writer = ResultWriter(db_session)
+    with patch('app.result_writer.enqueue_alerts') as mock_enqueue:
+        for service, status in zip(services, ["UP", "DOWN", "UP"]):
+            writer.add(service, make_check(service, status))
+        assert db_session.query(CheckHistory).count() == 0
+        mock_enqueue.assert_not_called()
+
+        assert writer.flush() == 3
+
+    assert db_session.query(CheckHistory).count() == 3
+    states = {s.service_id: s for s in db_session.query(AlertState)}
+    assert states[services[1].id].last_status == "DOWN"
+    assert states[services[1].id].failure_count == 1
+    assert states[services[0].id].last_status == "UP"
+    mock_enqueue.assert_called_once()
+    assert [alert[1] for alert in mock_enqueue.call_args[0][1]] == ["DOWN"]
+
+
+def test_flush_upserts_existing_alert_state(db_session, services):
+    """Existing alert states are updated in place, and recoveries alert."""
+    db_session.add(AlertState(service_id=services[0].id, last_status="DOWN", failure_count=3))
+    db_session.commit()
+
+    writer = ResultWriter(db_session)
+    with patch('app.result_writer.enqueue_alerts') as mock_enqueue:
+        writer.add(services[0], make_check(services[0], "UP"))
+        writer.flush()
+
+    db_session.expire_all()
+    state = db_session.query(AlertState).filter(AlertState.service_id == services[0].id).one()
+    assert state.last_status == "UP"
+    assert state.failure_count == 0
+    assert state.last_alert_at is not None
+    assert db_session.query(AlertState).count() == 1
+    assert [alert[1] for alert in mock_enqueue.call_args[0][1]] == ["UP"]
+
+
+def test_writer_flushes_when_batch_is_full(db_session, services):
+    """Reaching batch_size triggers a flush without waiting for the run to end."""
+    writer = ResultWriter(db_session, batch_size=2)
+    with patch('app.result_writer.enqueue_alerts'):
+        for service in services:
+            writer.add(service, make_check(service, "UP"))
+
+        assert db_session.query(CheckHistory).count() == 2
+        assert len(writer) == 1
+        writer.flush()
+
+    assert writer.written == 3
+    assert db_session.query(CheckHistory).count() == 3
+
+
+def test_failed_flush_is_counted_not_raised(db_session, services):
+    """A failed batch is rolled back and reported, not raised."""
+    writer = ResultWriter(db_session)
+    writer.add(services[0], make_check(services[0], "UP"))
+    with patch.object(db_session, 'commit', side_effect=RuntimeError("db gone")):
+        assert writer.flush() == 0
+
+    assert writer.failed == 1
+    assert writer.written == 0
+
+
+def test_broker_outage_does_not_abort_the_run(db_session, services):
+    """Alerts that can't be queued stay pending; every batch is still written."""
+    from app.models import AlertDelivery
+
+    writer = ResultWriter(db_session, batch_size=1)
+    with patch('app.alerts.settings.ENABLE_EMAIL_ALERTS', True), \
+         patch('app.alerts.dispatch_deliveries', side_effect=ConnectionError("broker down")):
+        for service in services:
+            writer.add(service, make_check(service, "DOWN"))
+        writer.flush()
+
+    assert writer.written == 3
+    assert db_session.query(CheckHistory).count() == 3
+    assert [d.state for d in db_session.query(AlertDelivery)] == ["pending"] * 3
+
+
+def test_alert_states_loaded_once_and_only_changes_written(db_session, services):
+    """One SELECT for all states; unchanged states aren't rewritten."""
+    db_session.add_all([
+        AlertState(service_id=services[0].id, last_status="UP", failure_count=0),
+        AlertState(service_id=services[1].id, last_status="DOWN", failure_count=2),
+    ])
+    db_session.commit()
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def record(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        writer = ResultWriter(db_session, batch_size=2)
+        writer.preload([service.id for service in services])
+        with patch('app.result_writer.enqueue_alerts'):
+            for status in ("UP", "DOWN"):
+                for service in services:
+                    writer.add(service, make_check(service, "UP" if service is services[0] else status))
+            writer.flush()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    state_selects = [s for s, _ in statements if s.lstrip().startswith("SELECT") and "alert_states" in s]
+    assert len(state_selects) == 1
+
+    # Rows per upsert (8 columns each): services[0]'s first outcome and
+    # services[1]'s recovery, then services[2]'s first row, then both
+    # going DOWN. services[0]'s second UP changes nothing and isn't written.
+    upserts = [p for s, p in statements if s.lstrip().startswith("INSERT INTO alert_states")]
+    assert [len(params) // 8 for params in upserts] == [2, 1, 2]
+
+    db_session.expire_all()
+    states = {s.service_id: s for s in db_session.query(AlertState)}
+    assert (states[services[1].id].last_status, states[services[1].id].failure_count) == ("DOWN", 1)
+    assert (states[services[2].id].last_status, states[services[2].id].failure_count) == ("DOWN", 1)
+
+
+def _run_once(db_session, service, status):
+    """One scheduled run: a fresh writer, preloaded like check_shard does."""
+    writer = ResultWriter(db_session)
+    writer.preload([service.id])
+    with patch('app.result_writer.enqueue_alerts') as mock_enqueue:
+        writer.add(service, make_check(service, status))
+        writer.flush()
+    return [alert[1] for call in mock_enqueue.call_args_list for alert in call[0][1]]
+
+
+def test_outcome_buffer_survives_across_runs(db_session, services):
+    """N-of-M confirmation sees outcomes written by earlier runs."""
+    service = services[0]
+    alerts = []
+    with patch('app.alerts.settings.ALERT_CONFIRM_FAILURES', 2), \
+         patch('app.alerts.settings.ALERT_CONFIRM_WINDOW', 3):
+        for status in ("UP", "DOWN", "UP", "DOWN"):
+            alerts += _run_once(db_session, service, status)
+
+    db_session.expire_all()
+    state = db_session.query(AlertState).filter(AlertState.service_id == service.id).one()
+    assert (state.last_status, state.recent_outcomes) == ("DOWN", "DUD")
+    assert alerts == ["DOWN"]
+
+
+def test_steady_service_with_pre_migration_row_written_once(db_session, services):
+    """An empty outcome buffer is filled once, then the row is left alone."""
+    service = services[0]
+    db_session.add(AlertState(service_id=service.id, last_status="UP", failure_count=0, recent_outcomes=""))
+    db_session.commit()
+
+    upserts = []
+    engine = db_session.get_bind()
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().startswith("INSERT INTO alert_states"):
+            upserts.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for _ in range(3):
+            _run_once(db_session, service, "UP")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(upserts) == 1
+    db_session.expire_all()
+    assert db_session.query(AlertState).filter(AlertState.service_id == service.id).one().recent_outcomes == "U"
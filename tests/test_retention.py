@@ -0,0 +1,86 @@
+"""
+Tests for the retention job.
+"""
+from datetime import datetime, timedelta
+
+from unittest.mock import patch
+from app.models import Service, CheckHistory, CheckRollup
+from app.retention import prune
+from app.tasks import prune_history
+
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def add_history(db, service, ages_in_days, now=NOW):
+    for age in ages_in_days:
+        db.add(CheckHistory(
+            service_id=service.id,
+            status="UP",
+            status_code=200,
+            latency=0.1,
+            checked_at=now - timedelta(days=age),
+        ))
+
+
+def add_rollup(db, service, granularity, age_in_days):
+    db.add(CheckRollup(
+        service_id=service.id,
+        granularity=granularity,
+        bucket_start=NOW - timedelta(days=age_in_days),
+        check_count=1,
+        up_count=1,
+        latency_sum=0.1,
+    ))
+
+
+def test_prune_applies_policy_in_batches(db_session):
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(2)]
+    db_session.add_all(services)
+    db_session.commit()
+
+    for service in services:
+        add_history(db_session, service, [1, 13, 15, 20, 30, 40, 50])
+        add_rollup(db_session, service, "minute", 10)
+        add_rollup(db_session, service, "minute", 31)
+        add_rollup(db_session, service, "hour", 31)
+        add_rollup(db_session, service, "day", 1000)
+    db_session.commit()
+
+    with patch("app.retention.settings.RAW_RETENTION_DAYS", 14), \
+         patch.object(db_session, "commit", wraps=db_session.commit) as mock_commit:
+        report = prune(db_session, now=NOW, batch_size=2)
+
+    assert report["check_history"] == 10
+    assert report["rollup_minute"] == 2
+    assert report["rollup_hour"] == 0
+    assert report["rollup_day"] == 0   # kept forever by default
+    assert report["elapsed"] >= 0
+    # 5 old rows per service at 2 per batch -> several transactions
+    assert mock_commit.call_count > 6
+
+    remaining = sorted(c.checked_at for c in db_session.query(CheckHistory))
+    assert remaining == sorted([NOW - timedelta(days=1), NOW - timedelta(days=13)] * 2)
+    assert db_session.query(CheckRollup).count() == 6
+
+
+def test_raw_history_kept_by_default(db_session, sample_service):
+    """RAW_RETENTION_DAYS defaults to 0 until rollups are backfilled."""
+    add_history(db_session, sample_service, [100, 200])
+    db_session.commit()
+
+    report = prune(db_session, now=NOW)
+
+    assert report["check_history"] == 0
+    assert db_session.query(CheckHistory).count() == 2
+
+
+def test_prune_history_task(task_db, sample_service):
+    add_history(task_db, sample_service, [1, 100], now=datetime.utcnow())
+    task_db.commit()
+
+    with patch("app.retention.settings.RAW_RETENTION_DAYS", 14):
+        report = prune_history()
+
+    assert report["check_history"] == 1
+    assert task_db.query(CheckHistory).count() == 1
@@ -0,0 +1,113 @@
+"""
+Tests for incremental check rollups.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import patch
+from app.health_checks import record_check
+from app.models import CheckHistory, CheckRollup
+from app.result_writer import ResultWriter
+from app.rollups import RollupBuffer, bucket_start, histogram_column
+
+
+def make_check(service, status, latency, checked_at):
+    return CheckHistory(
+        service_id=service.id,
+        status=status,
+        status_code=200 if status == "UP" else 0,
+        latency=latency,
+        checked_at=checked_at,
+    )
+
+
+def test_bucket_start():
+    ts = datetime(2024, 3, 5, 14, 27, 31, 500, tzinfo=timezone.utc)
+    assert bucket_start(ts, "minute") == datetime(2024, 3, 5, 14, 27)
+    assert bucket_start(ts, "hour") == datetime(2024, 3, 5, 14)
+    assert bucket_start(ts, "day") == datetime(2024, 3, 5)
+    with pytest.raises(ValueError):
+        bucket_start(ts, "week")
+
+
+def test_histogram_column():
+    assert histogram_column(0.01) == "le_50ms"
+    assert histogram_column(0.05) == "le_50ms"
+    assert histogram_column(0.3) == "le_500ms"
+    assert histogram_column(12.0) == "gt_10s"
+
+
+def test_writer_maintains_rollups(db_session, sample_service):
+    """Flushes add to existing buckets instead of overwriting them."""
+    minute = datetime(2024, 3, 5, 14, 27, tzinfo=timezone.utc)
+    with patch('app.result_writer.enqueue_alerts'):
+        writer = ResultWriter(db_session)
+        writer.add(sample_service, make_check(sample_service, "UP", 0.2, minute.replace(second=1)))
+        writer.add(sample_service, make_check(sample_service, "UP", 0.04, minute.replace(second=20)))
+        writer.flush()
+
+        writer.add(sample_service, make_check(sample_service, "DOWN", 5.5, minute.replace(second=40)))
+        writer.add(sample_service, make_check(sample_service, "UP", 0.1, minute.replace(minute=28)))
+        writer.flush()
+
+    rollups = {
+        (r.granularity, r.bucket_start): r
+        for r in db_session.query(CheckRollup).filter_by(service_id=sample_service.id)
+    }
+    assert len(rollups) == 4  # two minutes, one hour, one day
+
+    first = rollups[("minute", datetime(2024, 3, 5, 14, 27))]
+    assert first.check_count == 3
+    assert first.up_count == 2
+    # Latency covers the UP checks only
+    assert first.latency_sum == pytest.approx(0.24)
+    assert first.latency_min == 0.04
+    assert first.latency_max == 0.2
+    assert (first.le_50ms, first.le_250ms, first.le_10s) == (1, 1, 0)
+
+    hour = rollups[("hour", datetime(2024, 3, 5, 14))]
+    day = rollups[("day", datetime(2024, 3, 5))]
+    assert hour.check_count == day.check_count == 4
+    assert hour.up_count == 3
+    assert hour.le_100ms == 1
+
+
+def test_down_only_bucket_has_no_latency(db_session, sample_service):
+    minute = datetime(2024, 3, 5, 14, 27, tzinfo=timezone.utc)
+    with patch('app.result_writer.enqueue_alerts'):
+        writer = ResultWriter(db_session)
+        writer.add(sample_service, make_check(sample_service, "DOWN", 10.0, minute))
+        writer.flush()
+
+        bucket = db_session.query(CheckRollup).filter_by(granularity="minute").one()
+        assert (bucket.check_count, bucket.up_count, bucket.latency_sum) == (1, 0, 0)
+        assert bucket.latency_min is None and bucket.latency_max is None
+
+        # An UP check later in the bucket fills the latency in
+        writer.add(sample_service, make_check(sample_service, "UP", 0.3, minute.replace(second=30)))
+        writer.flush()
+
+    db_session.refresh(bucket)
+    assert (bucket.check_count, bucket.up_count) == (2, 1)
+    assert (bucket.latency_sum, bucket.latency_min, bucket.latency_max) == (0.3, 0.3, 0.3)
+    assert (bucket.le_500ms, bucket.le_10s) == (1, 0)
+
+
+def test_record_check_maintains_rollups(db_session, sample_service):
+    """One-off checks count towards the rollups too."""
+    with patch('app.alerts.enqueue_alert'):
+        record_check(db_session, sample_service, make_check(
+            sample_service, "UP", 0.3, datetime(2024, 3, 5, 14, 27, tzinfo=timezone.utc)
+        ))
+
+    assert db_session.query(CheckRollup).count() == 3
+    assert {r.check_count for r in db_session.query(CheckRollup)} == {1}
+
+
+def test_rollup_buffer_merges_within_batch():
+    buffer = RollupBuffer()
+    ts = datetime(2024, 3, 5, 14, 27, tzinfo=timezone.utc)
+    buffer.add(1, "UP", 0.1, ts)
+    buffer.add(1, "UP", 0.2, ts)
+    buffer.add(2, "UP", 0.2, ts)
+    assert len(buffer) == 6
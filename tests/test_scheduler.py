@@ -0,0 +1,125 @@
+"""
+Tests for the per-service heap scheduler.
+"""
+import pytest
+from unittest.mock import patch
+from app.celery_app import celery_app
+from app.scheduler import DispatchRate, DueQueue, DueCheckScheduler, next_slot, phase_offset
+
+
+def test_phase_offset_is_deterministic_and_spread():
+    """Phases are stable per service and spread across the interval."""
+    assert phase_offset(42, 120) == phase_offset(42, 120)
+    phases = [phase_offset(i, 120) for i in range(1, 1001)]
+    assert all(0 <= p < 120 for p in phases)
+    # Roughly uniform: every 12s tenth of the interval gets a share
+    counts = [0] * 10
+    for p in phases:
+        counts[int(p // 12)] += 1
+    assert min(counts) > 50
+
+
+def test_next_slot_is_on_the_services_grid():
+    slot = next_slot(7, 60, after=1000)
+    assert 1000 <= slot < 1060
+    assert next_slot(7, 60, after=slot) == pytest.approx(slot)
+    assert next_slot(7, 60, after=slot + 0.001) == pytest.approx(slot + 60)
+
+
+def test_new_services_start_at_their_phase():
+    queue = DueQueue()
+    queue.sync({1: 15, 2: 600}, now=0)
+    assert queue.next_due() == pytest.approx(min(phase_offset(1, 15), phase_offset(2, 600)))
+
+
+def test_services_run_on_their_own_interval():
+    """A 15s service is dispatched 40 times while a 600s one runs once."""
+    queue = DueQueue()
+    queue.sync({1: 15, 2: 600}, now=0)
+    dispatched = {1: 0, 2: 0}
+    for now in range(0, 600):
+        for service_id in queue.pop_due(now):
+            dispatched[service_id] += 1
+    assert dispatched == {1: 40, 2: 1}
+
+
+def test_dispatches_are_spread_evenly():
+    """1200 services on a 120s interval go out ~10/s, not 1200 at once."""
+    queue = DueQueue()
+    queue.sync({i: 120 for i in range(1, 1201)}, now=0)
+    per_second = [len(queue.pop_due(now)) for now in range(1, 121)]
+    assert sum(per_second) == 1200
+    assert max(per_second) < 30
+    assert queue.expected_rate() == pytest.approx(10)
+
+
+def test_jitter_delays_but_never_skips():
+    queue = DueQueue(jitter=5)
+    queue.sync({1: 60}, now=0)
+    slot = next_slot(1, 60, after=0)
+    assert slot <= queue.next_due() <= slot + 5
+    dispatched = sum(len(queue.pop_due(now)) for now in range(0, 600))
+    assert 9 <= dispatched <= 10
+
+
+def test_removed_services_are_dropped():
+    queue = DueQueue()
+    queue.sync({1: 15, 2: 15}, now=0)
+    queue.sync({1: 15}, now=1)
+    assert all(service_id == 1 for now in range(0, 60) for service_id in queue.pop_due(now))
+    assert len(queue) == 1
+
+
+def test_changed_interval_reschedules():
+    queue = DueQueue()
+    queue.sync({1: 600}, now=0)
+    queue.sync({1: 30}, now=10)
+    assert queue.next_due() == pytest.approx(next_slot(1, 30, after=10))
+
+
+def test_missed_runs_are_skipped_not_burst():
+    """After a long pause a service runs once, not once per missed interval."""
+    queue = DueQueue()
+    queue.sync({1: 10}, now=0)
+    assert queue.pop_due(100) == [1]
+    assert queue.pop_due(100) == []
+    assert 100 < queue.next_due() <= 110
+
+
+def test_dispatch_rate_window():
+    rate = DispatchRate(window=10)
+    rate.record(50, now=0)
+    rate.record(50, now=5)
+    assert rate.per_second() == 10
+    rate.record(0, now=12)
+    assert rate.per_second() == 5
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return DueCheckScheduler(
+        app=celery_app,
+        schedule_filename=str(tmp_path / "celerybeat-schedule"),
+        lazy=True,
+    )
+
+
+def test_scheduler_dispatches_due_services_in_shards(scheduler):
+    with patch.object(scheduler, "_load_intervals", return_value={1: 15, 2: 15, 3: 60}):
+        scheduler.sync_services(now=0)
+    with patch("app.scheduler.settings.CHECK_SHARD_SIZE", 2):
+        with patch.object(scheduler, "send_task") as send_task:
+            assert scheduler.dispatch_due(now=60) == 3
+            assert scheduler.dispatch_due(now=60) == 0
+
+    assert [c.kwargs["args"] for c in send_task.call_args_list] == [[[1, 2]], [[3]]]
+    assert send_task.call_args[0][0] == "app.tasks.check_shard"
+    assert scheduler.dispatch_rate.per_second() == pytest.approx(3 / 60)
+
+
+def test_scheduler_keeps_schedule_when_sync_fails(scheduler):
+    with patch.object(scheduler, "_load_intervals", return_value={1: 15}):
+        scheduler.sync_services(now=0)
+    with patch.object(scheduler, "_load_intervals", side_effect=RuntimeError("db down")):
+        scheduler.sync_services(now=60)
+    assert len(scheduler.due_queue) == 1
@@ -0,0 +1,101 @@
+"""
+Tests for the SLA summary.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import patch
+from app.models import CheckHistory
+from app.result_writer import ResultWriter
+from app.sla import histogram_percentile, parse_window, summarize
+
+
+def test_parse_window():
+    assert parse_window("24h") == timedelta(hours=24)
+    assert parse_window("90d") == timedelta(days=90)
+    assert parse_window("2w") == timedelta(weeks=2)
+    for bad in ("", "0d", "1y", "400d", "abc"):
+        with pytest.raises(ValueError):
+            parse_window(bad)
+
+
+def test_histogram_percentile():
+    # 100 checks: 50 in (0, 50ms], 40 in (50, 100ms], 10 in (100, 250ms]
+    counts = [50, 40, 10, 0, 0, 0, 0, 0, 0]
+    assert histogram_percentile(counts, 0.5, 0.01, 0.2) == pytest.approx(0.05)
+    assert histogram_percentile(counts, 0.9, 0.01, 0.2) == pytest.approx(0.1)
+    assert histogram_percentile(counts, 0.99, 0.01, 0.2) == pytest.approx(0.2)  # clamped to max
+    assert histogram_percentile([0] * 9, 0.5, 0, 0) is None
+
+
+def write_checks(db, service, checks):
+    with patch('app.result_writer.enqueue_alerts'):
+        writer = ResultWriter(db)
+        for status, latency, checked_at in checks:
+            writer.add(service, CheckHistory(
+                service_id=service.id,
+                status=status,
+                status_code=200 if status == "UP" else 0,
+                latency=latency,
+                checked_at=checked_at,
+            ))
+        writer.flush()
+
+
+def test_summarize_from_rollups(db_session, sample_service):
+    now = datetime(2024, 6, 1, 12, 0, 30)
+    checks = [("UP", 4.9 if i == 1 else 0.04, now - timedelta(minutes=i, seconds=30)) for i in range(1, 9)]
+    checks.append(("DOWN", 5.0, now - timedelta(minutes=10)))
+    checks.append(("DOWN", 5.0, now - timedelta(minutes=11)))
+    checks.append(("UP", 0.04, now - timedelta(days=3)))  # outside a 24h window
+    write_checks(db_session, sample_service, [(s, l, t.replace(tzinfo=timezone.utc)) for s, l, t in checks])
+
+    summary = summarize(db_session, sample_service.id, timedelta(hours=24), now=now)
+
+    assert summary["granularity"] == "minute"
+    assert summary["check_count"] == 10
+    assert summary["uptime_pct"] == 80.0
+    assert summary["downtime_minutes"] == 2.0
+    # Latency is over the 8 UP checks; the DOWN checks' 5s timeouts don't count
+    assert summary["latency_avg_ms"] == pytest.approx(647.5)
+    assert summary["latency_min_ms"] == 40.0
+    assert summary["latency_max_ms"] == 4900.0
+    assert summary["p50_ms"] == pytest.approx(40.0)
+    assert summary["p99_ms"] == pytest.approx(4800.0)  # interpolated in (2.5s, 5s]
+
+    week = summarize(db_session, sample_service.id, timedelta(days=7), now=now)
+    assert week["granularity"] == "hour"
+    assert week["check_count"] == 11
+
+
+def test_summarize_without_up_checks(db_session, sample_service):
+    now = datetime(2024, 6, 1, 12, 0, 30)
+    write_checks(db_session, sample_service, [("DOWN", 10.0, datetime(2024, 6, 1, 11, 59, tzinfo=timezone.utc))])
+
+    summary = summarize(db_session, sample_service.id, timedelta(hours=1), now=now)
+    assert summary["check_count"] == 1
+    assert summary["uptime_pct"] == 0.0
+    assert summary["latency_avg_ms"] is None
+    assert summary["p99_ms"] is None
+
+
+def test_sla_endpoint(client, sample_service, db_session):
+    write_checks(db_session, sample_service, [("UP", 0.2, datetime.now(timezone.utc))])
+
+    response = client.get(f"/api/v1/services/{sample_service.id}/sla?window=7d")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["window"] == "7d"
+    assert data["check_count"] == 1
+    assert data["uptime_pct"] == 100.0
+    assert data["p95_ms"] == pytest.approx(200.0)
+
+
+def test_sla_endpoint_empty_and_invalid(client, sample_service):
+    response = client.get(f"/api/v1/services/{sample_service.id}/sla")
+    assert response.status_code == 200
+    assert response.json()["check_count"] == 0
+    assert response.json()["uptime_pct"] is None
+
+    assert client.get(f"/api/v1/services/{sample_service.id}/sla?window=5y").status_code == 422
+    assert client.get("/api/v1/services/999/sla").status_code == 404
@@ -0,0 +1,85 @@
+"""
+Tests for the pooled SMTP session, against a local stand-in server.
+"""
+import smtplib
+
+from email.message import EmailMessage
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.smtp_pool import SMTPPool
+
+
+def _message(n):
+    msg = EmailMessage()
+    msg["Subject"] = f"message {n}"
+    msg["From"] = "alerts@test.com"
+    msg["To"] = "test@example.com"
+    msg.set_content("body")
+    return msg
+
+
+@pytest.fixture
+def pool(smtp_settings):
+    pool = SMTPPool()
+    yield pool
+    pool.close()
+
+
+def test_batch_reuses_one_session(pool, smtp_settings):
+    assert pool.send_batch([_message(n) for n in range(5)]) == [None] * 5
+    pool.send(_message(5))
+
+    assert len(smtp_settings.messages) == 6
+    assert "Subject: message 5" in smtp_settings.messages[-1]
+    assert smtp_settings.connections == 1
+
+
+def test_reconnects_when_server_hangs_up(pool, smtp_settings):
+    smtp_settings.drop_after = 2
+    assert pool.send_batch([_message(n) for n in range(5)]) == [None] * 5
+
+    assert [m.split("Subject: ")[1].splitlines()[0] for m in smtp_settings.messages] == [
+        f"message {n}" for n in range(5)
+    ]
+    assert smtp_settings.connections == 3
+
+
+def test_session_replaced_after_max_messages_or_idle(pool, smtp_settings):
+    with patch("app.smtp_pool.settings.SMTP_SESSION_MAX_MESSAGES", 2):
+        pool.send_batch([_message(n) for n in range(3)])
+    assert smtp_settings.connections == 2
+
+    with patch("app.smtp_pool.settings.SMTP_SESSION_IDLE_SECONDS", -1):
+        pool.send(_message(3))
+    assert smtp_settings.connections == 3
+
+
+def test_starttls_login_and_refusals():
+    conn = MagicMock()
+    conn.send_message.side_effect = [smtplib.SMTPRecipientsRefused({}), None]
+    factory = MagicMock(return_value=conn)
+    pool = SMTPPool(smtp_factory=factory)
+
+    with patch("app.smtp_pool.settings.SMTP_USE_TLS", True), \
+         patch("app.smtp_pool.settings.SMTP_USER", "user"), \
+         patch("app.smtp_pool.settings.SMTP_PASSWORD", "secret"):
+        results = pool.send_batch([_message(0), _message(1)])
+
+    # A refused message is reported without dropping the session
+    assert isinstance(results[0], smtplib.SMTPRecipientsRefused)
+    assert results[1] is None
+    factory.assert_called_once()
+    conn.starttls.assert_called_once()
+    conn.login.assert_called_once_with("user", "secret")
+
+
+def test_gives_up_after_one_reconnect():
+    factory = MagicMock()
+    factory.return_value.send_message.side_effect = smtplib.SMTPServerDisconnected("gone")
+    pool = SMTPPool(smtp_factory=factory)
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        pool.send(_message(0))
+    assert factory.call_count == 2
@@ -0,0 +1,176 @@
+"""
+Tests for the Redis latest-status hash.
+"""
+import json
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app import status_store
+from app.models import AlertState, CheckHistory, Service
+from app.result_writer import ResultWriter
+
+
+class FakeRedis:
+    """Just the hash commands status_store uses."""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+
+@pytest.fixture
+def redis():
+    fake = FakeRedis()
+    with patch("app.status_store.settings.STATUS_CACHE_ENABLED", True), \
+         patch("app.status_store.get_redis", return_value=fake):
+        yield fake
+
+
+def _services(db_session, count):
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(count)]
+    db_session.add_all(services)
+    db_session.commit()
+    return services
+
+
+def test_writer_stores_latest_status_after_commit(db_session, redis):
+    services = _services(db_session, 2)
+    with patch("app.result_writer.enqueue_alerts"):
+        writer = ResultWriter(db_session)
+        writer.add(services[0], CheckHistory(service_id=services[0].id, status="UP", status_code=200, latency=0.1))
+        writer.add(services[1], CheckHistory(service_id=services[1].id, status="DOWN", status_code=0, latency=5.0))
+        writer.add(services[1], CheckHistory(service_id=services[1].id, status="DOWN", status_code=0, latency=4.0))
+        assert redis.hashes == {}
+        writer.flush()
+
+    stored = {int(k): json.loads(v) for k, v in redis.hashes[status_store.STATUS_KEY].items()}
+    assert stored[services[0].id]["status"] == "UP"
+    assert stored[services[1].id]["latency"] == 4.0
+    assert stored[services[1].id]["failure_count"] == 2
+    assert stored[services[1].id]["alert_status"] == "DOWN"
+
+
+def test_load_reads_hash_without_touching_db(db_session, redis):
+    status_store.record_statuses({7: {"status": "DOWN", "failure_count": 1}})
+    with patch("app.status_store.rebuild") as mock_rebuild:
+        assert status_store.load_statuses(db_session, [7]) == {7: {"status": "DOWN", "failure_count": 1}}
+        mock_rebuild.assert_not_called()
+
+
+def test_empty_hash_is_rebuilt_and_refilled(db_session, redis):
+    services = _services(db_session, 3)
+    db_session.add_all([
+        CheckHistory(service_id=services[0].id, status="UP", status_code=200, latency=0.2,
+                     checked_at=datetime(2024, 1, 1, 12, 0)),
+        CheckHistory(service_id=services[0].id, status="DOWN", status_code=500, latency=0.3,
+                     checked_at=datetime(2024, 1, 1, 12, 2)),
+        CheckHistory(service_id=services[1].id, status="UP", status_code=200, latency=0.1,
+                     checked_at=datetime(2024, 1, 1, 12, 1)),
+        AlertState(service_id=services[0].id, last_status="UP", failure_count=1),
+    ])
+    db_session.commit()
+
+    statuses = status_store.load_statuses(db_session, [services[0].id])
+    assert statuses == {services[0].id: {
+        "status": "DOWN",
+        "status_code": 500,
+        "latency": 0.3,
+        "checked_at": "2024-01-01T12:02:00",
+        "failure_count": 1,
+        "alert_status": "UP",
+    }}
+    assert set(redis.hashes[status_store.STATUS_KEY]) == {str(services[0].id)}
+
+    # Every service: the rest is refilled too; never-checked services stay absent
+    assert set(status_store.load_statuses(db_session)) == {services[0].id, services[1].id}
+    assert set(redis.hashes[status_store.STATUS_KEY]) == {str(services[0].id), str(services[1].id)}
+
+
+def test_partial_hash_fills_in_missing_services(db_session, redis):
+    # Redis restarted and only one shard has been checked since
+    services = _services(db_session, 3)
+    db_session.add_all([
+        CheckHistory(service_id=services[1].id, status="DOWN", status_code=503, latency=1.5,
+                     checked_at=datetime(2024, 1, 1, 12, 1)),
+        AlertState(service_id=services[1].id, last_status="DOWN", failure_count=4),
+    ])
+    db_session.commit()
+    status_store.record_statuses({services[0].id: {"status": "UP", "failure_count": 0}})
+
+    with patch("app.status_store.rebuild", wraps=status_store.rebuild) as mock_rebuild:
+        statuses = status_store.load_statuses(db_session)
+        mock_rebuild.assert_called_once_with(db_session, [services[1].id, services[2].id])
+    assert statuses[services[0].id] == {"status": "UP", "failure_count": 0}
+    assert statuses[services[1].id]["status"] == "DOWN"
+    assert statuses[services[1].id]["failure_count"] == 4
+    assert services[2].id not in statuses
+
+    # Written back: the next read of that service comes from Redis alone
+    with patch("app.status_store.rebuild") as mock_rebuild:
+        assert status_store.load_statuses(db_session, [services[1].id]) == {
+            services[1].id: statuses[services[1].id]
+        }
+        mock_rebuild.assert_not_called()
+
+
+def test_falls_back_to_db_when_redis_down(db_session):
+    services = _services(db_session, 1)
+    db_session.add(CheckHistory(service_id=services[0].id, status="UP", status_code=200, latency=0.1))
+    db_session.commit()
+
+    with patch("app.status_store.settings.STATUS_CACHE_ENABLED", True), \
+         patch("app.status_store.get_redis", side_effect=ConnectionError("redis down")):
+        status_store.record_statuses({1: {}})  # does not raise
+        statuses = status_store.load_statuses(db_session)
+    assert statuses[services[0].id]["status"] == "UP"
+
+
+def test_alert_status_counts_confirmed_down_only(client, db_session, redis):
+    services = _services(db_session, 2)
+    with patch("app.alerts.settings.ALERT_CONFIRM_FAILURES", 2), \
+         patch("app.alerts.settings.ALERT_CONFIRM_WINDOW", 3), \
+         patch("app.result_writer.enqueue_alerts"):
+        writer = ResultWriter(db_session)
+        # One failed probe: not confirmed yet
+        writer.add(services[0], CheckHistory(service_id=services[0].id, status="DOWN", status_code=0, latency=5.0))
+        # Two: confirmed DOWN
+        writer.add(services[1], CheckHistory(service_id=services[1].id, status="DOWN", status_code=0, latency=5.0))
+        writer.add(services[1], CheckHistory(service_id=services[1].id, status="DOWN", status_code=0, latency=5.0))
+        writer.flush()
+
+    body = client.get("/api/v1/alerts/status").json()
+    assert body["down_services"] == 1
+    assert body["services_with_failures"] == 2
+
+
+def test_status_overview_and_delete(client, db_session, redis):
+    services = _services(db_session, 3)
+    status_store.record_statuses({
+        services[0].id: {"status": "UP", "status_code": 200, "latency": 0.1,
+                         "checked_at": "2024-01-01T12:00:00", "failure_count": 0},
+        services[1].id: {"status": "DOWN", "status_code": 0, "latency": 5.0,
+                         "checked_at": "2024-01-01T12:00:00", "failure_count": 3},
+    })
+
+    body = client.get("/api/v1/status").json()
+    assert (body["total_services"], body["up_services"], body["down_services"], body["unchecked_services"]) == (3, 1, 1, 1)
+    assert [entry["service_id"] for entry in body["services"]] == [services[0].id, services[1].id]
+
+    alert_status = client.get("/api/v1/alerts/status").json()
+    assert alert_status["down_services"] == 1
+    assert alert_status["services_with_failures"] == 1
+
+    client.delete(f"/api/v1/services/{services[1].id}")
+    assert str(services[1].id) not in redis.hashes[status_store.STATUS_KEY]
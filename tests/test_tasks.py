@@ -0,0 +1,102 @@
+"""
+Tests for Celery tasks and check run sharding.
+"""
+import logging
+
+import pytest
+from unittest.mock import patch
+from app.models import Service, CheckHistory
+from app.sharding import HashRing, build_shards, hash_shards, range_shards
+from app.tasks import run_all_health_checks, check_shard, summarize_check_run
+
+
+def fake_run_checks(status_by_id):
+    """Stand-in for the check engine returning canned results."""
+    def run_checks(services, **kwargs):
+        return [
+            CheckHistory(
+                service_id=service.id,
+                status=status_by_id.get(service.id, "UP"),
+                status_code=200 if status_by_id.get(service.id, "UP") == "UP" else 0,
+                latency=0.1,
+            )
+            for service in services
+        ]
+    return run_checks
+
+
+def test_range_shards():
+    """Range strategy cuts sorted IDs into contiguous chunks."""
+    assert range_shards([5, 1, 4, 2, 3], 2) == [[1, 2], [3, 4], [5]]
+    assert range_shards([], 2) == []
+
+
+def test_hash_shards_cover_every_id_once():
+    """Hash strategy assigns each ID to exactly one shard."""
+    ids = list(range(1, 501))
+    shards = hash_shards(ids, 8)
+    assert sorted(i for shard in shards for i in shard) == ids
+    assert 1 < len(shards) <= 8
+
+
+def test_hash_ring_is_consistent():
+    """Growing the ring only moves a fraction of the services."""
+    ids = range(1, 2001)
+    before = HashRing(8)
+    after = HashRing(9)
+    moved = sum(1 for i in ids if before.shard_for(i) != after.shard_for(i))
+    assert moved < len(ids) * 0.3
+
+
+def test_build_shards_unknown_strategy():
+    with pytest.raises(ValueError):
+        build_shards([1, 2, 3], strategy="random")
+
+
+def test_run_all_health_checks_dispatches_shards(task_db):
+    """The Beat task fans the services out as a chord of shards."""
+    for i in range(5):
+        task_db.add(Service(name=f"S{i}", url=f"https://s{i}.com"))
+    task_db.commit()
+
+    with patch("app.sharding.settings.CHECK_SHARD_SIZE", 2):
+        with patch("app.tasks.chord") as mock_chord:
+            run_all_health_checks()
+
+    header = list(mock_chord.call_args[0][0])
+    assert [sig.args[0] for sig in header] == [[1, 2], [3, 4], [5]]
+    mock_chord.return_value.assert_called_once()
+
+
+def test_check_shard_records_results(task_db):
+    """A shard checks only its own services and reports totals."""
+    services = [Service(name=f"S{i}", url=f"https://s{i}.com") for i in range(3)]
+    task_db.add_all(services)
+    task_db.commit()
+
+    with patch("app.tasks.run_checks", fake_run_checks({2: "DOWN"})):
+        with patch("app.result_writer.enqueue_alerts"), patch("app.tasks.logger") as mock_logger:
+            totals = check_shard([1, 2])
+
+    assert totals.pop("wall_time") >= 0
+    assert totals == {"checked": 2, "up": 1, "down": 1, "errors": 0}
+    # Logged by the shard itself: Beat-dispatched shards have no chord callback
+    level, _, services, checked, up, down, errors, _ = mock_logger.log.call_args[0]
+    assert (level, services, checked, up, down, errors) == (logging.INFO, 2, 2, 1, 1, 0)
+    assert task_db.query(CheckHistory).count() == 2
+
+
+def test_summarize_check_run():
+    """The chord callback adds up shard totals."""
+    summary = summarize_check_run(
+        [
+            {"checked": 2, "up": 1, "down": 1, "errors": 0},
+            {"checked": 3, "up": 3, "down": 0, "errors": 1},
+        ],
+        started_at=0,
+    )
+    assert summary["shards"] == 2
+    assert summary["checked"] == 5
+    assert summary["down"] == 1
+    assert summary["errors"] == 1
+    assert summary["wall_time"] > 0
@@ -0,0 +1,138 @@
+"""
+Tests for adaptive per-service timeouts.
+"""
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from unittest.mock import patch
+from app.check_engine import run_checks
+from app.models import Service, CheckHistory
+from app.tasks import check_shard
+from app.timeouts import AdaptiveTimeouts, percentile
+
+from tests.test_health_checks import mock_transport
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 0.5) == 50
+    assert percentile([3.0], 0.99) == 3.0
+
+
+def test_fixed_timeout_until_enough_samples():
+    """Services without enough history keep CHECK_TIMEOUT_SECONDS."""
+    timeouts = AdaptiveTimeouts(samples=20)
+    for _ in range(5):
+        timeouts.observe(1, "UP", 0.05)
+    assert timeouts.timeout_for(1) == 5.0
+
+
+def test_timeout_follows_latency_and_is_clamped():
+    timeouts = AdaptiveTimeouts(samples=20)
+    for _ in range(20):
+        timeouts.observe(1, "UP", 0.4)     # fast API
+        timeouts.observe(2, "UP", 0.01)    # very fast API
+        timeouts.observe(3, "UP", 3.0)     # slow API
+    assert timeouts.timeout_for(1) == pytest.approx(1.2)  # 0.4s * factor 3
+    assert timeouts.timeout_for(2) == 0.5  # min bound
+    assert timeouts.timeout_for(3) == 5.0  # max bound
+
+
+def test_down_results_do_not_shape_timeout():
+    timeouts = AdaptiveTimeouts(samples=20)
+    for _ in range(20):
+        timeouts.observe(1, "UP", 0.4)
+    timeouts.observe(1, "DOWN", 5.0)
+    assert timeouts.timeout_for(1) == pytest.approx(1.2)
+
+
+def test_seed_from_history_in_one_query(db_session):
+    """Recent UP latencies are loaded in bulk, newest first, once per refresh."""
+    service = Service(name="Fast", url="https://fast.com")
+    db_session.add(service)
+    db_session.commit()
+
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [CheckHistory(service_id=service.id, status="UP", status_code=200, latency=2.0,
+                      checked_at=now - timedelta(hours=1, seconds=i)) for i in range(10)]
+        + [CheckHistory(service_id=service.id, status="UP", status_code=200, latency=0.2,
+                        checked_at=now - timedelta(seconds=i)) for i in range(10)]
+        + [CheckHistory(service_id=service.id, status="DOWN", status_code=0, latency=5.0, checked_at=now)]
+    )
+    db_session.commit()
+
+    timeouts = AdaptiveTimeouts(samples=10)
+    assert timeouts.for_services(db_session, [service]) == {service.id: pytest.approx(0.6)}
+
+    # Within the refresh window the cache answers without touching the DB
+    with patch.object(db_session, "execute") as mock_execute:
+        timeouts.for_services(db_session, [service])
+    mock_execute.assert_not_called()
+
+
+def test_seed_ignores_history_older_than_window(db_session):
+    """Only the last `samples` intervals (with slack) of history are read."""
+    frequent = Service(name="Frequent", url="https://frequent.com", interval_seconds=60)
+    hourly = Service(name="Hourly", url="https://hourly.com", interval_seconds=3600)
+    db_session.add_all([frequent, hourly])
+    db_session.commit()
+
+    # 10 samples * 60s * slack 2 = 20 minutes; these are a day old
+    day_ago = datetime.now(timezone.utc) - timedelta(days=1)
+    db_session.add_all([
+        CheckHistory(service_id=service.id, status="UP", status_code=200, latency=0.2,
+                     checked_at=day_ago - timedelta(minutes=i))
+        for service in (frequent, hourly) for i in range(10)
+    ])
+    db_session.commit()
+
+    assert AdaptiveTimeouts(samples=10).for_services(db_session, [frequent]) == {frequent.id: 5.0}
+    # 10 samples * 1h * slack 2 = 20 hours still misses them; 50 samples reach back far enough
+    assert AdaptiveTimeouts(samples=10).for_services(db_session, [hourly]) == {hourly.id: 5.0}
+    assert AdaptiveTimeouts(samples=50).for_services(db_session, [hourly]) == {hourly.id: pytest.approx(0.6)}
+
+
+def test_engine_applies_per_service_timeout(db_session):
+    """Each probe gets its own timeout; services not in the map use the fixed one."""
+    fast = Service(name="Fast", url="https://fast.com")
+    other = Service(name="Other", url="https://other.com")
+    db_session.add_all([fast, other])
+    db_session.commit()
+
+    seen = {}
+
+    def handler(request):
+        seen[request.url.host] = request.extensions["timeout"]
+        if request.url.host == "fast.com":
+            raise httpx.ReadTimeout("Timeout", request=request)
+        return httpx.Response(200)
+
+    with mock_transport(handler):
+        adaptive, fixed = run_checks([fast, other], timeouts={fast.id: 0.6})
+
+    assert seen["fast.com"]["read"] == 0.6
+    assert seen["other.com"]["read"] == 5.0
+    assert adaptive.status == "DOWN"
+    assert fixed.status == "UP"
+
+
+def test_check_shard_uses_adaptive_timeouts(task_db):
+    service = Service(name="Fast", url="https://fast.com")
+    task_db.add(service)
+    task_db.commit()
+
+    captured = {}
+
+    def fake_run_checks(services, timeouts=None):
+        captured.update(timeouts)
+        return [CheckHistory(service_id=s.id, status="UP", status_code=200, latency=0.1) for s in services]
+
+    with patch("app.tasks.settings.CHECK_TIMEOUT_MODE", "adaptive"), \
+         patch("app.tasks.adaptive_timeouts", AdaptiveTimeouts()), \
+         patch("app.tasks.run_checks", fake_run_checks):
+        check_shard([service.id])
+
+    assert captured == {service.id: 5.0}